@@ -1,3 +1,5 @@
+import asyncio
+
 from typing import Dict, List
 from abc import ABC, abstractmethod
 
@@ -45,3 +47,9 @@ class BasePredictorAgent(ABC):
         }
         """
         raise NotImplementedError
+
+    async def apredict(self, question: str, description: str, *args, **kwargs) -> Dict:
+        """
+        Async version of predict, agents without an async implementation run predict in a thread.
+        """
+        return await asyncio.to_thread(self.predict, question, description, *args, **kwargs)
@@ -5,11 +5,11 @@ from typing import List, Dict
 from langchain.agents import Tool, AgentExecutor, ZeroShotAgent
 from langchain.memory import ConversationBufferWindowMemory
 from langchain.chains import LLMChain
-from langchain.chat_models import ChatOpenAI
 from langchain.tools import StructuredTool
 
 from app.agents.base_agent import BasePredictorAgent
 from app.agents.prompts import SYSTEM_PROMPT, ACTION_PROMPT
+from app.llm import get_llm
 
 from app.models import (
     EmptyInput,
@@ -31,12 +31,7 @@ class SimpleAgent(BasePredictorAgent):
         api_key (str): OpenAI API key
     """
     def __init__(self, api_key: str, temperature: float = 0.35): 
-        llm = ChatOpenAI(
-            openai_api_key=api_key,
-            temperature=temperature,
-            model_name="gpt-4o",
-            max_tokens=1000,
-        )
+        llm = get_llm("gpt-4o", temperature=temperature, max_tokens=1000, api_key=api_key)
         # Initialize memory and agent executor
         self._memory = ConversationBufferWindowMemory(
             memory_key="chat_history",
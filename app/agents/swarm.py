@@ -6,10 +6,10 @@ from typing import Dict, List
 from langchain.agents import AgentExecutor, ZeroShotAgent
 from langchain.memory import ConversationBufferWindowMemory
 from langchain.chains import LLMChain
-from langchain.chat_models import ChatOpenAI
 
 from app.agents.base_agent import BasePredictorAgent
 from app.agents.prompts import SYSTEM_PROMPT, SWARM_ACTION_PROMPT
+from app.llm import get_llm
 
 
 class SwarmAgent(BasePredictorAgent):
@@ -20,12 +20,7 @@ class SwarmAgent(BasePredictorAgent):
         api_key (str): OpenAI API key
     """
     def __init__(self, api_key: str, agents: List[BasePredictorAgent]): 
-        llm = ChatOpenAI(
-            openai_api_key=api_key,
-            temperature=0.2,
-            model_name="gpt-4o",
-            max_tokens=1000,
-        )
+        llm = get_llm("gpt-4o", temperature=0.2, max_tokens=1000, api_key=api_key)
         # Initialize memory and agent executor
         self._memory = ConversationBufferWindowMemory(
             memory_key="chat_history",
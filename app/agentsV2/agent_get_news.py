@@ -1,15 +1,129 @@
 import json
 import os
-from typing import Annotated, List, Dict
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Annotated, List, Dict, Optional
 
 from langchain.agents import AgentExecutor, create_tool_calling_agent
 from langchain_core.tools import Tool,tool
 from langchain_core.prompts import ChatPromptTemplate, PromptTemplate
-from langchain_openai import ChatOpenAI
-from langchain_community.tools.tavily_search import TavilySearchResults
-from app.agentsV2.settings import BASE_MODEL, MAIN_MODEL
+from langchain_core.runnables import Runnable
+from app.agentsV2.passages import extract_passages
+from app.agentsV2.search import asearch, search
+from app.agentsV2.settings import BASE_MODEL, MAIN_MODEL, PASSAGE_TOKENS, REDUCE_TOKENS, SUMMARY_CONCURRENCY
+from app.agentsV2.summarize import atree_reduce, tree_reduce
+from app.llm import get_llm
+
+
+# client shared by every call of the tools
+llm = get_llm(BASE_MODEL)
+
+
+@dataclass
+class NewsSession:
+    """State of one analysis shared by the tools, instead of module globals."""
+    top_news: str = "" # trusted sources the search is restricted to
+    analytics_result: str = "" # last news summary, used by the debate tool
+
+
+# session of the running analysis, every thread and asyncio task sees its own
+_session: ContextVar[Optional[NewsSession]] = ContextVar("news_session", default=None)
+
+
+def current_session() -> NewsSession:
+    return _session.get() or NewsSession()
+
+
+QUERIES_PROMPT = PromptTemplate(
+    input_variables=["user_query"],
+    template="""
+    Your task is to create two search query variants for the same topic:
+    1. A POSITIVE query that highlights potential benefits and successes.
+    2. A CRITICAL query that emphasizes risks and issues.
+
+    User query: "{user_query}"
+
+    Positive query should:
+    - Use optimistic phrasing
+    - Focus on potential benefits
+    - Be constructive and hopeful
+
+    Critical query should:
+    - Be skeptical
+    - Highlight potential downsides
+    - Be analytical and cautious
+
+    Generate two queries:
+    1. POSITIVE query:
+    2. CRITICAL query:
+    """
+)
+
+DEBATE_PROMPT = PromptTemplate(
+    input_variables=["analytics_result", "debate_question"],
+    template="""
+    Your task is to provide a detailed response to another LLM agent's question.
+    Use specific facts and explain whether you agree or disagree with their argument.
+    Your analysis: {analytics_result}
+    The other agent's argument: {debate_question}
+    """
+)
+
+
+def parse_queries(content: str) -> List[str]:
+    return [line.split(":")[1].strip() for line in content.split("\n") if ":" in line]
+
+
+def summary_chain(question: str) -> Runnable:
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", f"""
+        Task #1:
+        Summarize news based on the user's request.
+        User query: {question}
+        Make sure to include all key points.
+        """),
+        ("human", "{news}")
+    ])
+    return prompt | llm
+
+
+def summary_inputs(question: str, urls: List[Dict]) -> List[Dict[str, str]]:
+    """
+    Inputs of the summary chain, one per search result.
+    Only the passages of a page most relevant to the question are summarized.
+    """
+    print(f"Using top sources: {current_session().top_news}")
+
+    articles = []
+    for url in urls:
+        try:
+            articles.append((url['url'].split("/")[2], url.get('raw_content') or url['content']))
+        except (KeyError, IndexError) as e:
+            print(f"Error processing URL {url.get('url')}: {e}")
+
+    extracts = extract_passages(question, [content for _, content in articles], max_tokens=PASSAGE_TOKENS)
+    return [
+        {"news": f"NEWS URL {domain}\n\n{extract}\n\n"}
+        for (domain, _), extract in zip(articles, extracts) if extract
+    ]
+
+
+def successful_summaries(texts_to_summarize: List[Dict[str, str]], summaries: List) -> List[str]:
+    # map: every article is summarized concurrently, failed ones are left out of the reduce
+    article_summaries = []
+    for text, summary in zip(texts_to_summarize, summaries):
+        if isinstance(summary, Exception):
+            print(f"Error summarizing {text['news'][:80]!r}: {summary}")
+            continue
+        article_summaries.append(summary.content)
+    return article_summaries
+
 
 class NewsAnalysisAgent:
+
+    def __init__(self):
+        self.news_agent = self.create_news_analysis_agent()
+
     @staticmethod
     @tool
     def fetch_and_summarize_news(question: Annotated[str, "User question about news"]) -> str:
@@ -17,48 +131,45 @@ class NewsAnalysisAgent:
         Fetch news from the internet and provide a summary for decision-making.
         """
 
-        global analytics_result_llm
+        session = current_session()
+        chain = summary_chain(question)
+        texts_to_summarize = summary_inputs(question, search(question + f" Use these sources: {session.top_news}"))
 
-        llm = ChatOpenAI(model=BASE_MODEL)
-
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", f"""
-            Task #1:
-            Summarize news based on the user's request.
-            User query: {question}
-            Make sure to include all key points.
-            """),
-            ("human", "{news}")
-        ])
-
-        chain = prompt | llm
-
-        search_tool = TavilySearchResults(
-            max_results=10,
-            search_depth="advanced",
-            include_answer=True,
-            include_raw_content=True,
-            include_images=False
+        summaries = chain.batch(
+            texts_to_summarize,
+            config={"max_concurrency": SUMMARY_CONCURRENCY},
+            return_exceptions=True,
         )
+        article_summaries = successful_summaries(texts_to_summarize, summaries)
+        if not article_summaries:
+            # every page was already summarized in this prediction, the last summary still holds
+            return session.analytics_result or "No new news found."
 
-        final_query = question + f" Use these sources: {top_news}"
-        urls = search_tool.invoke({"query": final_query})
-        print(f"Using top sources: {top_news}")
+        session.analytics_result = tree_reduce(chain, article_summaries, max_tokens=REDUCE_TOKENS, max_concurrency=SUMMARY_CONCURRENCY)
+        return session.analytics_result
+
+    @staticmethod
+    async def afetch_and_summarize_news(question: str) -> str:
+        """
+        Async version of fetch_and_summarize_news.
+        """
 
-        all_text = ""
-        for index, url in enumerate(urls, 1):
-            try:
-                domain = url['url'].split("/")[2]
-                text_to_summarize = f"NEWS URL {domain}\n\n{url['content']}\n\n"
-                generated_text = chain.invoke({"news": text_to_summarize}).content
-                all_text += generated_text
-            except KeyError as e:
-                print(f"Error processing URL {url['url']}: {e}")
+        session = current_session()
+        chain = summary_chain(question)
+        texts_to_summarize = summary_inputs(question, await asearch(question + f" Use these sources: {session.top_news}"))
 
-        summary_text = chain.invoke({"news": all_text}).content
-        analytics_result_llm = summary_text
+        summaries = await chain.abatch(
+            texts_to_summarize,
+            config={"max_concurrency": SUMMARY_CONCURRENCY},
+            return_exceptions=True,
+        )
+        article_summaries = successful_summaries(texts_to_summarize, summaries)
+        if not article_summaries:
+            # every page was already summarized in this prediction, the last summary still holds
+            return session.analytics_result or "No new news found."
 
-        return summary_text
+        session.analytics_result = await atree_reduce(chain, article_summaries, max_tokens=REDUCE_TOKENS, max_concurrency=SUMMARY_CONCURRENCY)
+        return session.analytics_result
 
     @staticmethod
     @tool
@@ -66,37 +177,22 @@ class NewsAnalysisAgent:
         """
         Generate positive and critical search queries for the given topic.
         """
-        llm = ChatOpenAI(model=BASE_MODEL)
-
-        prompt = PromptTemplate(
-            input_variables=["user_query"],
-            template="""
-            Your task is to create two search query variants for the same topic:
-            1. A POSITIVE query that highlights potential benefits and successes.
-            2. A CRITICAL query that emphasizes risks and issues.
 
-            User query: "{user_query}"
+        chain = QUERIES_PROMPT | llm
 
-            Positive query should:
-            - Use optimistic phrasing
-            - Focus on potential benefits
-            - Be constructive and hopeful
-
-            Critical query should:
-            - Be skeptical
-            - Highlight potential downsides
-            - Be analytical and cautious
+        response = chain.invoke({"user_query": query})
+        return parse_queries(response.content)
 
-            Generate two queries:
-            1. POSITIVE query:
-            2. CRITICAL query:
-            """
-        )
+    @staticmethod
+    async def agenerate_positive_and_negative_queries(query: str) -> List[str]:
+        """
+        Async version of generate_positive_and_negative_queries.
+        """
 
-        chain = prompt | llm
+        chain = QUERIES_PROMPT | llm
 
-        response = chain.invoke({"user_query": query})
-        return [line.split(":")[1].strip() for line in response.content.split("\n") if ":" in line]
+        response = await chain.ainvoke({"user_query": query})
+        return parse_queries(response.content)
     
     @staticmethod
     @tool
@@ -104,25 +200,27 @@ class NewsAnalysisAgent:
         """
         Provide a detailed analysis of arguments from another agent in a debate.
         """
-        llm = ChatOpenAI(model=BASE_MODEL)
 
-        prompt = PromptTemplate(
-            input_variables=["analytics_result", "debate_question"],
-            template="""
-            Your task is to provide a detailed response to another LLM agent's question.
-            Use specific facts and explain whether you agree or disagree with their argument.
-            Your analysis: {analytics_result}
-            The other agent's argument: {debate_question}
-            """
-        )
-
-        chain = prompt | llm
+        chain = DEBATE_PROMPT | llm
 
         return chain.invoke({
-            "analytics_result": analytics_result_llm,
+            "analytics_result": current_session().analytics_result,
             "debate_question": debate_question
         }).content
 
+    @staticmethod
+    async def adebate_analysis_tool(debate_question: str) -> str:
+        """
+        Async version of debate_analysis_tool.
+        """
+
+        chain = DEBATE_PROMPT | llm
+
+        return (await chain.ainvoke({
+            "analytics_result": current_session().analytics_result,
+            "debate_question": debate_question
+        })).content
+
     def create_news_analysis_agent(self) -> AgentExecutor:
         """
         Create an agent for multi-step news analysis:
@@ -131,12 +229,12 @@ class NewsAnalysisAgent:
         3. Summarize results.
         4. Verify the reliability of sources.
         """
-        llm = ChatOpenAI(model=MAIN_MODEL, temperature=0.2)
+        llm = get_llm(MAIN_MODEL, temperature=0.2)
 
         tools = [
-            Tool(name="Rephrase_Query", func=self.generate_positive_and_negative_queries, description="Generate positive and critical query variants"),
-            Tool(name="Internet_Search", func=self.fetch_and_summarize_news, description="Fetch and summarize news"),
-            Tool(name="Debate_Tool", func=self.debate_analysis_tool, description="Analyze and respond to debates")
+            Tool(name="Rephrase_Query", func=self.generate_positive_and_negative_queries, coroutine=self.agenerate_positive_and_negative_queries, description="Generate positive and critical query variants"),
+            Tool(name="Internet_Search", func=self.fetch_and_summarize_news, coroutine=self.afetch_and_summarize_news, description="Fetch and summarize news"),
+            Tool(name="Debate_Tool", func=self.debate_analysis_tool, coroutine=self.adebate_analysis_tool, description="Analyze and respond to debates")
         ]
 
         system_prompt = """You are an analytical agent assisting users in obtaining comprehensive information by evaluating various perspectives.
@@ -166,15 +264,37 @@ class NewsAnalysisAgent:
             max_iterations=5
         )
 
-    def analyze_news(self, query: str, top_url: str) -> str:
+    def analyze_news(self, query: str, top_url: str, session: Optional[NewsSession] = None) -> str:
         """
         Perform news analysis for a given query and URL.
+
+        Args:
+            query (str): question or argument of the other agent
+            top_url (str): trusted sources of the news search
+            session (Optional[NewsSession]): session to continue, e.g. to debate on the summary of a previous call
+        """
+        session = session or NewsSession()
+        session.top_news = " ".join(top_url.split("\n")).replace("*", "")
+
+        token = _session.set(session)
+        try:
+            result = self.news_agent.invoke({"input": query})
+        finally:
+            _session.reset(token)
+        return result["output"]
+
+    async def aanalyze_news(self, query: str, top_url: str, session: Optional[NewsSession] = None) -> str:
+        """
+        Async version of analyze_news, the tools of the agent run on the event loop.
         """
-        global top_news
-        top_news = " ".join(top_url.split("\n")).replace("*", "")
+        session = session or NewsSession()
+        session.top_news = " ".join(top_url.split("\n")).replace("*", "")
 
-        news_agent = self.create_news_analysis_agent()
-        result = news_agent.invoke({"input": query})
+        token = _session.set(session)
+        try:
+            result = await self.news_agent.ainvoke({"input": query})
+        finally:
+            _session.reset(token)
         return result["output"]
     
 
@@ -1,26 +1,68 @@
 import os
 import pandas as pd
 import numpy as np
+from contextvars import ContextVar
+from dataclasses import dataclass
 from typing import Annotated, Dict, List, Optional, Sequence
 
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder, PromptTemplate
 from langchain_core.tools import tool, Tool
-from langchain_openai import ChatOpenAI
 from langchain.agents import AgentExecutor, create_tool_calling_agent
 from app.agentsV2.settings import BASE_MODEL
+from app.llm import get_llm
+
+
+# client shared by every call of the tools
+llm = get_llm(BASE_MODEL)
+
+
+@dataclass
+class OptionsSession:
+    """State of one analysis shared by the tools, instead of class attributes."""
+    event: str = "" # description of the market event
+    analytics_result: str = "" # market analytics, replaced by the LLM analytics once computed
+
+
+# session of the running analysis, every thread and asyncio task sees its own
+_session: ContextVar[Optional[OptionsSession]] = ContextVar("options_session", default=None)
+
+
+def current_session() -> OptionsSession:
+    return _session.get() or OptionsSession()
+
+
+ANALYTICS_PROMPT = PromptTemplate(
+    input_variables=["analytics", "user_query", "event"],
+    template="""Analyze market data for event: {event}
+               Provide insights based on this analytics:
+               {analytics}
+               Answer question: {user_query}"""
+)
+
+DEBATE_PROMPT = PromptTemplate(
+    input_variables=["analytics", "argument"],
+    template="""Counter or support this argument using market analytics:
+               Argument: {argument}
+               
+               Market Analytics:
+               {analytics}
+               
+               Provide detailed response with numerical evidence:"""
+)
 
 
 class AgentOptionsAnalyzer:
-    analytics_result_llm = None
-    current_event = None
 
-    def __init__(self, market_data):
+    def __init__(self, market_data: Optional[pd.DataFrame] = None):
         """
         Initializes the market analysis agent.
-        Loads and processes trading data.
+        The agent executor is built once, trading data can be given per call of analyze_and_debate.
+
+        Args:
+            market_data (Optional[pd.DataFrame]): default trading data with date, yes and no columns
         """
-        self.df = market_data
-        self.clean_data()
+        self.df = self.clean_data(market_data) if market_data is not None else None
+        self.market_agent = self.create_market_agent()
 
     @staticmethod
     @tool
@@ -28,27 +70,37 @@ class AgentOptionsAnalyzer:
         """
         Use this tool to provide detailed analytics for a given question.
         """
-        llm = ChatOpenAI(model=BASE_MODEL)
-
-        prompt = PromptTemplate(
-            input_variables=["analytics", "user_query", "event"],
-            template="""Analyze market data for event: {event}
-                       Provide insights based on this analytics:
-                       {analytics}
-                       Answer question: {user_query}"""
-        )
 
-        chain = prompt | llm 
+        chain = ANALYTICS_PROMPT | llm 
 
+        session = current_session()
         res = chain.invoke({
-            "analytics": str(AgentOptionsAnalyzer.analytics_result_llm),
+            "analytics": str(session.analytics_result),
             "user_query": str(event_name),
-            "event": str(AgentOptionsAnalyzer.current_event)
+            "event": str(session.event)
         })
 
-        AgentOptionsAnalyzer.analytics_result_llm = res.content
+        session.analytics_result = res.content
         
-        return AgentOptionsAnalyzer.analytics_result_llm
+        return session.analytics_result
+
+    @staticmethod
+    async def allm_analytics(event_name: str) -> str:
+        """
+        Async version of llm_analytics.
+        """
+        chain = ANALYTICS_PROMPT | llm
+
+        session = current_session()
+        res = await chain.ainvoke({
+            "analytics": str(session.analytics_result),
+            "user_query": str(event_name),
+            "event": str(session.event)
+        })
+
+        session.analytics_result = res.content
+
+        return session.analytics_result
 
     @staticmethod
     @tool
@@ -56,60 +108,65 @@ class AgentOptionsAnalyzer:
         """
         Tool for debating with another agent using market data insights.
         """
-        llm = ChatOpenAI(model=BASE_MODEL)
-
-        prompt = PromptTemplate(
-            input_variables=["analytics", "argument"],
-            template="""Counter or support this argument using market analytics:
-                       Argument: {argument}
-                       
-                       Market Analytics:
-                       {analytics}
-                       
-                       Provide detailed response with numerical evidence:"""
-        )
 
-        chain = prompt | llm
+        chain = DEBATE_PROMPT | llm
 
         res = chain.invoke({
-            "analytics": str(AgentOptionsAnalyzer.analytics_result_llm),
+            "analytics": str(current_session().analytics_result),
             "argument": str(argument)
         })
         
         return res.content
 
-    def clean_data(self):
+    @staticmethod
+    async def adebate_tool(argument: str) -> str:
+        """
+        Async version of debate_tool.
+        """
+        chain = DEBATE_PROMPT | llm
+
+        res = await chain.ainvoke({
+            "analytics": str(current_session().analytics_result),
+            "argument": str(argument)
+        })
+
+        return res.content
+
+    @staticmethod
+    def clean_data(market_data: pd.DataFrame) -> pd.DataFrame:
         """
-        Cleans and processes market data.
+        Cleans and processes market data, the given frame is not modified.
         """
-        if 'Unnamed: 0' in self.df.columns:
-            self.df.drop(columns=['Unnamed: 0'], inplace=True)
+        df = market_data.copy()
+        if 'Unnamed: 0' in df.columns:
+            df.drop(columns=['Unnamed: 0'], inplace=True)
         
         # Исправленный парсинг даты
         try:
-            self.df['date'] = pd.to_datetime(
-                self.df['date'], 
+            df['date'] = pd.to_datetime(
+                df['date'], 
                 format='%m-%d-%Y %H:%M',  # Новый формат для MM-DD-YYYY HH:MM
                 errors='coerce'
             )
         except ValueError:
-            self.df['date'] = pd.to_datetime(
-                self.df['date'], 
+            df['date'] = pd.to_datetime(
+                df['date'], 
                 format='%d-%m-%Y %H:%M',  # Альтернативный формат
                 errors='coerce'
             )
         
         # Заполнение пропусков
-        self.df['date'].ffill(inplace=True)
+        df['date'] = df['date'].ffill()
         
         for col in ['yes', 'no']:
-            self.df[col] = pd.to_numeric(self.df[col], errors='coerce')
-            self.df[col].fillna(method='ffill', inplace=True)
+            df[col] = pd.to_numeric(df[col], errors='coerce').ffill()
+        return df
 
-    def get_analytics(self) -> Dict[str, dict]:
+    def get_analytics(self, df: Optional[pd.DataFrame] = None) -> Dict[str, dict]:
         """
         Performs market data analysis including trends, volatility and correlations.
         """
+        df = self.df if df is None else df
         analytics = {
             'price_analysis': {},
             'trend_analysis': {},
@@ -119,7 +176,7 @@ class AgentOptionsAnalyzer:
 
         # Анализ ценовых данных
         for outcome in ['yes', 'no']:
-            series = self.df[outcome]
+            series = df[outcome]
             analytics['price_analysis'][outcome] = {
                 'current': round(series.iloc[-1], 3),
                 '30d_mean': round(series.tail(30).mean(), 3),
@@ -129,30 +186,30 @@ class AgentOptionsAnalyzer:
             }
 
         # Анализ трендов
-        analytics['trend_analysis'] = self._calculate_trends()
+        analytics['trend_analysis'] = self._calculate_trends(df)
 
         # Волатильность
         for outcome in ['yes', 'no']:
             analytics['volatility'][outcome] = round(
-                self.df[outcome].pct_change().std() * np.sqrt(365), 4  # Годовая волатильность
+                df[outcome].pct_change().std() * np.sqrt(365), 4  # Годовая волатильность
             )
 
         # Корреляции
         analytics['correlations'] = {
-            'yes_no': round(self.df['yes'].corr(self.df['no']), 2)
+            'yes_no': round(df['yes'].corr(df['no']), 2)
         }
 
         return analytics
 
-    def _calculate_trends(self) -> dict:
+    def _calculate_trends(self, df: pd.DataFrame) -> dict:
         """
         Calculates price trends using moving averages.
         """
         trends = {}
-        window_size = min(7, len(self.df))
+        window_size = min(7, len(df))
         
         for outcome in ['yes', 'no']:
-            series = self.df[outcome]
+            series = df[outcome]
             short_ma = series.rolling(window=window_size).mean()
             long_ma = series.rolling(window=window_size*2).mean()
             
@@ -167,17 +224,19 @@ class AgentOptionsAnalyzer:
         """
         Creates an agent specialized in market data analysis.
         """
-        llm = ChatOpenAI(model=BASE_MODEL, temperature=0.2)
+        llm = get_llm(BASE_MODEL, temperature=0.2)
 
         tools = [
             Tool(
                 name="Market_Debate",
                 func=self.debate_tool,
+                coroutine=self.adebate_tool,
                 description="Use for debates about market predictions"
             ),
             Tool(
                 name="Market_Analytics",
                 func=self.llm_analytics,
+                coroutine=self.allm_analytics,
                 description="Provides analysis of prediction market trends"
             )
         ]
@@ -209,21 +268,48 @@ class AgentOptionsAnalyzer:
             handle_parsing_errors=True
         )
 
-    def analyze_and_debate(self, query: str, event_description: str) -> str:
+    def analyze_and_debate(self, query: str, event_description: str, market_data: Optional[pd.DataFrame] = None) -> str:
         """
         Executes full analysis and debate cycle for market data.
+
+        Args:
+            query (str): question or argument of the other agent
+            event_description (str): description of the market event
+            market_data (Optional[pd.DataFrame]): trading data of this call, defaults to the data given at init
         """
+        token = None
         try:
-            AgentOptionsAnalyzer.current_event = event_description
-            analysis = self.get_analytics()
-            AgentOptionsAnalyzer.analytics_result_llm = str(analysis)
+            df = self.clean_data(market_data) if market_data is not None else self.df
+            analysis = self.get_analytics(df)
+            token = _session.set(OptionsSession(event=event_description, analytics_result=str(analysis)))
 
-            market_agent = self.create_market_agent()
-            result = market_agent.invoke({"input": query})
+            result = self.market_agent.invoke({"input": query})
             
             return result["output"]
         except Exception as e:
             return f"Analysis error: {str(e)}"
+        finally:
+            if token is not None:
+                _session.reset(token)
+
+    async def aanalyze_and_debate(self, query: str, event_description: str, market_data: Optional[pd.DataFrame] = None) -> str:
+        """
+        Async version of analyze_and_debate, the tools of the agent run on the event loop.
+        """
+        token = None
+        try:
+            df = self.clean_data(market_data) if market_data is not None else self.df
+            analysis = self.get_analytics(df)
+            token = _session.set(OptionsSession(event=event_description, analytics_result=str(analysis)))
+
+            result = await self.market_agent.ainvoke({"input": query})
+
+            return result["output"]
+        except Exception as e:
+            return f"Analysis error: {str(e)}"
+        finally:
+            if token is not None:
+                _session.reset(token)
 
 if __name__ == "__main__":
     try:
@@ -1,18 +1,62 @@
 import os
 from typing import Annotated, Dict, List, Optional, Sequence
 
-from langchain_community.tools.tavily_search import TavilySearchResults
 from langchain_core.prompts import (
     ChatPromptTemplate,
     MessagesPlaceholder,
 )
 from langchain_core.tools import tool, Tool
-from langchain_openai import ChatOpenAI
 from langchain.agents import AgentExecutor, create_tool_calling_agent
+from app.agentsV2.search import asearch, search
 from app.agentsV2.settings import BASE_MODEL
+from app.agentsV2.source_cache import SourceCache
+from app.llm import get_llm
+
+
+# client shared by every call of the tools
+llm = get_llm(BASE_MODEL, temperature=0.2)
+
+REFRAMING_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """
+    Task: Using this format, reframe the following query to cover broader aspects
+    of the topic for finding top sites.
+    
+    Based on the user's query, reframe it to cover broader aspects of the topic.
+    The reframed query should contain keywords and related topics that will help
+    find the most authoritative and relevant sources.
+
+    For example:
+    Input: "Will Bitcoin reach 100k"
+    Output: "Top sites about cryptocurrencies, Bitcoin and price predictions"
+
+    Input: "Will Spartak become champion?"
+    Output: "Top sites about football, Russian football clubs and championship predictions"
+
+    Input: "What are oil price forecasts for 2025?"
+    Output: "Top sites about commodity markets, oil and energy resource price forecasts"
+
+    Input: "Best investment strategies in 2025"
+    Output: "Top sites about investments, financial strategies and economic forecasts"
+    """),
+    ("human", "{request_from_user}")
+])
+
+TOP_URLS_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", "List the top 10 most trustworthy websites that should be prioritized.Only websites names"),
+    ("human", "{contents}")
+])
+
 
 class AgentTopNews:
     """Agent class for analyzing and retrieving top news sources."""
+
+    def __init__(self, cache: Optional[SourceCache] = None):
+        """
+        Args:
+            cache (Optional[SourceCache]): cache of the sources per reframed topic
+        """
+        self.cache = cache
+        self.news_agent = self.create_news_agent()
     
     @staticmethod
     @tool
@@ -26,40 +70,19 @@ class AgentTopNews:
         Returns:
             str: The reframed query optimized for news source search.
         """
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", """
-            Task: Using this format, reframe the following query to cover broader aspects
-            of the topic for finding top sites.
-            
-            Based on the user's query, reframe it to cover broader aspects of the topic.
-            The reframed query should contain keywords and related topics that will help
-            find the most authoritative and relevant sources.
-
-            For example:
-            Input: "Will Bitcoin reach 100k"
-            Output: "Top sites about cryptocurrencies, Bitcoin and price predictions"
-
-            Input: "Will Spartak become champion?"
-            Output: "Top sites about football, Russian football clubs and championship predictions"
-
-            Input: "What are oil price forecasts for 2025?"
-            Output: "Top sites about commodity markets, oil and energy resource price forecasts"
-
-            Input: "Best investment strategies in 2025"
-            Output: "Top sites about investments, financial strategies and economic forecasts"
-            """),
-            ("human", "{request_from_user}")
-        ])
-
-        llm = ChatOpenAI(
-            model=BASE_MODEL,
-            temperature=0.2
-        )
-
-        chain = prompt | llm
+        chain = REFRAMING_PROMPT | llm
         response = chain.invoke({"request_from_user": query})
         return response.content
 
+    @staticmethod
+    async def aquery_reframing(query: str) -> str:
+        """
+        Async version of query_reframing.
+        """
+        chain = REFRAMING_PROMPT | llm
+        response = await chain.ainvoke({"request_from_user": query})
+        return response.content
+
     @staticmethod
     @tool
     def top_web_urls(query: Annotated[str, "Reframing Query"]) -> str:
@@ -72,32 +95,28 @@ class AgentTopNews:
         Returns:
             str: Analyzed list of top websites.
         """
-        all_content = ""
-        search_tool = TavilySearchResults(
-            max_results=10,
-            search_depth="advanced",
-            include_answer=True,
-            include_raw_content=True,
-            include_images=False
-        )
-
-        search_results = search_tool.invoke({"query": query})
+        # pages are only read to rank the sites, the news agent may still summarize them
+        search_results = search(query, deduplicate=False)
         all_content = "\n".join(
             result["content"] for result in search_results
         )
 
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", "List the top 10 most trustworthy websites that should be prioritized.Only websites names"),
-            ("human", "{contents}")
-        ])
+        chain = TOP_URLS_PROMPT | llm
+        response = chain.invoke({"contents": all_content})
+        return response.content
 
-        llm = ChatOpenAI(
-            model=BASE_MODEL,
-            temperature=0.2
+    @staticmethod
+    async def atop_web_urls(query: str) -> str:
+        """
+        Async version of top_web_urls.
+        """
+        search_results = await asearch(query, deduplicate=False)
+        all_content = "\n".join(
+            result["content"] for result in search_results
         )
 
-        chain = prompt | llm
-        response = chain.invoke({"contents": all_content})
+        chain = TOP_URLS_PROMPT | llm
+        response = await chain.ainvoke({"contents": all_content})
         return response.content
 
     def create_news_agent(self) -> AgentExecutor:
@@ -107,17 +126,19 @@ class AgentTopNews:
         Returns:
             AgentExecutor: Configured agent executor for news analysis.
         """
-        llm = ChatOpenAI(model=BASE_MODEL, temperature=0.9)
+        llm = get_llm(BASE_MODEL, temperature=0.9)
 
         tools = [
             Tool(
                 name="Query_Reframing",
                 func=self.query_reframing,
+                coroutine=self.aquery_reframing,
                 description="Reframing user query for site search"
             ),
             Tool(
                 name="Top_urls",
                 func=self.top_web_urls,
+                coroutine=self.atop_web_urls,
                 description="Get list of top news channels"
             )
         ]
@@ -161,9 +182,29 @@ class AgentTopNews:
         Returns:
             str: Analysis results including top news sources.
         """
-        news_agent = self.create_news_agent()
-        result = news_agent.invoke({"input": user_request})
-        return result["output"]
+        if self.cache is None:
+            return self.news_agent.invoke({"input": user_request})["output"]
+
+        topic = self.query_reframing.invoke({"query": user_request})
+        top_news = self.cache.get(topic)
+        if top_news is None:
+            top_news = self.news_agent.invoke({"input": user_request})["output"]
+            self.cache.set(topic, top_news)
+        return top_news
+
+    async def aget_top_news(self, user_request: str) -> str:
+        """
+        Async version of get_top_news.
+        """
+        if self.cache is None:
+            return (await self.news_agent.ainvoke({"input": user_request}))["output"]
+
+        topic = await self.aquery_reframing(user_request)
+        top_news = await self.cache.aget(topic)
+        if top_news is None:
+            top_news = (await self.news_agent.ainvoke({"input": user_request}))["output"]
+            await self.cache.aset(topic, top_news)
+        return top_news
 
 
 
@@ -1,34 +1,80 @@
 import json
+import uuid
+import sqlite3
+import logging
+import operator
 import re
 
-from typing import TypedDict, Dict, List
+from typing import Annotated, TypedDict, Dict, List, Optional
 from enum import Enum
 
 import pandas as pd
 
-from langgraph.graph import StateGraph
-from langchain_openai import ChatOpenAI
+from langgraph.checkpoint.sqlite import SqliteSaver
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+from langgraph.graph import END, START, StateGraph
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableLambda
 from langchain.agents import AgentExecutor
 
 
 from app.agents.base_agent import BasePredictorAgent
-from app.agentsV2.agent_get_news import NewsAnalysisAgent
+from app.agentsV2.agent_get_news import NewsAnalysisAgent, NewsSession
 from app.agentsV2.agent_optional_analyze import AgentOptionsAnalyzer
 from app.agentsV2.agent_sort_url import AgentTopNews
-from app.agentsV2.settings import MAIN_MODEL
+from app.agentsV2.convergence import has_converged
+from app.agentsV2.digest import aupdate_digest, empty_digest, format_digest, update_digest
+from app.agentsV2.search import search_session
+from app.agentsV2.source_cache import SourceCache
+from app.agentsV2.tag_sources import TagSourceTable
+from app.agentsV2.settings import CONVERGENCE_TOLERANCE, DEBATE_TURNS, MAIN_MODEL
+from app.llm import get_llm
+from app.metrics import LatencyRecorder
+
+
+logger = logging.getLogger(__name__)
 
 
 class AgentState(TypedDict):
     user_request: str
+    event: str # description of the market event
+    market_data: List[Dict] # price history records with date, yes and no
+    tags: List[str] # market tags, used to look up the trusted sources
     top_news: str
+    news_analytics: str # last news summary of the news agent, kept between its turns
     agent_news: str
     agent_option: str
+    news_digest: Dict # claims, numbers and probability of the news agent, see digest.update_digest
+    option_digest: Dict # same for the options agent
     final_analysis: str
-    messages: List[Dict[str, str]]
+    messages: Annotated[List[Dict[str, str]], operator.add] # appended by the parallel branches
+    estimates: Annotated[List[Dict], operator.add] # probability of every turn from the agent digest, with agent and probability
     current_turn: int
 
 
+FINAL_ANALYSIS_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """
+    Task: Provide a clear answer to the user's question based on the arguments from both agents.
+    Your explanation should be built on facts presented by both agents.
+
+    After analysis, format your final answer as a JSON string with this structure:
+    {{
+        "probabilities": {{
+            "positive": number between 0 and 1,
+            "negative": number between 0 and 1
+        }},
+        "confidence": "high" or "medium" or "low",
+        "reasoning": ["reason 1", "reason 2", "reason 3"]
+    }}
+
+    Your response must be a valid JSON string. Base the probabilities and confidence on the strength
+    of evidence from both agents. Include key reasoning points that led to your conclusion.
+    """),
+    ("human", """User question: {user_request}
+    Arguments from both agents: {models_argument}""")
+])
+
+
 class AgentTurn(Enum):
     NEWS = "news"
     OPTION = "option"
@@ -37,28 +83,141 @@ class AgentTurn(Enum):
 
 class NewsAnalysisPredictorAgent(BasePredictorAgent):
 
-    def __init__(self, llm=None):
-        self._llm = llm or ChatOpenAI(model=MAIN_MODEL, temperature=0.7)
+    def __init__(
+        self,
+        llm=None,
+        metrics: Optional[LatencyRecorder] = None,
+        source_cache: Optional[SourceCache] = None,
+        tag_sources: Optional[TagSourceTable] = None,
+        checkpoint_path: Optional[str] = None,
+    ):
+        """
+        Args:
+            llm: model of the final analysis
+            metrics (Optional[LatencyRecorder]): recorder of the latency of every graph node
+            source_cache (Optional[SourceCache]): cache of the trusted sources of AgentTopNews
+            tag_sources (Optional[TagSourceTable]): precomputed trusted sources per market tag
+            checkpoint_path (Optional[str]): SQLite database of the graph checkpoints, predictions are not resumable if None
+        """
+        self._llm = llm or get_llm(MAIN_MODEL, temperature=0.7)
+        # every graph node is recorded as a "node.<name>" latency span
+        self.metrics = metrics or LatencyRecorder()
         super().__init__(self._llm)
+        # agents and graph are built once, per-call data flows through the graph state
+        self._top_news_agent = AgentTopNews(cache=source_cache)
+        self._tag_sources = tag_sources
+        self._news_agent = NewsAnalysisAgent()
+        self._options_agent = AgentOptionsAnalyzer()
+        self._graph = self._create_news_workflow()
+        # the state is saved after every node, an interrupted prediction resumes from its last completed node
+        self._checkpoint_path = checkpoint_path
+        self._checkpointer = SqliteSaver(sqlite3.connect(checkpoint_path, check_same_thread=False)) if checkpoint_path else None
+        self._workflow = self._graph.compile(checkpointer=self._checkpointer)
 
     def _create_agent(self) -> AgentExecutor:
         # Optional: Create agent executor if needed
         return None
 
-    def predict(self, question: str, description: str, data_frm: pd.DataFrame) -> Dict:
-        # Use existing workflow to generate prediction
-        workflow = self._create_news_workflow(data_frm, description)
-        
-        result = workflow.invoke({
+    def predict(
+        self,
+        question: str,
+        description: str,
+        data_frm: Optional[pd.DataFrame] = None,
+        tags: Optional[List[str]] = None,
+        thread_id: Optional[str] = None,
+    ) -> Dict:
+        """
+        Args:
+            thread_id (Optional[str]): checkpoint key of the prediction, e.g. "<market_id>:<cycle>".
+                A prediction interrupted with the same key is resumed instead of started again.
+        """
+        inputs = self._initial_state(question, description, data_frm, tags)
+        if self._checkpointer is None:
+            # a page found by one agent turn is not searched or summarized again by the next ones
+            with search_session():
+                return self._prediction(self._workflow.invoke(inputs))
+
+        config = self._thread_config(thread_id)
+        snapshot = self._workflow.get_state(config)
+        if snapshot.next or not snapshot.values:
+            with search_session():
+                values = self._workflow.invoke(self._resume_inputs(snapshot, inputs, config), config)
+        else:
+            # finished before the process stopped
+            values = snapshot.values
+        self._checkpointer.delete_thread(config["configurable"]["thread_id"])
+        return self._prediction(values)
+
+    async def apredict(
+        self,
+        question: str,
+        description: str,
+        data_frm: Optional[pd.DataFrame] = None,
+        tags: Optional[List[str]] = None,
+        thread_id: Optional[str] = None,
+    ) -> Dict:
+        """
+        Async version of predict, every LLM call and search of the graph runs on the event loop,
+        so one loop can run the predictions of many markets concurrently.
+        """
+        inputs = self._initial_state(question, description, data_frm, tags)
+        if self._checkpoint_path is None:
+            with search_session():
+                return self._prediction(await self._workflow.ainvoke(inputs))
+
+        # the async checkpointer is bound to the running event loop, the graph is compiled for it
+        async with AsyncSqliteSaver.from_conn_string(self._checkpoint_path) as checkpointer:
+            workflow = self._graph.compile(checkpointer=checkpointer)
+            config = self._thread_config(thread_id)
+            snapshot = await workflow.aget_state(config)
+            if snapshot.next or not snapshot.values:
+                with search_session():
+                    values = await workflow.ainvoke(self._resume_inputs(snapshot, inputs, config), config)
+            else:
+                values = snapshot.values
+            await checkpointer.adelete_thread(config["configurable"]["thread_id"])
+        return self._prediction(values)
+
+    def discard(self, thread_id: str):
+        """
+        Drop the checkpoint of an interrupted prediction which will not be resumed.
+        """
+        if self._checkpointer is not None:
+            self._checkpointer.delete_thread(thread_id)
+
+    @staticmethod
+    def _thread_config(thread_id: Optional[str]) -> Dict:
+        return {"configurable": {"thread_id": thread_id or uuid.uuid4().hex}}
+
+    @staticmethod
+    def _resume_inputs(snapshot, inputs: AgentState, config: Dict) -> Optional[AgentState]:
+        if not snapshot.next:
+            return inputs
+        # no input resumes the graph from its last checkpoint
+        logger.info(f"Resuming prediction {config['configurable']['thread_id']} at {', '.join(snapshot.next)}")
+        return None
+
+    @staticmethod
+    def _initial_state(question: str, description: str, data_frm: Optional[pd.DataFrame], tags: Optional[List[str]]) -> AgentState:
+        return {
             "user_request": question,
+            "event": description,
+            "market_data": data_frm.to_dict("records") if data_frm is not None else [],
+            "tags": tags or [],
             "top_news": "",
+            "news_analytics": "",
             "agent_news": "",
             "agent_option": "",
+            "news_digest": empty_digest(),
+            "option_digest": empty_digest(),
             "final_analysis": "",
             "messages": [],
+            "estimates": [],
             "current_turn": 0
-        })
-        
+        }
+
+    @staticmethod
+    def _prediction(result: Dict) -> Dict:
         return result.get("final_analysis", {
             "probabilities": {"positive": 0.5, "negative": 0.5},
             "confidence": "low",
@@ -66,9 +225,14 @@ class NewsAnalysisPredictorAgent(BasePredictorAgent):
         })
 
     def _should_continue_dialogue(self, state: AgentState) -> AgentTurn:
-        if state["current_turn"] >= 3:  
+        if state["current_turn"] >= DEBATE_TURNS:
             return AgentTurn.COMPLETE
-        
+        # another turn is only spent while it can still change the answer
+        if has_converged(state["estimates"], CONVERGENCE_TOLERANCE):
+            return AgentTurn.COMPLETE
+        if state["current_turn"] == 0:
+            return AgentTurn.NEWS
+
         last_message = state["messages"][-1] if state["messages"] else None
         if last_message:
             if last_message["agent"] == "news":
@@ -78,42 +242,23 @@ class NewsAnalysisPredictorAgent(BasePredictorAgent):
         
         return AgentTurn.NEWS
 
-    def _create_final_analysis(self, state: AgentState) -> AgentState:
-        messages_summary = "\n".join([
-            f"{msg['agent']}: {msg['content']}" 
-            for msg in state["messages"]
+    @staticmethod
+    def _final_analysis_inputs(state: AgentState) -> Dict[str, str]:
+        # the digests replace the full history, the prompt does not grow with the number of turns
+        messages_summary = "\n\n".join([
+            "NEWS AGENT:\n" + format_digest(state["news_digest"]),
+            "OPTIONS AGENT:\n" + format_digest(state["option_digest"]),
         ])
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", """
-            Task: Provide a clear answer to the user's question based on the arguments from both agents.
-            Your explanation should be built on facts presented by both agents.
-
-            After analysis, format your final answer as a JSON string with this structure:
-            {{
-                "probabilities": {{
-                    "positive": number between 0 and 1,
-                    "negative": number between 0 and 1
-                }},
-                "confidence": "high" or "medium" or "low",
-                "reasoning": ["reason 1", "reason 2", "reason 3"]
-            }}
-
-            Your response must be a valid JSON string. Base the probabilities and confidence on the strength
-            of evidence from both agents. Include key reasoning points that led to your conclusion.
-            """),
-                    ("human", """User question: {user_request}
-            Arguments from both agents: {models_argument}""")
-                ])
-
-        chain = prompt | self._llm
-        response = chain.invoke({
+        return {
             "user_request": state["user_request"],
             "models_argument": messages_summary
-        })
+        }
 
+    @staticmethod
+    def _parse_final_analysis(content: str) -> Dict:
         try:
             # Try to find JSON pattern
-            json_match = re.search(r'\{[\s\S]*\}', response.content)
+            json_match = re.search(r'\{[\s\S]*\}', content)
             if json_match:
                 analysis_result = json.loads(json_match.group())
             else:
@@ -121,7 +266,7 @@ class NewsAnalysisPredictorAgent(BasePredictorAgent):
                 analysis_result = {
                     "probabilities": {"positive": 0.5, "negative": 0.5},
                     "confidence": "low",
-                    "reasoning": [response.content.strip()]
+                    "reasoning": [content.strip()]
                 }
         except (json.JSONDecodeError, Exception) as e:
             analysis_result = {
@@ -130,81 +275,161 @@ class NewsAnalysisPredictorAgent(BasePredictorAgent):
                 "confidence": "low",
                 "reasoning": [f"Error occurred: {str(e)}"]
             }
+        return analysis_result
+
+    def _create_final_analysis(self, state: AgentState) -> Dict:
+        chain = FINAL_ANALYSIS_PROMPT | self._llm
+        response = chain.invoke(self._final_analysis_inputs(state))
+        return {"final_analysis": self._parse_final_analysis(response.content)}
+
+    async def _acreate_final_analysis(self, state: AgentState) -> Dict:
+        chain = FINAL_ANALYSIS_PROMPT | self._llm
+        response = await chain.ainvoke(self._final_analysis_inputs(state))
+        return {"final_analysis": self._parse_final_analysis(response.content)}
+
+    def _known_sources(self, state: AgentState) -> Optional[str]:
+        if self._tag_sources is not None and state["tags"]:
+            # known tags need no LLM call
+            sources = self._tag_sources.lookup(state["tags"])
+            if sources is not None:
+                return ", ".join(sources)
+        return None
+
+    def _get_top_news(self, state: AgentState) -> Dict:
+        return {"top_news": self._known_sources(state) or self._top_news_agent.get_top_news(state["user_request"])}
+
+    async def _aget_top_news(self, state: AgentState) -> Dict:
+        return {"top_news": self._known_sources(state) or await self._top_news_agent.aget_top_news(state["user_request"])}
 
-        state["final_analysis"] = analysis_result
-        return state
+    @staticmethod
+    def _news_update(session: NewsSession, analysis: str, digest: Dict) -> Dict:
+        return {
+            "news_analytics": session.analytics_result,
+            "agent_news": "NEWS AGENT DEBATE: " + analysis,
+            "news_digest": digest,
+            "messages": [{"agent": "news", "content": analysis}],
+            "estimates": [{"agent": "news", "probability": digest["probability"]}],
+        }
 
-    def _create_news_workflow(self, data_frm: pd.DataFrame, event: str):
+    @staticmethod
+    def _option_update(analysis: str, digest: Dict) -> Dict:
+        return {
+            "agent_option": "OPTIONS AGENT DEBATE: " + analysis,
+            "option_digest": digest,
+            "messages": [{"agent": "option", "content": analysis}],
+            "estimates": [{"agent": "option", "probability": digest["probability"]}],
+        }
+
+    def _run_news_agent(self, message: str, state: AgentState) -> Dict:
+        session = NewsSession(analytics_result=state["news_analytics"])
+        analysis = self._news_agent.analyze_news(message, state["top_news"], session)
+        digest = update_digest(state["user_request"], state["news_digest"], analysis)
+        return self._news_update(session, analysis, digest)
+
+    async def _arun_news_agent(self, message: str, state: AgentState) -> Dict:
+        session = NewsSession(analytics_result=state["news_analytics"])
+        analysis = await self._news_agent.aanalyze_news(message, state["top_news"], session)
+        digest = await aupdate_digest(state["user_request"], state["news_digest"], analysis)
+        return self._news_update(session, analysis, digest)
+
+    def _run_option_agent(self, message: str, state: AgentState) -> Dict:
+        market_data = pd.DataFrame(state["market_data"]) if state["market_data"] else None
+        analysis = self._options_agent.analyze_and_debate(message, state["event"], market_data)
+        digest = update_digest(state["user_request"], state["option_digest"], analysis)
+        return self._option_update(analysis, digest)
+
+    async def _arun_option_agent(self, message: str, state: AgentState) -> Dict:
+        market_data = pd.DataFrame(state["market_data"]) if state["market_data"] else None
+        analysis = await self._options_agent.aanalyze_and_debate(message, state["event"], market_data)
+        digest = await aupdate_digest(state["user_request"], state["option_digest"], analysis)
+        return self._option_update(analysis, digest)
+
+    def _news_opening(self, state: AgentState) -> Dict:
+        return self._run_news_agent(state["user_request"], state)
+
+    async def _anews_opening(self, state: AgentState) -> Dict:
+        return await self._arun_news_agent(state["user_request"], state)
+
+    def _option_opening(self, state: AgentState) -> Dict:
+        return self._run_option_agent(state["user_request"], state)
+
+    async def _aoption_opening(self, state: AgentState) -> Dict:
+        return await self._arun_option_agent(state["user_request"], state)
+
+    def _compare_openings(self, state: AgentState) -> Dict:
+        # join of the opening turns, the debate only starts if they disagree
+        return {}
+
+    # rebuttals answer the digest of the other agent, not its growing transcript
+    def _news_rebuttal(self, state: AgentState) -> Dict:
+        update = self._run_news_agent("OPTIONS AGENT DEBATE:\n" + format_digest(state["option_digest"]), state)
+        update["current_turn"] = state["current_turn"] + 1
+        return update
+
+    async def _anews_rebuttal(self, state: AgentState) -> Dict:
+        update = await self._arun_news_agent("OPTIONS AGENT DEBATE:\n" + format_digest(state["option_digest"]), state)
+        update["current_turn"] = state["current_turn"] + 1
+        return update
+
+    def _option_rebuttal(self, state: AgentState) -> Dict:
+        update = self._run_option_agent("NEWS AGENT DEBATE:\n" + format_digest(state["news_digest"]), state)
+        update["current_turn"] = state["current_turn"] + 1
+        return update
+
+    async def _aoption_rebuttal(self, state: AgentState) -> Dict:
+        update = await self._arun_option_agent("NEWS AGENT DEBATE:\n" + format_digest(state["news_digest"]), state)
+        update["current_turn"] = state["current_turn"] + 1
+        return update
+
+    def _create_news_workflow(self):
+        """
+        Debate graph, the opening turns of both agents only need the user request and run in parallel:
+
+            START -> get_top_news -> news_opening ---+
+            START -> option_opening -----------------+-> compare_openings -> news_rebuttal <-> option_rebuttal -> create_final_analysis
+
+        Nodes return partial state updates, the messages of the parallel branches are concatenated.
+        Every node has an async implementation, so the graph also runs with ainvoke, see apredict.
+        The graph is returned uncompiled, it is compiled with the checkpointer of the predictions.
+        Every turn is folded into the digest of its agent, rebuttals and the final analysis only
+        see the digests. The debate goes to the final analysis as soon as the probabilities of the
+        digests converge, at most after DEBATE_TURNS rebuttals.
+        """
         workflow = StateGraph(AgentState)
-        
-        def get_top_news(state: AgentState) -> AgentState:
-            agent = AgentTopNews()
-            state["top_news"] = agent.get_top_news(state["user_request"])
-            state["messages"] = []
-            state["current_turn"] = 0
-            return state
-
-        def analyze_news(state: AgentState) -> AgentState:
-            agent = NewsAnalysisAgent()
-            
-            if state["agent_option"]:
-                if state["current_turn"] <= 5:
-                    state["current_turn"] += 1
-                    message = state["agent_option"]
-                else:
-                    return AgentTurn.COMPLETE
-            else:
-                message = state["user_request"]
-
-            analysis = agent.analyze_news(message, state["top_news"])
-            state["agent_news"] = "NEWS AGENT DEBATE: " + analysis
-            state["messages"].append({
-                "agent": "news",
-                "content": analysis
-            })
-            return state
-
-        def option_agent(state: AgentState) -> AgentState:
-            agent = AgentOptionsAnalyzer(data_frm)
-            if state["agent_news"]:
-                if state["current_turn"] <= 5:
-                    state["current_turn"] += 1
-                    message = state["agent_news"]
-                else:
-                    return AgentTurn.COMPLETE
-            else:
-                message = state["user_request"]
-
-            analysis = agent.analyze_and_debate(message, event)
-            state["agent_option"] = "OPTIONS AGENT DEBATE: " + analysis
-            state["messages"].append({
-                "agent": "option",
-                "content": analysis
-            })
-            return state
-
-        # Add nodes and configure workflow
-        workflow.add_node("get_top_news", get_top_news)
-        workflow.add_node("analyze_news", analyze_news)
-        workflow.add_node("option_agent", option_agent)
-        workflow.add_node("create_final_analysis", self._create_final_analysis)
-        
-        workflow.set_entry_point("get_top_news")
-        workflow.add_edge("get_top_news", "analyze_news")
-        workflow.add_edge("analyze_news", "option_agent")
-        
-        workflow.add_conditional_edges(
-            "option_agent",
-            self._should_continue_dialogue,
-            {
-                AgentTurn.NEWS: "analyze_news",
-                AgentTurn.OPTION: "option_agent",
-                AgentTurn.COMPLETE: "create_final_analysis"
-            }
-        )
-        
-        workflow.set_finish_point("create_final_analysis")
-        return workflow.compile()
+
+        # sync and async implementation of every node, used by invoke and ainvoke
+        nodes = {
+            "get_top_news": (self._get_top_news, self._aget_top_news),
+            "news_opening": (self._news_opening, self._anews_opening),
+            "option_opening": (self._option_opening, self._aoption_opening),
+            "compare_openings": (self._compare_openings, None),
+            "news_rebuttal": (self._news_rebuttal, self._anews_rebuttal),
+            "option_rebuttal": (self._option_rebuttal, self._aoption_rebuttal),
+            "create_final_analysis": (self._create_final_analysis, self._acreate_final_analysis),
+        }
+        for name, (node, anode) in nodes.items():
+            timed = self.metrics.timed(f"node.{name}")
+            workflow.add_node(name, RunnableLambda(timed(node), afunc=timed(anode) if anode else None, name=name))
+
+        workflow.add_edge(START, "get_top_news")
+        workflow.add_edge("get_top_news", "news_opening")
+        workflow.add_edge(START, "option_opening")
+        # rebuttals start once both openings are done
+        workflow.add_edge(["news_opening", "option_opening"], "compare_openings")
+
+        for node in ("compare_openings", "news_rebuttal", "option_rebuttal"):
+            workflow.add_conditional_edges(
+                node,
+                self._should_continue_dialogue,
+                {
+                    AgentTurn.NEWS: "news_rebuttal",
+                    AgentTurn.OPTION: "option_rebuttal",
+                    AgentTurn.COMPLETE: "create_final_analysis"
+                }
+            )
+
+        workflow.add_edge("create_final_analysis", END)
+        return workflow
 
 # Example usage
 if __name__ == "__main__":
@@ -0,0 +1,57 @@
+import re
+
+from typing import Dict, List, Optional
+
+
+PERCENT_PATTERN = re.compile(
+    r"(?:probability|chance|likelihood)[^.\n%]{0,60}?(\d{1,3}(?:\.\d+)?)\s*%"
+    r"|(\d{1,3}(?:\.\d+)?)\s*%\s*(?:probability|chance|likelihood)",
+    re.IGNORECASE,
+)
+DECIMAL_PATTERN = re.compile(r"(?:probability|chance|likelihood)[^.\n]{0,40}?\b(0?\.\d+|1\.0+)\b", re.IGNORECASE)
+
+
+def parse_probability(text: str) -> Optional[float]:
+    """
+    Last probability stated in the text, e.g. "a 65% chance" or "probability: 0.65".
+
+    Returns:
+        Optional[float]: probability between 0 and 1, None if the text states none
+    """
+    matches = [(match.end(), float(match.group(1) or match.group(2)) / 100) for match in PERCENT_PATTERN.finditer(text)]
+    matches += [(match.end(), float(match.group(1))) for match in DECIMAL_PATTERN.finditer(text)]
+    matches = [(end, value) for end, value in matches if 0 <= value <= 1]
+    if not matches:
+        return None
+    return max(matches)[1]
+
+
+def has_converged(estimates: List[Dict], tolerance: float) -> bool:
+    """
+    Whether more debate turns are unlikely to change the answer.
+
+    The debate has converged when the latest estimates of both agents are within tolerance
+    of each other, or when the agent that just spoke moved by no more than tolerance since
+    its previous turn, i.e. the rebuttal did not change its mind.
+
+    Args:
+        estimates (List[Dict]): estimates with agent and probability, in turn order
+        tolerance (float): max difference between two estimates considered equal
+
+    Returns:
+        bool: True if the debate can stop
+    """
+    history: Dict[str, List[float]] = {}
+    for estimate in estimates:
+        if estimate["probability"] is not None:
+            history.setdefault(estimate["agent"], []).append(estimate["probability"])
+
+    news, option = history.get("news", []), history.get("option", [])
+    if not news or not option:
+        return False
+    if abs(news[-1] - option[-1]) <= tolerance:
+        return True
+    if estimates[-1]["probability"] is None:
+        return False
+    values = history[estimates[-1]["agent"]]
+    return len(values) >= 2 and abs(values[-1] - values[-2]) <= tolerance
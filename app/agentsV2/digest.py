@@ -0,0 +1,102 @@
+import logging
+
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, Field
+from langchain_core.prompts import ChatPromptTemplate
+
+from app.agentsV2.convergence import parse_probability
+from app.agentsV2.settings import BASE_MODEL
+from app.agentsV2.tokens import truncate_tokens
+from app.llm import get_llm
+
+
+logger = logging.getLogger(__name__)
+
+llm = get_llm(BASE_MODEL, temperature=0)
+
+MAX_CLAIMS = 6
+MAX_NUMBERS = 8
+
+DIGEST_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """Maintain the digest of the position of a debate agent about a prediction market.
+    Merge the latest turn into the previous digest: keep the claims and figures still argued,
+    replace the ones the agent revised, drop repetitions. Keep the agent's current probability."""),
+    ("human", "Market question: {question}\n\nPrevious digest:\n{digest}\n\nLatest turn:\n{turn}"),
+])
+
+
+class DebateDigest(BaseModel):
+    """Position of one agent in the debate, rewritten after each of its turns."""
+    claims: List[str] = Field(description=f"up to {MAX_CLAIMS} key claims of the agent, most important first, one sentence each")
+    numbers: List[str] = Field(description=f"up to {MAX_NUMBERS} figures the claims rely on, each with what it measures and its source")
+    probability: Optional[float] = Field(description="probability between 0 and 1 that the market resolves to the positive outcome, as currently argued by the agent")
+
+
+def empty_digest() -> Dict:
+    return {"claims": [], "numbers": [], "probability": None}
+
+
+def update_digest(question: str, digest: Optional[Dict], turn: str) -> Dict:
+    """
+    Fold the latest turn of an agent into its digest.
+
+    The digest has a bounded size, so the prompts built from it stay flat however long the debate runs.
+    Without a structured answer, the turn is appended as a truncated claim.
+
+    Args:
+        question (str): market question
+        digest (Optional[Dict]): digest of the previous turns of the agent
+        turn (str): latest output of the agent
+
+    Returns:
+        Dict: digest with claims, numbers and probability
+    """
+    digest = digest or empty_digest()
+    chain = DIGEST_PROMPT | llm.with_structured_output(DebateDigest)
+    try:
+        result = chain.invoke({"question": question, "digest": format_digest(digest), "turn": turn})
+    except Exception as e:
+        logger.warning(f"Failed to update the debate digest: {e}")
+        return _append_turn(digest, turn)
+    return _from_result(result)
+
+
+async def aupdate_digest(question: str, digest: Optional[Dict], turn: str) -> Dict:
+    """
+    Async version of update_digest.
+    """
+    digest = digest or empty_digest()
+    chain = DIGEST_PROMPT | llm.with_structured_output(DebateDigest)
+    try:
+        result = await chain.ainvoke({"question": question, "digest": format_digest(digest), "turn": turn})
+    except Exception as e:
+        logger.warning(f"Failed to update the debate digest: {e}")
+        return _append_turn(digest, turn)
+    return _from_result(result)
+
+
+def _from_result(result: DebateDigest) -> Dict:
+    probability = result.probability
+    return {
+        "claims": result.claims[:MAX_CLAIMS],
+        "numbers": result.numbers[:MAX_NUMBERS],
+        "probability": min(max(probability, 0.0), 1.0) if probability is not None else None,
+    }
+
+
+def _append_turn(digest: Dict, turn: str) -> Dict:
+    probability = parse_probability(turn)
+    return {
+        "claims": (digest["claims"] + [truncate_tokens(turn, 150)])[-MAX_CLAIMS:],
+        "numbers": digest["numbers"],
+        "probability": probability if probability is not None else digest["probability"],
+    }
+
+
+def format_digest(digest: Dict) -> str:
+    lines = ["Claims:"] + [f"- {claim}" for claim in digest["claims"]]
+    lines += ["Figures:"] + [f"- {number}" for number in digest["numbers"]]
+    probability = digest["probability"]
+    lines.append(f"Probability of the positive outcome: {probability:.0%}" if probability is not None else "Probability of the positive outcome: not stated")
+    return "\n".join(lines)
@@ -0,0 +1,118 @@
+import re
+import math
+
+from collections import Counter
+from typing import Dict, List
+
+from app.agentsV2.tokens import count_tokens, truncate_tokens
+
+
+SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+|\n{2,}")
+WORD_PATTERN = re.compile(r"\w+")
+STOP_WORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "in", "is", "it",
+    "of", "on", "or", "that", "the", "this", "to", "was", "were", "will", "with",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    return [word for word in WORD_PATTERN.findall(text.lower()) if word not in STOP_WORDS]
+
+
+def split_passages(text: str, max_tokens: int = 120) -> List[str]:
+    """
+    Split a page into passages of consecutive sentences of up to max_tokens.
+    """
+    passages: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    for sentence in SENTENCE_PATTERN.split(text):
+        sentence = " ".join(sentence.split())
+        if not sentence:
+            continue
+        tokens = count_tokens(sentence)
+        if tokens > max_tokens:
+            sentence, tokens = truncate_tokens(sentence, max_tokens), max_tokens
+        if current and current_tokens + tokens > max_tokens:
+            passages.append(" ".join(current))
+            current, current_tokens = [], 0
+        current.append(sentence)
+        current_tokens += tokens
+    if current:
+        passages.append(" ".join(current))
+    return passages
+
+
+class BM25:
+    """
+    Okapi BM25 ranking of a small corpus, built in memory for every search.
+    """
+    def __init__(self, corpus: List[List[str]], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.term_frequencies = [Counter(document) for document in corpus]
+        self.lengths = [len(document) for document in corpus]
+        self.average_length = sum(self.lengths) / len(corpus) if corpus else 0
+        document_frequencies = Counter(term for document in corpus for term in set(document))
+        self.idf = {
+            term: math.log(1 + (len(corpus) - frequency + 0.5) / (frequency + 0.5))
+            for term, frequency in document_frequencies.items()
+        }
+
+    def scores(self, query: List[str]) -> List[float]:
+        scores = []
+        for frequencies, length in zip(self.term_frequencies, self.lengths):
+            score = 0.0
+            for term in query:
+                frequency = frequencies.get(term)
+                if frequency:
+                    norm = self.k1 * (1 - self.b + self.b * length / (self.average_length or 1))
+                    score += self.idf[term] * frequency * (self.k1 + 1) / (frequency + norm)
+            scores.append(score)
+        return scores
+
+
+def extract_passages(query: str, documents: List[str], max_tokens: int = 600, passage_tokens: int = 120) -> List[str]:
+    """
+    Keep the passages of every document most relevant to the query.
+
+    Passages of all documents are ranked together with BM25, then the matching passages
+    of every document are kept within max_tokens and joined in their original order.
+    A document without any matching passage keeps its first passages.
+
+    Args:
+        query (str): market question
+        documents (List[str]): page contents
+        max_tokens (int): token budget of every document
+        passage_tokens (int): max size of a passage in tokens
+
+    Returns:
+        List[str]: extract of every document, in the order of documents
+    """
+    passages: List[List[str]] = [split_passages(document, passage_tokens) for document in documents]
+    flat = [(i, j, passage) for i, document in enumerate(passages) for j, passage in enumerate(document)]
+    if not flat:
+        return ["" for _ in documents]
+
+    scores = BM25([tokenize(passage) for _, _, passage in flat]).scores(tokenize(query))
+    selected: Dict[int, List[int]] = {i: [] for i in range(len(documents))}
+    used = [0] * len(documents)
+
+    def select(k: int):
+        i, j, passage = flat[k]
+        tokens = count_tokens(passage)
+        if used[i] + tokens <= max_tokens:
+            selected[i].append(j)
+            used[i] += tokens
+
+    # best matching passages first, ties keep the page order
+    for k in sorted(range(len(flat)), key=lambda k: -scores[k]):
+        if scores[k] > 0:
+            select(k)
+    # pages without any match keep their lead
+    matched = {flat[k][0] for k in range(len(flat)) if scores[k] > 0}
+    for k, (i, _, _) in enumerate(flat):
+        if i not in matched:
+            select(k)
+
+    return ["\n...\n".join(passages[i][j] for j in sorted(selected[i])) for i in range(len(documents))]
@@ -0,0 +1,158 @@
+import re
+import time
+import asyncio
+import logging
+import threading
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Set
+
+from langchain_community.tools.tavily_search import TavilySearchResults
+
+from app.cache import SQLiteCache, fingerprint
+from app.agentsV2.settings import SEARCH_CACHE
+
+
+logger = logging.getLogger(__name__)
+
+search_tool = TavilySearchResults(
+    max_results=10,
+    search_depth="advanced",
+    include_answer=True,
+    include_raw_content=True,
+    include_images=False
+)
+
+
+def normalize_query(query: str) -> str:
+    return re.sub(r"\s+", " ", query.lower()).strip()
+
+
+def normalize_url(url: str) -> str:
+    return url.split("#")[0].rstrip("/")
+
+
+class SearchCache:
+    """
+    On-disk cache of search results.
+
+    Queries are keyed by the normalized query and a time bucket, so a query is searched
+    again once per bucket. Results only reference their pages by url, the page contents
+    are stored once in a content store shared by all queries.
+    """
+    def __init__(self, path: str, bucket: int = 60 * 60 * 6, ttl: Optional[int] = 60 * 60 * 24 * 7, max_entries: Optional[int] = 10000):
+        """
+        Args:
+            path (str): path of the SQLite database
+            bucket (int): length of a time bucket in seconds
+            ttl (Optional[int]): time to live of queries and pages in seconds
+            max_entries (Optional[int]): max number of cached queries, ten times more pages are kept
+        """
+        self.bucket = bucket
+        self.queries = SQLiteCache(path, table="search_queries", ttl=ttl, max_entries=max_entries)
+        self.contents = SQLiteCache(path, table="search_contents", ttl=ttl, max_entries=max_entries * 10 if max_entries else None)
+
+    def _key(self, query: str, now: Optional[float] = None) -> str:
+        return fingerprint(normalize_query(query), int((now or time.time()) // self.bucket))
+
+    def get(self, query: str, now: Optional[float] = None) -> Optional[List[Dict]]:
+        urls = self.queries.get(self._key(query, now))
+        if urls is None:
+            return None
+        results = [self.contents.get(url) for url in urls]
+        if any(result is None for result in results):
+            # a page was evicted, search again
+            return None
+        return results
+
+    def set(self, query: str, results: List[Dict], now: Optional[float] = None):
+        for result in results:
+            self.contents.set(normalize_url(result['url']), result)
+        self.queries.set(self._key(query, now), [normalize_url(result['url']) for result in results])
+
+
+@dataclass
+class SearchSession:
+    """Urls returned during one prediction, every page is returned once."""
+    seen_urls: Set[str] = field(default_factory=set)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def claim(self, results: List[Dict]) -> List[Dict]:
+        with self.lock:
+            fresh = []
+            for result in results:
+                url = normalize_url(result['url'])
+                if url not in self.seen_urls:
+                    self.seen_urls.add(url)
+                    fresh.append(result)
+            return fresh
+
+
+# session of the running prediction, shared by the threads of its graph
+_session: ContextVar[Optional[SearchSession]] = ContextVar("search_session", default=None)
+
+
+@contextmanager
+def search_session() -> Iterator[SearchSession]:
+    """
+    Deduplicate the urls of every search made inside the block.
+    """
+    session = SearchSession()
+    token = _session.set(session)
+    try:
+        yield session
+    finally:
+        _session.reset(token)
+
+
+search_cache = SearchCache(SEARCH_CACHE) if SEARCH_CACHE else None
+
+
+def search(query: str, deduplicate: bool = True) -> List[Dict]:
+    """
+    Search the web, served from the search cache when enabled.
+    Inside a search session, pages returned by a previous search are left out.
+
+    Args:
+        query (str): search query
+        deduplicate (bool): leave out the pages already returned in the search session
+
+    Returns:
+        List[Dict]: results with url and content
+    """
+    results = search_cache.get(query) if search_cache is not None else None
+    if results is None:
+        results = _store(query, search_tool.invoke({"query": query}))
+    return _claim(results, deduplicate)
+
+
+async def asearch(query: str, deduplicate: bool = True) -> List[Dict]:
+    """
+    Async version of search, neither the web search nor the search cache block the event loop.
+    """
+    results = await asyncio.to_thread(search_cache.get, query) if search_cache is not None else None
+    if results is None:
+        results = await asyncio.to_thread(_store, query, await search_tool.ainvoke({"query": query}))
+    return _claim(results, deduplicate)
+
+
+def _store(query: str, results) -> List[Dict]:
+    if not isinstance(results, list):
+        logger.error(f"Search failed for {query!r}: {results}")
+        return []
+    results = [result for result in results if isinstance(result, dict) and result.get('url')]
+    if search_cache is not None:
+        search_cache.set(query, results)
+    return results
+
+
+def _claim(results: List[Dict], deduplicate: bool) -> List[Dict]:
+    session = _session.get()
+    if session is not None and deduplicate:
+        fresh = session.claim(results)
+        if len(fresh) < len(results):
+            logger.info(f"Skipped {len(results) - len(fresh)} pages already seen in this prediction")
+        results = fresh
+    return results
@@ -8,3 +8,19 @@ os.environ["TAVILY_API_KEY"] = get_env("TAVILY_API_KEY")
 
 BASE_MODEL = "gpt-4o-mini"
 MAIN_MODEL = "gpt-4o"
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+# max number of news articles summarized concurrently
+SUMMARY_CONCURRENCY = 10
+# token budget of the passages of one article sent to the summarization
+PASSAGE_TOKENS = 800
+# token budget of the summaries reduced in one call, larger inputs are reduced in a tree
+REDUCE_TOKENS = 6000
+
+# max rebuttal turns of the debate after the parallel opening turns
+DEBATE_TURNS = 2
+# the debate stops once the probabilities of both agents are this close, or the agent that just spoke moved by no more
+CONVERGENCE_TOLERANCE = 0.05
+
+# SQLite database of the search cache, disabled if not set
+SEARCH_CACHE = os.getenv("SEARCH_CACHE")
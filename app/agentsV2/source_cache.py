@@ -0,0 +1,145 @@
+import re
+import json
+import asyncio
+import sqlite3
+import logging
+import threading
+
+from typing import Optional, Tuple
+
+import numpy as np
+
+from langchain_core.embeddings import Embeddings
+
+from app.cache import SQLiteCache, fingerprint
+
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_topic(topic: str) -> str:
+    return re.sub(r"\s+", " ", re.sub(r"[^\w\s]", " ", topic.lower())).strip()
+
+
+class SourceCache:
+    """
+    Persistent cache of the trusted-source lists of AgentTopNews, keyed by the reframed topic.
+
+    Entries expire after ttl and the least recently used ones are evicted, see SQLiteCache.
+    A topic without an exact entry is matched to the most similar cached topic by the
+    cosine similarity of their embeddings, so near-identical topics share one entry.
+    """
+    def __init__(
+        self,
+        path: str,
+        embeddings: Optional[Embeddings] = None,
+        ttl: Optional[int] = 60 * 60 * 24 * 7,
+        max_entries: Optional[int] = 1000,
+        similarity_threshold: float = 0.92,
+    ):
+        """
+        Args:
+            path (str): path of the SQLite database file
+            embeddings (Optional[Embeddings]): embedding model of the topics, exact matches only if None
+            ttl (Optional[int]): time to live of an entry in seconds, None to keep forever
+            max_entries (Optional[int]): max number of entries, None for no limit
+            similarity_threshold (float): min cosine similarity of two topics sharing an entry
+        """
+        self.cache = SQLiteCache(path, table="top_news", ttl=ttl, max_entries=max_entries)
+        self.embeddings = embeddings
+        self.similarity_threshold = similarity_threshold
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS top_news_embeddings (
+                    key TEXT PRIMARY KEY,
+                    topic TEXT NOT NULL,
+                    vector TEXT NOT NULL
+                )
+            """)
+
+    def _embed(self, topic: str) -> np.ndarray:
+        return self._normalize(self.embeddings.embed_query(topic))
+
+    async def _aembed(self, topic: str) -> np.ndarray:
+        return self._normalize(await self.embeddings.aembed_query(topic))
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def _nearest(self, vector: np.ndarray) -> Optional[Tuple[str, float]]:
+        with self._lock:
+            rows = self._conn.execute("SELECT key, vector FROM top_news_embeddings").fetchall()
+        if not rows:
+            return None
+        matrix = np.asarray([json.loads(row[1]) for row in rows], dtype=np.float32)
+        similarities = matrix @ vector
+        best = int(np.argmax(similarities))
+        return rows[best][0], float(similarities[best])
+
+    def _exact(self, topic: str) -> Optional[str]:
+        entry = self.cache.get(fingerprint(normalize_topic(topic)))
+        return entry['sources'] if entry is not None else None
+
+    def _similar(self, topic: str, vector: np.ndarray) -> Optional[str]:
+        nearest = self._nearest(vector)
+        if nearest is None or nearest[1] < self.similarity_threshold:
+            return None
+        entry = self.cache.get(nearest[0])
+        if entry is None:
+            # expired or evicted
+            with self._lock, self._conn:
+                self._conn.execute("DELETE FROM top_news_embeddings WHERE key = ?", (nearest[0],))
+            return None
+        logger.info(f"Top news of {topic!r} served from {entry['topic']!r}, similarity {nearest[1]:.3f}")
+        return entry['sources']
+
+    def get(self, topic: str) -> Optional[str]:
+        """
+        Sources of the topic or of the most similar cached topic.
+
+        Returns:
+            Optional[str]: sources, None on a miss
+        """
+        sources = self._exact(topic)
+        if sources is not None or self.embeddings is None:
+            return sources
+        return self._similar(topic, self._embed(topic))
+
+    async def aget(self, topic: str) -> Optional[str]:
+        """
+        Async version of get, the embedding and the SQLite queries do not block the event loop.
+        """
+        sources = await asyncio.to_thread(self._exact, topic)
+        if sources is not None or self.embeddings is None:
+            return sources
+        return await asyncio.to_thread(self._similar, topic, await self._aembed(topic))
+
+    def _store(self, topic: str, sources: str, vector: Optional[np.ndarray]):
+        key = fingerprint(normalize_topic(topic))
+        self.cache.set(key, {'topic': topic, 'sources': sources})
+        if vector is None:
+            return
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO top_news_embeddings (key, topic, vector) VALUES (?, ?, ?)",
+                (key, topic, json.dumps(vector.tolist())),
+            )
+            # drop the embeddings of entries evicted by the cache
+            self._conn.execute("DELETE FROM top_news_embeddings WHERE key NOT IN (SELECT key FROM top_news)")
+
+    def set(self, topic: str, sources: str):
+        self._store(topic, sources, self._embed(topic) if self.embeddings is not None else None)
+
+    async def aset(self, topic: str, sources: str):
+        """
+        Async version of set.
+        """
+        vector = await self._aembed(topic) if self.embeddings is not None else None
+        await asyncio.to_thread(self._store, topic, sources, vector)
+
+    def __len__(self) -> int:
+        return len(self.cache)
@@ -0,0 +1,83 @@
+from typing import List
+
+from langchain_core.runnables import Runnable
+
+from app.agentsV2.tokens import count_tokens, truncate_tokens
+
+
+def group_by_budget(texts: List[str], max_tokens: int) -> List[List[str]]:
+    """
+    Group consecutive texts into chunks of up to max_tokens, a longer text is truncated.
+    """
+    groups: List[List[str]] = []
+    current: List[str] = []
+    current_tokens = 0
+    for text in texts:
+        tokens = count_tokens(text)
+        if tokens > max_tokens:
+            text, tokens = truncate_tokens(text, max_tokens), max_tokens
+        if current and current_tokens + tokens > max_tokens:
+            groups.append(current)
+            current, current_tokens = [], 0
+        current.append(text)
+        current_tokens += tokens
+    if current:
+        groups.append(current)
+    return groups
+
+
+def tree_reduce(chain: Runnable, texts: List[str], max_tokens: int, max_concurrency: int = 10) -> str:
+    """
+    Summarize texts hierarchically so that no call gets more than max_tokens of news.
+
+    Texts are grouped into chunks that fit the budget, every chunk is summarized concurrently,
+    and the summaries are reduced again until a single chunk is left for the final call.
+    Texts are capped at half of the budget, so every level at least halves the number of chunks.
+
+    Args:
+        chain (Runnable): summarization chain taking {"news": str} and returning a message
+        texts (List[str]): summaries of the news articles
+        max_tokens (int): token budget of the news of one call
+        max_concurrency (int): max number of chunks summarized concurrently
+
+    Returns:
+        str: final summary, empty without texts
+    """
+    groups = group_by_budget(texts, max_tokens)
+    if not groups:
+        return ""
+    while len(groups) > 1:
+        summaries = chain.batch(
+            [{"news": "\n\n".join(group)} for group in groups],
+            config={"max_concurrency": max_concurrency},
+            return_exceptions=True,
+        )
+        groups = _next_level(summaries, max_tokens)
+    return chain.invoke({"news": "\n\n".join(groups[0])}).content
+
+
+async def atree_reduce(chain: Runnable, texts: List[str], max_tokens: int, max_concurrency: int = 10) -> str:
+    """
+    Async version of tree_reduce.
+    """
+    groups = group_by_budget(texts, max_tokens)
+    if not groups:
+        return ""
+    while len(groups) > 1:
+        summaries = await chain.abatch(
+            [{"news": "\n\n".join(group)} for group in groups],
+            config={"max_concurrency": max_concurrency},
+            return_exceptions=True,
+        )
+        groups = _next_level(summaries, max_tokens)
+    return (await chain.ainvoke({"news": "\n\n".join(groups[0])})).content
+
+
+def _next_level(summaries: List, max_tokens: int) -> List[List[str]]:
+    texts = [
+        truncate_tokens(summary.content, max_tokens // 2)
+        for summary in summaries if not isinstance(summary, Exception)
+    ]
+    if not texts:
+        raise summaries[0]
+    return group_by_budget(texts, max_tokens)
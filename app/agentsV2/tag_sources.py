@@ -0,0 +1,130 @@
+import re
+import json
+import time
+import sqlite3
+import logging
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+from app.agentsV2.agent_sort_url import AgentTopNews
+
+
+logger = logging.getLogger(__name__)
+
+DOMAIN_PATTERN = re.compile(r"\b((?:[a-z0-9](?:[a-z0-9-]*[a-z0-9])?\.)+[a-z]{2,})\b")
+
+
+def parse_sources(text: str) -> List[str]:
+    """
+    Sources listed in the output of AgentTopNews.
+
+    Returns:
+        List[str]: domains in order of appearance, or the listed names when the output has no domain
+    """
+    domains = [domain[4:] if domain.startswith("www.") else domain for domain in DOMAIN_PATTERN.findall(text.lower())]
+    if domains:
+        return list(dict.fromkeys(domains))
+    names = []
+    for item in re.split(r"[\n,]", text.replace("*", "")):
+        name = re.sub(r"^\s*\d+[.)]\s*", "", item).strip(" -.")
+        if name:
+            names.append(name)
+    return list(dict.fromkeys(names))
+
+
+class TagSourceTable:
+    """
+    Precomputed table of the trusted sources of every market tag (e.g. Sports, Soccer).
+
+    The table is refreshed offline by running AgentTopNews once per tag, see
+    scripts/refresh_tag_sources.py. Lookups at prediction time make no LLM call.
+    """
+    def __init__(self, path: str, max_age: Optional[int] = 60 * 60 * 24 * 30):
+        """
+        Args:
+            path (str): path of the SQLite database
+            max_age (Optional[int]): max age in seconds of a tag entry used by lookups, None to use any
+        """
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS tag_sources (
+                    tag TEXT PRIMARY KEY,
+                    sources TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+
+    def set(self, tag: str, sources: List[str]):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO tag_sources (tag, sources, updated_at) VALUES (?, ?, ?)",
+                (tag.lower(), json.dumps(sources), time.time()),
+            )
+
+    def get(self, tag: str) -> Optional[List[str]]:
+        with self._lock:
+            row = self._conn.execute("SELECT sources, updated_at FROM tag_sources WHERE tag = ?", (tag.lower(),)).fetchone()
+        if row is None or (self.max_age is not None and time.time() - row[1] > self.max_age):
+            return None
+        return json.loads(row[0])
+
+    def lookup(self, tags: Iterable[str], limit: int = 10) -> Optional[List[str]]:
+        """
+        Sources of a market from its tags.
+
+        Returns:
+            Optional[List[str]]: up to limit sources of the known tags, None if no tag is known
+        """
+        sources: List[str] = []
+        known = False
+        for tag in tags or []:
+            tag_sources = self.get(tag)
+            if tag_sources is None:
+                continue
+            known = True
+            sources.extend(source for source in tag_sources if source not in sources)
+        return sources[:limit] if known else None
+
+    def tags(self) -> Dict[str, float]:
+        """
+        Returns:
+            Dict[str, float]: update time of every tag in the table
+        """
+        with self._lock:
+            return dict(self._conn.execute("SELECT tag, updated_at FROM tag_sources").fetchall())
+
+    def refresh(self, tags: Iterable[str], agent: Optional[AgentTopNews] = None, max_workers: int = 4) -> Dict[str, List[str]]:
+        """
+        Run AgentTopNews for every tag and store the parsed sources.
+
+        Args:
+            tags (Iterable[str]): tags to refresh
+            agent (Optional[AgentTopNews]): agent used for every tag
+            max_workers (int): number of tags processed concurrently
+
+        Returns:
+            Dict[str, List[str]]: sources of every refreshed tag, failed tags are left out
+        """
+        agent = agent or AgentTopNews()
+
+        def refresh_tag(tag: str) -> Optional[List[str]]:
+            try:
+                sources = parse_sources(agent.get_top_news(f"Latest news and predictions about {tag}"))
+            except Exception as e:
+                logger.error(f"Failed to refresh the sources of tag {tag}: {e}")
+                return None
+            if sources:
+                self.set(tag, sources)
+            return sources or None
+
+        tags = list(dict.fromkeys(tag.lower() for tag in tags))
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            results = dict(zip(tags, pool.map(refresh_tag, tags)))
+        refreshed = {tag: sources for tag, sources in results.items() if sources}
+        logger.info(f"Refreshed the sources of {len(refreshed)}/{len(tags)} tags")
+        return refreshed
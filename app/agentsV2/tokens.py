@@ -0,0 +1,46 @@
+import logging
+
+from functools import lru_cache
+from typing import Optional
+
+import tiktoken
+
+from app.agentsV2.settings import BASE_MODEL
+
+
+logger = logging.getLogger(__name__)
+
+# approximation used when the tokenizer files cannot be downloaded
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=None)
+def get_encoding(model: str = BASE_MODEL) -> Optional[tiktoken.Encoding]:
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        logger.warning(f"Tokenizer of {model} unavailable, approximating token counts: {e}")
+        return None
+
+
+def count_tokens(text: str, model: str = BASE_MODEL) -> int:
+    """
+    Number of tokens of the text for the model, counted locally.
+    """
+    encoding = get_encoding(model)
+    if encoding is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, max_tokens: int, model: str = BASE_MODEL) -> str:
+    encoding = get_encoding(model)
+    if encoding is None:
+        return text[:max_tokens * CHARS_PER_TOKEN]
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
@@ -0,0 +1,114 @@
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+from typing import Any, Optional
+
+import pandas as pd
+
+
+def digest_data(data: Any) -> str:
+    """
+    Stable digest of agent input data.
+
+    Args:
+        data (Any): DataFrame, list of price points or any json serializable value
+
+    Returns:
+        str: sha256 hex digest
+    """
+    if isinstance(data, pd.DataFrame):
+        serialized = data.to_json(orient="records", date_format="iso")
+    else:
+        serialized = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha256(serialized.encode()).hexdigest()
+
+
+def fingerprint(*parts: Any) -> str:
+    """
+    Cache key built from the digests of all parts.
+
+    Returns:
+        str: sha256 hex digest
+    """
+    return hashlib.sha256("|".join(digest_data(part) for part in parts).encode()).hexdigest()
+
+
+class SQLiteCache:
+    """
+    Persistent key-value cache stored in a SQLite table.
+
+    Values are stored as json. Entries older than ttl are dropped on read,
+    and the least recently used entries are evicted above max_entries.
+    """
+    def __init__(self, path: str, table: str = "cache", ttl: Optional[int] = None, max_entries: Optional[int] = None):
+        """
+        Args:
+            path (str): path of the SQLite database, ':memory:' for an in-process cache
+            table (str): table name, several caches can share one database
+            ttl (Optional[int]): time to live of an entry in seconds, None to keep forever
+            max_entries (Optional[int]): max number of entries, None for no limit
+        """
+        if not table.isidentifier():
+            raise ValueError(f"Invalid table name: {table}")
+        self.table = table
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {self.table} (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_accessed_at ON {self.table} (accessed_at)")
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(f"SELECT value, created_at FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            value, created_at = row
+            if self.ttl is not None and now - created_at > self.ttl:
+                self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                return None
+            self._conn.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key))
+        return json.loads(value)
+
+    def set(self, key: str, value: Any):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, default=str), now, now),
+            )
+            self._evict(now)
+
+    def delete(self, key: str):
+        with self._lock, self._conn:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute(f"DELETE FROM {self.table}")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def _evict(self, now: float):
+        if self.ttl is not None:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE created_at < ?", (now - self.ttl,))
+        if self.max_entries is not None:
+            self._conn.execute(f"""
+                DELETE FROM {self.table} WHERE key IN (
+                    SELECT key FROM {self.table} ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,))
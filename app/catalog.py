@@ -0,0 +1,316 @@
+import json
+import time
+import sqlite3
+import logging
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Union
+
+from app.clients.polymarket import PolyMarketClient
+from app.clients.scanner import END_CURSOR, START_CURSOR, MarketScanner, parse_date
+
+
+logger = logging.getLogger(__name__)
+
+Timestamp = Union[datetime, int, float]
+
+
+def to_timestamp(value: Optional[Timestamp]) -> Optional[float]:
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return float(value)
+
+
+class MarketCatalog:
+    """
+    Local mirror of the Polymarket market catalog in SQLite.
+
+    sync() upserts the markets of the paginated catalog, an incremental sync
+    resumes from the last page of the previous one, so only new markets are fetched
+    from the catalog, the flags of known markets are refreshed by a periodic full sync.
+    Lookups by condition_id, token_id, slug, tag, end date and neg_risk_market_id
+    are served from indexed tables without an API call.
+    """
+    def __init__(self, path: str, client: Optional[PolyMarketClient] = None):
+        """
+        Args:
+            path (str): path of the SQLite database
+            client (Optional[PolyMarketClient]): client used by sync, lookups work without it
+        """
+        self.client = client
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS markets (
+                    condition_id TEXT PRIMARY KEY,
+                    market_slug TEXT,
+                    question TEXT,
+                    end_ts REAL,
+                    neg_risk_market_id TEXT,
+                    active INTEGER,
+                    closed INTEGER,
+                    accepting_orders INTEGER,
+                    data TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS markets_slug ON markets (market_slug);
+                CREATE INDEX IF NOT EXISTS markets_end_ts ON markets (end_ts);
+                CREATE INDEX IF NOT EXISTS markets_neg_risk_market_id ON markets (neg_risk_market_id);
+
+                CREATE TABLE IF NOT EXISTS market_tokens (
+                    token_id TEXT PRIMARY KEY,
+                    condition_id TEXT NOT NULL,
+                    outcome TEXT
+                );
+                CREATE INDEX IF NOT EXISTS market_tokens_condition_id ON market_tokens (condition_id);
+
+                CREATE TABLE IF NOT EXISTS market_tags (
+                    condition_id TEXT NOT NULL,
+                    tag TEXT NOT NULL,
+                    PRIMARY KEY (condition_id, tag)
+                );
+                CREATE INDEX IF NOT EXISTS market_tags_tag ON market_tags (tag);
+
+                CREATE TABLE IF NOT EXISTS catalog_state (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                );
+            """)
+
+    def upsert(self, markets: Iterable[Dict]) -> int:
+        """
+        Insert or update markets in the format of PolyMarketClient.get_market.
+
+        Returns:
+            int: number of upserted markets
+        """
+        count = 0
+        with self._lock, self._conn:
+            for market in markets:
+                condition_id = market.get('condition_id')
+                if not condition_id:
+                    continue
+                end_date = parse_date(market.get('end_date_iso'))
+                self._conn.execute(
+                    """
+                    INSERT OR REPLACE INTO markets
+                    (condition_id, market_slug, question, end_ts, neg_risk_market_id, active, closed, accepting_orders, data)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (
+                        condition_id,
+                        market.get('market_slug'),
+                        market.get('question'),
+                        end_date.timestamp() if end_date else None,
+                        market.get('neg_risk_market_id') or None,
+                        market.get('active'),
+                        market.get('closed'),
+                        market.get('accepting_orders'),
+                        json.dumps(market),
+                    ),
+                )
+                self._conn.execute("DELETE FROM market_tokens WHERE condition_id = ?", (condition_id,))
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO market_tokens (token_id, condition_id, outcome) VALUES (?, ?, ?)",
+                    [
+                        (token['token_id'], condition_id, token.get('outcome'))
+                        for token in market.get('tokens') or [] if token.get('token_id')
+                    ],
+                )
+                self._conn.execute("DELETE FROM market_tags WHERE condition_id = ?", (condition_id,))
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO market_tags (condition_id, tag) VALUES (?, ?)",
+                    [(condition_id, tag.lower()) for tag in market.get('tags') or []],
+                )
+                count += 1
+        return count
+
+    def _get_state(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM catalog_state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_state(self, key: str, value: str):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO catalog_state (key, value) VALUES (?, ?)", (key, value))
+
+    def sync(self, full: bool = False, prefetch: int = 4, full_interval: Optional[int] = 60 * 60 * 24, now: Optional[float] = None) -> int:
+        """
+        Sync the catalog with the CLOB API.
+
+        An incremental sync only fetches the new markets and the open markets past their end date.
+        The flags of the other known markets are refreshed by a full sync once every full_interval.
+
+        Args:
+            full (bool): scan the whole catalog to refresh the state of known markets,
+                otherwise resume from the last page of the previous sync
+            prefetch (int): max number of pages requested concurrently
+            full_interval (Optional[int]): seconds between full syncs, None to only sync fully on request
+            now (Optional[float]): current unix timestamp
+
+        Returns:
+            int: number of upserted markets
+        """
+        if self.client is None:
+            raise ValueError("Market catalog has no client to sync with")
+
+        now = now or time.time()
+        last_full_sync = self._get_state('last_full_sync')
+        if full_interval is not None and (last_full_sync is None or now - float(last_full_sync) >= full_interval):
+            full = True
+
+        start_cursor = START_CURSOR if full else (self._get_state('last_cursor') or START_CURSOR)
+        count = 0
+        synced = set()
+        for cursor, page in MarketScanner(self.client, prefetch=prefetch).pages(start_cursor=start_cursor):
+            count += self.upsert(page['data'])
+            synced.update(market.get('condition_id') for market in page['data'])
+            # the last page is read again by the next sync since new markets are appended to it
+            self._set_state('last_cursor', cursor)
+            if page.get('next_cursor') in (None, END_CURSOR):
+                break
+        if start_cursor == START_CURSOR:
+            self._set_state('last_full_sync', str(now))
+        else:
+            # markets of the skipped pages past their end date are likely closed by now
+            expired = [condition_id for condition_id in self._open_market_ids(end_ts_max=now) if condition_id not in synced]
+            count += self.refresh(expired, max_workers=max(prefetch, 1))
+        logger.info(f"Synced {count} markets")
+        return count
+
+    def _open_market_ids(self, end_ts_max: Optional[float] = None) -> List[str]:
+        query = "SELECT condition_id FROM markets WHERE active = 1 AND closed = 0"
+        params: list = []
+        if end_ts_max is not None:
+            query += " AND end_ts <= ?"
+            params.append(end_ts_max)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [row[0] for row in rows]
+
+    def _fetch_market(self, condition_id: str) -> Optional[Dict]:
+        try:
+            return self.client.get_market(market_id=condition_id)
+        except Exception as e:
+            logger.warning(f"Failed to refresh market {condition_id}: {e}")
+            return None
+
+    def refresh(self, condition_ids: Iterable[str], max_workers: int = 4) -> int:
+        """
+        Fetch markets again to update their active/closed flags.
+
+        Args:
+            condition_ids (Iterable[str]): markets to refresh
+            max_workers (int): max number of markets requested concurrently
+
+        Returns:
+            int: number of upserted markets
+        """
+        if self.client is None:
+            raise ValueError("Market catalog has no client to sync with")
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            markets = list(pool.map(self._fetch_market, condition_ids))
+        return self.upsert(market for market in markets if market)
+
+    def _rows_to_markets(self, rows: List[tuple]) -> List[Dict]:
+        return [json.loads(row[0]) for row in rows]
+
+    def get_market(self, condition_id: str) -> Optional[Dict]:
+        with self._lock:
+            rows = self._conn.execute("SELECT data FROM markets WHERE condition_id = ?", (condition_id,)).fetchall()
+        return next(iter(self._rows_to_markets(rows)), None)
+
+    def get_market_by_token(self, token_id: str) -> Optional[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT markets.data FROM market_tokens
+                JOIN markets ON markets.condition_id = market_tokens.condition_id
+                WHERE market_tokens.token_id = ?
+                """,
+                (token_id,),
+            ).fetchall()
+        return next(iter(self._rows_to_markets(rows)), None)
+
+    def get_market_by_slug(self, market_slug: str) -> Optional[Dict]:
+        with self._lock:
+            rows = self._conn.execute("SELECT data FROM markets WHERE market_slug = ?", (market_slug,)).fetchall()
+        return next(iter(self._rows_to_markets(rows)), None)
+
+    def find_markets(
+        self,
+        tag: Optional[str] = None,
+        end_date_min: Optional[Timestamp] = None,
+        end_date_max: Optional[Timestamp] = None,
+        neg_risk_market_id: Optional[str] = None,
+        active: Optional[bool] = True,
+        closed: Optional[bool] = False,
+        accepting_orders: Optional[bool] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict]:
+        """
+        Find markets in the local catalog, None disables a condition.
+
+        Example: markets in tag "Soccer" closing this week
+            catalog.find_markets(tag="Soccer", end_date_min=now, end_date_max=now + timedelta(days=7))
+
+        Args:
+            tag (Optional[str]): market tag, case insensitive
+            end_date_min (Optional[Timestamp]): earliest end date, datetime or unix timestamp
+            end_date_max (Optional[Timestamp]): latest end date, datetime or unix timestamp
+            neg_risk_market_id (Optional[str]): neg risk group of the market
+            active (Optional[bool]): active flag
+            closed (Optional[bool]): closed flag
+            accepting_orders (Optional[bool]): accepting_orders flag
+            limit (Optional[int]): max number of markets
+
+        Returns:
+            List[Dict]: markets ordered by end date
+        """
+        query = "SELECT markets.data FROM markets"
+        conditions: List[str] = []
+        params: list = []
+        if tag is not None:
+            query += " JOIN market_tags ON market_tags.condition_id = markets.condition_id"
+            conditions.append("market_tags.tag = ?")
+            params.append(tag.lower())
+        for column, value in (
+            ("end_ts >= ?", to_timestamp(end_date_min)),
+            ("end_ts <= ?", to_timestamp(end_date_max)),
+            ("neg_risk_market_id = ?", neg_risk_market_id),
+            ("active = ?", active),
+            ("closed = ?", closed),
+            ("accepting_orders = ?", accepting_orders),
+        ):
+            if value is not None:
+                conditions.append(column)
+                params.append(value)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY end_ts"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return self._rows_to_markets(rows)
+
+    def get_tags(self, min_markets: int = 1) -> Dict[str, int]:
+        """
+        Tags of the catalog with their number of markets, most used first.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT tag, COUNT(*) AS n FROM market_tags GROUP BY tag HAVING n >= ? ORDER BY n DESC",
+                (min_markets,),
+            ).fetchall()
+        return dict(rows)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM markets").fetchone()[0]
@@ -0,0 +1,154 @@
+import asyncio
+import importlib.util
+
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from py_clob_client.endpoints import GET_MARKET, GET_MARKETS, GET_SIMPLIFIED_MARKETS, PRICE
+from py_clob_client.exceptions import PolyApiException
+from py_clob_client.order_builder.constants import BUY, SELL
+
+from app.clients.polymarket import PolyMarketClient
+
+
+class AsyncPolyMarketClient:
+    """
+    An asyncio client for the public Polymarket CLOB endpoints.
+
+    All requests go through one pooled httpx.AsyncClient with keep-alive connections
+    (and HTTP/2 when the h2 package is installed). A semaphore bounds the number of
+    requests in flight, so hundreds of markets can be fetched with asyncio.gather.
+
+    Usage:
+        async with AsyncPolyMarketClient() as client:
+            markets = await client.get_many_markets(market_ids)
+    """
+    host = PolyMarketClient.host
+    GET_PRICE_HISTORY = PolyMarketClient.GET_PRICE_HISTORY
+
+    def __init__(
+        self,
+        max_concurrency: int = 50,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        timeout: float = 10.0,
+        http2: Optional[bool] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        """
+        Initialize the client.
+
+        Args:
+            max_concurrency (int): max number of requests in flight
+            max_connections (int): max number of open connections in the pool
+            max_keepalive_connections (int): max number of idle connections kept alive
+            timeout (float): request timeout in seconds
+            http2 (Optional[bool]): use HTTP/2, by default enabled when the h2 package is installed
+            transport (Optional[httpx.AsyncBaseTransport]): transport of the requests, e.g. httpx.MockTransport, the connection pool by default
+        """
+        if http2 is None:
+            http2 = importlib.util.find_spec("h2") is not None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client = httpx.AsyncClient(
+            base_url=self.host,
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+            ),
+            timeout=timeout,
+            transport=transport,
+            headers={"User-Agent": "py_clob_client", "Accept": "*/*", "Accept-Encoding": "gzip"},
+        )
+
+    async def __aenter__(self) -> "AsyncPolyMarketClient":
+        return self
+
+    async def __aexit__(self, *args):
+        await self.aclose()
+
+    async def aclose(self):
+        await self._client.aclose()
+
+    async def _get(self, path: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        async with self._semaphore:
+            resp = await self._client.get(path, params=params)
+        if resp.status_code != 200:
+            raise PolyApiException(resp)
+        return resp.json()
+
+    async def get_markets(self, next_cursor: str = "MA==") -> List[Dict]:
+        return (await self._get(GET_MARKETS, params={"next_cursor": next_cursor}))['data']
+
+    async def get_simplified_markets(self, next_cursor: str = "MA==") -> List[Dict]:
+        return (await self._get(GET_SIMPLIFIED_MARKETS, params={"next_cursor": next_cursor}))['data']
+
+    async def get_market(self, market_id: str) -> Dict:
+        """
+        Get a market by ID, see PolyMarketClient.get_market.
+
+        Args:
+            market_id (str): The ID of the market (condition id)
+
+        Returns:
+            Dict: market data
+        """
+        return await self._get(f"{GET_MARKET}{market_id}")
+
+    async def get_many_markets(self, market_ids: List[str]) -> List[Dict]:
+        """
+        Get markets by ID concurrently.
+
+        Args:
+            market_ids (List[str]): The IDs of the markets (condition ids)
+
+        Returns:
+            List[Dict]: market data in the order of market_ids
+        """
+        return list(await asyncio.gather(*(self.get_market(market_id) for market_id in market_ids)))
+
+    async def get_price(self, token_id: str, is_buy: Optional[bool] = True) -> float:
+        """
+        Get price for a token.
+
+        Args:
+            token_id (str): market token id
+            is_buy (Optional[bool], optional): Market side. Defaults to True.
+
+        Returns:
+            float: Price
+        """
+        result = await self._get(PRICE, params={"token_id": token_id, "side": BUY if is_buy else SELL})
+        return float(result['price'])
+
+    async def get_price_history_with_interval(self, token_id: str, interval: str, fidelity: int) -> List[Dict]:
+        """
+        Price history ending at the current time, see PolyMarketClient.get_price_history_with_interval.
+
+        Args:
+            token_id (str): the CLOB token id for which to fetch price history
+            interval (str): a string representing a duration ending at the current time
+            fidelity (int): the resolution of the data, in minutes
+
+        Returns:
+            List[Dict]: [{"t": 1632141600, "p": 0.003}, ...]
+        """
+        params = {"market": token_id, "interval": interval, "fidelity": fidelity}
+        return (await self._get(self.GET_PRICE_HISTORY, params=params))['history']
+
+    async def get_price_history_with_timestamps(self, token_id: str, startTs: int, endTs: int, fidelity: int) -> List[Dict]:
+        """
+        Price history between two timestamps, see PolyMarketClient.get_price_history_with_timestamps.
+
+        Args:
+            token_id (str): the CLOB token id for which to fetch price history
+            startTs (int): the start time, a unix timestamp in UTC
+            endTs (int): the end time, a unix timestamp in UTC
+            fidelity (int): the resolution of the data, in minutes
+
+        Returns:
+            List[Dict]: [{"t": 1632141600, "p": 0.003}, ...]
+        """
+        params = {"market": token_id, "startTs": startTs, "endTs": endTs, "fidelity": fidelity}
+        return (await self._get(self.GET_PRICE_HISTORY, params=params))['history']
@@ -0,0 +1,254 @@
+import json
+import time
+import asyncio
+import logging
+import threading
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import aiohttp
+
+from py_clob_client.clob_types import BookParams
+
+from app.clients.polymarket import PolyMarketClient
+
+
+logger = logging.getLogger(__name__)
+
+WS_MARKET_URL = "wss://ws-subscriptions-clob.polymarket.com/ws/market"
+
+
+class OrderBook:
+    """
+    In-memory L2 order book of one token.
+    """
+    def __init__(self, token_id: str):
+        self.token_id = token_id
+        self.bids: Dict[float, float] = {}
+        self.asks: Dict[float, float] = {}
+        self.timestamp: Optional[float] = None
+        self.ready = False
+        self._lock = threading.Lock()
+
+    def apply_snapshot(self, bids: Iterable[Dict], asks: Iterable[Dict], timestamp: Optional[float] = None):
+        """
+        Replace the book with a snapshot of [{'price': '0.5', 'size': '100'}, ...] levels.
+        """
+        with self._lock:
+            self.bids = {float(level['price']): float(level['size']) for level in bids if float(level['size']) > 0}
+            self.asks = {float(level['price']): float(level['size']) for level in asks if float(level['size']) > 0}
+            self.timestamp = timestamp or time.time()
+            self.ready = True
+
+    def apply_change(self, side: str, price: float, size: float, timestamp: Optional[float] = None):
+        """
+        Set the size of a price level, a zero size removes the level.
+
+        Args:
+            side (str): BUY for bids, SELL for asks
+            price (float): price of the level
+            size (float): new size of the level
+        """
+        with self._lock:
+            levels = self.bids if side.upper() == "BUY" else self.asks
+            if size > 0:
+                levels[price] = size
+            else:
+                levels.pop(price, None)
+            self.timestamp = timestamp or time.time()
+
+    def best_bid(self) -> Optional[float]:
+        with self._lock:
+            return max(self.bids) if self.bids else None
+
+    def best_ask(self) -> Optional[float]:
+        with self._lock:
+            return min(self.asks) if self.asks else None
+
+    def midpoint(self) -> Optional[float]:
+        best_bid, best_ask = self.best_bid(), self.best_ask()
+        if best_bid is None or best_ask is None:
+            return None
+        return (best_bid + best_ask) / 2
+
+    def depth(self, levels: int = 5) -> Dict[str, List[Tuple[float, float]]]:
+        """
+        Best price levels of both sides.
+
+        Returns:
+            Dict[str, List[Tuple[float, float]]]: {'bids': [(price, size), ...], 'asks': [...]}, best first
+        """
+        with self._lock:
+            return {
+                'bids': sorted(self.bids.items(), reverse=True)[:levels],
+                'asks': sorted(self.asks.items())[:levels],
+            }
+
+    def simulate_fill(self, amount: float, is_buy: bool = True) -> Optional[float]:
+        """
+        Worst price reached by a market order, the same walk as ClobClient.calculate_market_price.
+
+        Args:
+            amount (float): USDC to spend for a buy, shares to sell for a sell
+            is_buy (bool): Market side. Defaults to True.
+
+        Returns:
+            Optional[float]: price of the last matched level, None if the book is too thin
+        """
+        with self._lock:
+            levels = sorted(self.asks.items()) if is_buy else sorted(self.bids.items(), reverse=True)
+        matched = 0.0
+        for price, size in levels:
+            matched += size * price if is_buy else size
+            if matched >= amount:
+                return price
+        return None
+
+
+class MarketDataFeed:
+    """
+    Local replica of the order books of a set of tokens.
+
+    A background thread subscribes to the CLOB market websocket channel and applies
+    book snapshots and price changes. While the websocket is down the books are
+    polled over REST when a client is given. Reads never touch the network.
+    """
+    def __init__(
+        self,
+        token_ids: Iterable[str],
+        client: Optional[PolyMarketClient] = None,
+        url: str = WS_MARKET_URL,
+        poll_interval: float = 5.0,
+        reconnect_delay: float = 5.0,
+    ):
+        """
+        Args:
+            token_ids (Iterable[str]): tokens to subscribe to
+            client (Optional[PolyMarketClient]): client used for the polling fallback and tick size updates
+            url (str): websocket url of the market channel
+            poll_interval (float): seconds between polls while the websocket is down
+            reconnect_delay (float): seconds between websocket connection attempts
+        """
+        self.books: Dict[str, OrderBook] = {token_id: OrderBook(token_id) for token_id in token_ids}
+        self.client = client
+        self.url = url
+        self.poll_interval = poll_interval
+        self.reconnect_delay = reconnect_delay
+        self.connected = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop: Optional[asyncio.Event] = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._loop = asyncio.new_event_loop()
+        # created before the thread runs, so stop() can be called right away
+        self._stop = asyncio.Event()
+        self._thread = threading.Thread(target=self._loop.run_until_complete, args=(self._run(),), daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        if self._thread is None:
+            return
+        self._loop.call_soon_threadsafe(self._stop.set)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def wait_ready(self, timeout: float = 10.0) -> bool:
+        """
+        Wait until every book got its first snapshot.
+        """
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if all(book.ready for book in self.books.values()):
+                return True
+            time.sleep(0.01)
+        return False
+
+    def get_book(self, token_id: str) -> Optional[OrderBook]:
+        book = self.books.get(token_id)
+        return book if book is not None and book.ready else None
+
+    def simulate_fill(self, token_id: str, amount: float, is_buy: bool = True) -> Optional[float]:
+        book = self.get_book(token_id)
+        return book.simulate_fill(amount, is_buy=is_buy) if book is not None else None
+
+    def handle_message(self, message):
+        """
+        Apply one market channel message, a single event or a list of events.
+        """
+        for event in message if isinstance(message, list) else [message]:
+            event_type = event.get('event_type')
+            if event_type == 'book':
+                book = self.books.get(event.get('asset_id'))
+                if book is not None:
+                    timestamp = float(event['timestamp']) / 1000 if event.get('timestamp') else None
+                    book.apply_snapshot(event.get('bids') or event.get('buys') or [], event.get('asks') or event.get('sells') or [], timestamp)
+            elif event_type == 'price_change':
+                changes = event.get('price_changes') or [
+                    {**change, 'asset_id': event.get('asset_id')} for change in event.get('changes') or []
+                ]
+                for change in changes:
+                    book = self.books.get(change.get('asset_id'))
+                    if book is not None:
+                        book.apply_change(change['side'], float(change['price']), float(change['size']))
+            elif event_type == 'tick_size_change' and self.client is not None:
+                self.client.metadata.set_tick_size(event['asset_id'], str(event['new_tick_size']))
+
+    async def _listen(self, session: aiohttp.ClientSession):
+        async with session.ws_connect(self.url, heartbeat=10) as ws:
+            await ws.send_json({"assets_ids": list(self.books), "type": "market"})
+            self.connected = True
+            logger.info(f"Subscribed to {len(self.books)} order books")
+            stop = asyncio.ensure_future(self._stop.wait())
+            try:
+                while not self._stop.is_set():
+                    receive = asyncio.ensure_future(ws.receive())
+                    await asyncio.wait([receive, stop], return_when=asyncio.FIRST_COMPLETED)
+                    if not receive.done():
+                        receive.cancel()
+                        break
+                    msg = receive.result()
+                    if msg.type != aiohttp.WSMsgType.TEXT:
+                        break
+                    try:
+                        self.handle_message(json.loads(msg.data))
+                    except (ValueError, KeyError, TypeError) as e:
+                        logger.error(f"Invalid market message {msg.data}: {e}")
+            finally:
+                stop.cancel()
+                self.connected = False
+
+    async def _poll(self):
+        books = await asyncio.to_thread(
+            self.client.client.get_order_books,
+            [BookParams(token_id=token_id) for token_id in self.books],
+        )
+        for summary in books:
+            book = self.books.get(summary.asset_id)
+            if book is not None:
+                book.apply_snapshot(
+                    [{'price': level.price, 'size': level.size} for level in summary.bids or []],
+                    [{'price': level.price, 'size': level.size} for level in summary.asks or []],
+                )
+
+    async def _run(self):
+        async with aiohttp.ClientSession() as session:
+            while not self._stop.is_set():
+                try:
+                    await self._listen(session)
+                except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+                    logger.error(f"Market websocket error: {e}")
+
+                deadline = time.time() + self.reconnect_delay
+                while not self._stop.is_set() and time.time() < deadline:
+                    if self.client is not None:
+                        try:
+                            await self._poll()
+                        except Exception as e:
+                            logger.error(f"Failed to poll order books: {e}")
+                    try:
+                        await asyncio.wait_for(self._stop.wait(), timeout=min(self.poll_interval, self.reconnect_delay))
+                    except asyncio.TimeoutError:
+                        pass
@@ -0,0 +1,102 @@
+import time
+import threading
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional
+
+from py_clob_client.client import ClobClient
+from py_clob_client.clob_types import TickSize
+from py_clob_client.endpoints import GET_NEG_RISK, GET_TICK_SIZE
+from py_clob_client.http_helpers.helpers import get
+
+
+@dataclass
+class MarketMetadata:
+    tick_size: TickSize # minimum tick size of the token, e.g. "0.001"
+    neg_risk: bool
+    fee_rate_bps: int # taker fee of the market in basis points
+    minimum_order_size: float # minimum order size in shares, 0 if unknown
+    updated_at: float
+
+
+class MarketMetadataCache:
+    """
+    Cache of the per-token market metadata needed to build orders.
+
+    Entries come from market dicts (warm) without any request, or from the
+    tick-size and neg-risk endpoints on a miss. Entries expire after ttl
+    seconds and can be invalidated when the market changes its tick size.
+    """
+    def __init__(self, client: ClobClient, ttl: Optional[int] = 60 * 60):
+        """
+        Args:
+            client (ClobClient): CLOB client used on a cache miss
+            ttl (Optional[int]): time to live of an entry in seconds, None to keep forever
+        """
+        self.client = client
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._metadata: Dict[str, MarketMetadata] = {}
+
+    def warm(self, markets: Iterable[Dict]) -> int:
+        """
+        Fill the cache from market dicts, see PolyMarketClient.get_market.
+
+        Returns:
+            int: number of cached tokens
+        """
+        now = time.time()
+        entries = {}
+        for market in markets:
+            if market.get('minimum_tick_size') is None:
+                continue
+            for token in market.get('tokens') or []:
+                entries[token['token_id']] = MarketMetadata(
+                    tick_size=str(market['minimum_tick_size']),
+                    neg_risk=bool(market.get('neg_risk')),
+                    fee_rate_bps=int(market.get('taker_base_fee') or 0),
+                    minimum_order_size=float(market.get('minimum_order_size') or 0),
+                    updated_at=now,
+                )
+        with self._lock:
+            self._metadata.update(entries)
+        return len(entries)
+
+    def get(self, token_id: str) -> MarketMetadata:
+        with self._lock:
+            metadata = self._metadata.get(token_id)
+        if metadata is not None and (self.ttl is None or time.time() - metadata.updated_at <= self.ttl):
+            return metadata
+
+        # ClobClient keeps its own lookups forever, request the endpoints directly to honor the ttl
+        tick_size = get("{}{}?token_id={}".format(self.client.host, GET_TICK_SIZE, token_id))
+        neg_risk = get("{}{}?token_id={}".format(self.client.host, GET_NEG_RISK, token_id))
+        metadata = MarketMetadata(
+            tick_size=str(tick_size['minimum_tick_size']),
+            neg_risk=bool(neg_risk['neg_risk']),
+            fee_rate_bps=metadata.fee_rate_bps if metadata else 0,
+            minimum_order_size=metadata.minimum_order_size if metadata else 0,
+            updated_at=time.time(),
+        )
+        with self._lock:
+            self._metadata[token_id] = metadata
+        return metadata
+
+    def set_tick_size(self, token_id: str, tick_size: TickSize):
+        """
+        Update the tick size of a cached token, e.g. from a tick_size_change event.
+        """
+        with self._lock:
+            metadata = self._metadata.get(token_id)
+            if metadata is not None:
+                metadata.tick_size = tick_size
+
+    def invalidate(self, token_id: Optional[str] = None):
+        """
+        Drop a token from the cache, or every token when token_id is None.
+        """
+        with self._lock:
+            if token_id is None:
+                self._metadata.clear()
+            else:
+                self._metadata.pop(token_id, None)
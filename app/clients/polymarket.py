@@ -1,11 +1,15 @@
 from typing import Dict, List, Optional
 
 from py_clob_client.client import ClobClient
-from py_clob_client.clob_types import ApiCreds
+from py_clob_client.clob_types import ApiCreds, RequestArgs
 from py_clob_client.constants import POLYGON
-from py_clob_client.clob_types import MarketOrderArgs
+from py_clob_client.clob_types import CreateOrderOptions, MarketOrderArgs, OrderType
 from py_clob_client.order_builder.constants import BUY, SELL
-from py_clob_client.http_helpers.helpers import get
+from py_clob_client.headers.headers import create_level_2_headers
+from py_clob_client.http_helpers.helpers import get, post
+from py_clob_client.utilities import order_to_json, price_valid
+
+from app.clients.market_metadata import MarketMetadataCache
 
 
 
@@ -17,8 +21,9 @@ class PolyMarketClient:
     host = "https://clob.polymarket.com/"
     chain = POLYGON
     GET_PRICE_HISTORY = "/prices-history"
+    POST_ORDERS = "/orders"
 
-    def __init__(self, key: str, api_key: str, api_secret: str, api_passphrase: str):
+    def __init__(self, key: str, api_key: str, api_secret: str, api_passphrase: str, metadata_ttl: Optional[int] = 60 * 60):
         """
         Initialize the client.
         Call the create_api_key script to get the key, secret, and passphrase.
@@ -29,12 +34,32 @@ class PolyMarketClient:
             api_passphrase=api_passphrase,
         )
         self.client = ClobClient(self.host, key=key, chain_id=self.chain, creds=creds)
+        self.metadata = MarketMetadataCache(self.client, ttl=metadata_ttl)
+
+    def get_markets(self, next_cursor: str = "MA==") -> List[Dict]:
+        return self.client.get_markets(next_cursor=next_cursor)['data']
+
+    def get_simplified_markets(self, next_cursor: str = "MA==") -> List[Dict]:
+        return self.client.get_simplified_markets(next_cursor=next_cursor)['data']
+
+    def get_markets_page(self, next_cursor: str = "MA==") -> Dict:
+        """
+        Get one page of the market catalog.
 
-    def get_markets(self) -> List[Dict]:
-        return self.client.get_markets()['data']
+        Args:
+            next_cursor (str): cursor of the page, "MA==" for the first page
 
-    def get_simplified_markets(self) -> List[Dict]:
-        return self.client.get_simplified_markets()['data']
+        Returns:
+            Dict: {'data': [...], 'next_cursor': 'MTAwMA==', 'limit': 1000, 'count': 1000}
+            next_cursor is "LTE=" on the last page
+        """
+        return self.client.get_markets(next_cursor=next_cursor)
+
+    def get_simplified_markets_page(self, next_cursor: str = "MA==") -> Dict:
+        """
+        Get one page of the simplified market catalog, see get_markets_page.
+        """
+        return self.client.get_simplified_markets(next_cursor=next_cursor)
 
     def get_market(self, market_id: str) -> Dict:
         """
@@ -92,26 +117,96 @@ class PolyMarketClient:
         """
         return self.client.get_market(market_id)
 
-    def make_market_order(self, token_id: str, amount_usd: float, is_buy: Optional[bool] = True) -> Dict:
+    def make_market_order(self, token_id: str, amount_usd: float, is_buy: Optional[bool] = True, price: Optional[float] = None) -> Dict:
         """
         Make a market order.
 
+        Tick size, neg risk and fee rate come from the metadata cache, so only the
+        order book is fetched to price the order (skipped when price is given).
+
         Args:
             token_id (str): market token id (71321045679252212594626385532706912750332728571942532289631379312455583992563)
             amount_usd (float): amount in USDC
             is_buy (Optional[bool], optional): Market side. Defaults to True.
+            price (Optional[float], optional): Worst accepted price. Defaults to the price matching amount_usd in the order book.
 
         Returns:
-            Dict:
+            Dict: signed order
         """
+        self.client.assert_level_1_auth()
+        metadata = self.metadata.get(token_id)
+        side = BUY if is_buy else SELL
+
+        if not price:
+            price = self.client.calculate_market_price(token_id, side, amount_usd)
+        if not price_valid(price, metadata.tick_size):
+            self.metadata.invalidate(token_id)
+            raise ValueError(f"Price {price} is not valid for tick size {metadata.tick_size}")
+        if metadata.minimum_order_size and amount_usd / price < metadata.minimum_order_size:
+            raise ValueError(f"Order size {amount_usd / price:.2f} is below the minimum {metadata.minimum_order_size}")
+
         order_args = MarketOrderArgs(
             token_id=token_id,
             amount=amount_usd,
-            side=BUY if is_buy else SELL,
+            side=side,
+            price=price,
+            fee_rate_bps=metadata.fee_rate_bps,
+        )
+        signed_order = self.client.builder.create_market_order(
+            order_args,
+            CreateOrderOptions(tick_size=metadata.tick_size, neg_risk=metadata.neg_risk),
         )
-        signed_order = self.client.create_market_order(order_args)
         return signed_order
 
+    def post_order(self, signed_order, order_type: str = OrderType.FOK) -> Dict:
+        """
+        Post a signed order.
+
+        Args:
+            signed_order: order returned by make_market_order
+            order_type (str): OrderType, market orders are fill-or-kill. Defaults to FOK.
+
+        Returns:
+            Dict: {'success': True, 'errorMsg': '', 'orderID': '0x...', 'status': 'matched', ...}
+        """
+        return self.client.post_order(signed_order, orderType=order_type)
+
+    def post_orders(self, signed_orders: List, order_type: str = OrderType.FOK) -> List[Dict]:
+        """
+        Post signed orders in one request.
+
+        Args:
+            signed_orders (List): orders returned by make_market_order
+            order_type (str): OrderType of every order. Defaults to FOK.
+
+        Returns:
+            List[Dict]: one post_order response per order, in the order of signed_orders
+        """
+        self.client.assert_level_2_auth()
+        body = [order_to_json(order, self.client.creds.api_key, order_type) for order in signed_orders]
+        headers = create_level_2_headers(
+            self.client.signer,
+            self.client.creds,
+            RequestArgs(method="POST", request_path=self.POST_ORDERS, body=body),
+        )
+        return post("{}{}".format(self.client.host, self.POST_ORDERS), headers=headers, data=body)
+
+    def warm_up(self, markets: Optional[List[Dict]] = None):
+        """
+        Prepare the order path before a burst of orders: cache the metadata of the
+        markets and sign a throwaway order to load the signing code.
+
+        Args:
+            markets (Optional[List[Dict]]): markets from get_market or the local catalog
+        """
+        if markets:
+            self.metadata.warm(markets)
+        self.client.assert_level_1_auth()
+        self.client.builder.create_market_order(
+            MarketOrderArgs(token_id="1", amount=1, side=BUY, price=0.5),
+            CreateOrderOptions(tick_size="0.01", neg_risk=False),
+        )
+
     def get_price(self, token_id: str, is_buy: Optional[bool] = True) -> float:
         """
         Get price for a token.
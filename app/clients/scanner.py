@@ -0,0 +1,182 @@
+import base64
+import binascii
+import logging
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
+
+from app.clients.polymarket import PolyMarketClient
+
+
+logger = logging.getLogger(__name__)
+
+START_CURSOR = "MA=="
+END_CURSOR = "LTE="
+
+
+def encode_cursor(offset: int) -> str:
+    return base64.b64encode(str(offset).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Optional[int]:
+    """
+    CLOB cursors are base64 encoded offsets ("MTAwMA==" is 1000).
+
+    Returns:
+        Optional[int]: offset or None if the cursor is not an offset
+    """
+    try:
+        return int(base64.b64decode(cursor).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+def parse_date(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+
+
+@dataclass
+class MarketFilter:
+    """
+    Filter over the market dicts of the CLOB catalog, None disables a condition.
+    Dates must be timezone aware, end_date_iso is in UTC.
+    """
+    active: Optional[bool] = True
+    closed: Optional[bool] = False
+    accepting_orders: Optional[bool] = None
+    tags: Optional[List[str]] = None # market must have at least one of the tags
+    end_date_min: Optional[datetime] = None
+    end_date_max: Optional[datetime] = None
+
+    def matches(self, market: Dict) -> bool:
+        if self.active is not None and market.get('active') != self.active:
+            return False
+        if self.closed is not None and market.get('closed') != self.closed:
+            return False
+        if self.accepting_orders is not None and market.get('accepting_orders') != self.accepting_orders:
+            return False
+        if self.tags:
+            market_tags = {tag.lower() for tag in market.get('tags') or []}
+            if not market_tags.intersection(tag.lower() for tag in self.tags):
+                return False
+        if self.end_date_min is not None or self.end_date_max is not None:
+            end_date = parse_date(market.get('end_date_iso'))
+            if end_date is None:
+                return False
+            if self.end_date_min is not None and end_date < self.end_date_min:
+                return False
+            if self.end_date_max is not None and end_date > self.end_date_max:
+                return False
+        return True
+
+
+class MarketScanner:
+    """
+    Streaming scanner over the paginated market catalog.
+
+    Pages are fetched in order by following next_cursor. Since cursors are offsets,
+    the next `prefetch` pages are requested concurrently, and only that window of
+    pages is kept in memory. Filters are applied by the fetching workers.
+    """
+    def __init__(self, client: PolyMarketClient, simplified: bool = False, prefetch: int = 4):
+        """
+        Args:
+            client (PolyMarketClient): client for the polymarket API
+            simplified (bool): scan the simplified markets catalog
+            prefetch (int): max number of pages requested concurrently
+        """
+        self.client = client
+        self.simplified = simplified
+        self.prefetch = prefetch
+
+    def _fetch(self, cursor: str, market_filter: Optional[MarketFilter] = None) -> Dict:
+        if self.simplified:
+            page = self.client.get_simplified_markets_page(next_cursor=cursor)
+        else:
+            page = self.client.get_markets_page(next_cursor=cursor)
+        data = page.get('data') or []
+        if market_filter is not None:
+            page = {**page, 'data': [market for market in data if market_filter.matches(market)]}
+        page['count'] = len(data)
+        return page
+
+    def _sequential(self, cursor: str, market_filter: Optional[MarketFilter]) -> Iterator[Tuple[str, Dict]]:
+        while cursor != END_CURSOR:
+            page = self._fetch(cursor, market_filter)
+            yield cursor, page
+            if not page['count']:
+                return
+            cursor = page.get('next_cursor') or END_CURSOR
+
+    def pages(self, start_cursor: str = START_CURSOR, market_filter: Optional[MarketFilter] = None) -> Iterator[Tuple[str, Dict]]:
+        """
+        Iterate over the catalog pages.
+
+        Args:
+            start_cursor (str): cursor of the first page
+            market_filter (Optional[MarketFilter]): filter applied to the data of every page
+
+        Yields:
+            Tuple[str, Dict]: cursor and page, page['count'] is the number of markets before filtering
+        """
+        if start_cursor == END_CURSOR:
+            return
+        page = self._fetch(start_cursor, market_filter)
+        yield start_cursor, page
+
+        cursor = page.get('next_cursor') or END_CURSOR
+        offset = decode_cursor(cursor)
+        limit = page.get('limit') or page['count']
+        if cursor == END_CURSOR or not page['count']:
+            return
+        if self.prefetch <= 1 or offset is None or not limit:
+            yield from self._sequential(cursor, market_filter)
+            return
+
+        pool = ThreadPoolExecutor(max_workers=self.prefetch)
+        window: Deque = deque()
+        try:
+            for i in range(self.prefetch):
+                window.append((offset + i * limit, pool.submit(self._fetch, encode_cursor(offset + i * limit), market_filter)))
+
+            while window:
+                page_offset, future = window.popleft()
+                page = future.result()
+                yield encode_cursor(page_offset), page
+
+                cursor = page.get('next_cursor') or END_CURSOR
+                if cursor == END_CURSOR or not page['count']:
+                    return
+                if decode_cursor(cursor) != page_offset + limit:
+                    logger.info(f"Unexpected cursor {cursor}, continuing sequentially")
+                    for _, pending in window:
+                        pending.cancel()
+                    yield from self._sequential(cursor, market_filter)
+                    return
+
+                next_offset = page_offset + (len(window) + 1) * limit
+                window.append((next_offset, pool.submit(self._fetch, encode_cursor(next_offset), market_filter)))
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def scan(self, market_filter: Optional[MarketFilter] = None, start_cursor: str = START_CURSOR) -> Iterator[Dict]:
+        """
+        Iterate over the markets of the whole catalog.
+
+        Args:
+            market_filter (Optional[MarketFilter]): filter of the yielded markets
+            start_cursor (str): cursor of the first page
+
+        Yields:
+            Dict: market data, see PolyMarketClient.get_market
+        """
+        for _, page in self.pages(start_cursor=start_cursor, market_filter=market_filter):
+            yield from page['data']
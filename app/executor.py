@@ -2,11 +2,17 @@ import time
 import logging
 
 from dataclasses import dataclass
+from typing import Dict, Optional
 
-from app.agents.base_agent import BaseAgent
+from app.agents.base_agent import BasePredictorAgent
 from app.agentsV2.agents_graph import NewsAnalysisPredictorAgent
 
+from app.cache import SQLiteCache, fingerprint
+from app.clients.market_data import MarketDataFeed
 from app.clients.polymarket import PolyMarketClient
+from app.metrics import LatencyRecorder
+from app.orders import OrderIntent, OrderPipeline
+from app.price_store import PriceHistoryStore, market_frame
 from app.strategy import Action, State, base_strategy
 
 
@@ -19,6 +25,10 @@ class Config:
     market_id: str # Market ID in the polymarket API
     sleep_time: int = 60 * 60 * 24
     trade_size: float = 10
+    history_window: int = 60 * 60 * 24 * 30 # seconds of price history passed to the agent
+    history_fidelity: int = 60 * 24 # resolution of the price history, in minutes
+    retry_time: int = 60 * 5 # delay before retrying a failed cycle, an interrupted prediction resumes from its checkpoint
+    max_retries: int = 3 # retries of a failed cycle before waiting for the next one
 
 
 class Executor:
@@ -28,23 +38,83 @@ class Executor:
     2. Get agent prediction
     3. Make decision based on agent prediction
     """
-    def __init__(self, config: Config, agent: BaseAgent, client: PolyMarketClient):
+    def __init__(
+        self,
+        config: Config,
+        agent: BasePredictorAgent,
+        client: PolyMarketClient,
+        cache: Optional[SQLiteCache] = None,
+        price_store: Optional[PriceHistoryStore] = None,
+        market_data: Optional[MarketDataFeed] = None,
+        metrics: Optional[LatencyRecorder] = None,
+    ):
         """
         Executor for the prediction market
 
         Args:
             config (Config): configuration for the executor
-            agent (BaseAgent): base prediction agent
+            agent (BasePredictorAgent): base prediction agent
             client (PolyMarketClient): client for the polymarket API
+            cache (Optional[SQLiteCache]): cache of agent predictions keyed by the market inputs
+            price_store (Optional[PriceHistoryStore]): local price history synced incrementally every cycle
+            market_data (Optional[MarketDataFeed]): local order books used to price orders without a request
+            metrics (Optional[LatencyRecorder]): recorder of the latency of every stage of a cycle
         """
         logger.info("Initializing executor")
         logger.info(f"Config: {config}")
         self.agent = agent
         self.client = client
         self.config = config
+        self.cache = cache
+        self.price_store = price_store
+        self.market_data = market_data
+        self.metrics = metrics or LatencyRecorder()
+        # checkpoint key of the failed cycle, resumed by the next run
+        self._thread_id: Optional[str] = None
+
+    def predict(self, question: str, description: str, **kwargs) -> Dict:
+        """
+        Get the agent prediction, served from the cache when the market inputs did not change.
+
+        Args:
+            kwargs: agent specific inputs, e.g. data_frm and tags of NewsAnalysisPredictorAgent
+        """
+        if self.cache is None:
+            return self.agent.predict(question=question, description=description, **kwargs)
+
+        key = fingerprint(self.config.market_id, question, description, kwargs.get('data_frm'))
+        agent_prediction = self.cache.get(key)
+        if agent_prediction is not None:
+            logger.info(f"Prediction cache hit: {key}")
+            return agent_prediction
 
-    def run(self):
-        market = self.client.get_market(market_id=self.market_id)
+        agent_prediction = self.agent.predict(question=question, description=description, **kwargs)
+        if agent_prediction and 'error' not in agent_prediction:
+            self.cache.set(key, agent_prediction)
+        return agent_prediction
+
+    def run(self, pipeline: Optional[OrderPipeline] = None):
+        """
+        Run one prediction cycle, every stage is recorded as a latency span.
+
+        Args:
+            pipeline (Optional[OrderPipeline]): collects the order instead of posting it right away
+        """
+        with self.metrics.span("cycle", market_id=self.config.market_id):
+            self._run(pipeline)
+        self._thread_id = None
+
+    def abandon(self):
+        """
+        Give up the failed cycle, its checkpointed prediction is dropped instead of resumed.
+        """
+        if self._thread_id is not None and isinstance(self.agent, NewsAnalysisPredictorAgent):
+            self.agent.discard(self._thread_id)
+        self._thread_id = None
+
+    def _run(self, pipeline: Optional[OrderPipeline] = None):
+        with self.metrics.span("get_market"):
+            market = self.client.get_market(market_id=self.config.market_id)
         if not market:
             raise ValueError("Market not found")
         if market['closed']:
@@ -52,6 +122,7 @@ class Executor:
 
         # parse market data
         logger.info(f"Market: {market}")
+        self.client.metadata.warm([market])
         question = market['question']
         description = market['description']
         tokens = market['tokens']
@@ -60,9 +131,29 @@ class Executor:
 
         kwargs = {}
         if isinstance(self.agent, NewsAnalysisPredictorAgent):
-            kwargs['data_frm'] = self.client.get_price_history_with_interval(token_id=token_yes['id'], interval='1d', fidelity=60*24)
-
-        agent_prediction = self.agent.predict(question=question, description=description, data_frm=kwargs.get('data_frm', None))
+            kwargs['tags'] = market.get('tags') or []
+            # a retried or restarted cycle resumes the checkpointed prediction of the same cycle
+            self._thread_id = self._thread_id or f"{self.config.market_id}:{int(time.time() // self.config.sleep_time)}"
+            kwargs['thread_id'] = self._thread_id
+            with self.metrics.span("price_history"):
+                now = int(time.time())
+                if self.price_store is not None:
+                    self.price_store.sync(token_yes['token_id'], now=now)
+                    kwargs['data_frm'] = self.price_store.get_market_frame(
+                        token_yes['token_id'],
+                        start_ts=now - self.config.history_window,
+                        fidelity=self.config.history_fidelity,
+                    )
+                else:
+                    kwargs['data_frm'] = market_frame(self.client.get_price_history_with_timestamps(
+                        token_id=token_yes['token_id'],
+                        startTs=now - self.config.history_window,
+                        endTs=now,
+                        fidelity=self.config.history_fidelity,
+                    ))
+
+        with self.metrics.span("predict"):
+            agent_prediction = self.predict(question=question, description=description, **kwargs)
         logger.info(f"Agent prediction: {agent_prediction}")
 
         if not agent_prediction:
@@ -73,25 +164,51 @@ class Executor:
             logger.info("Agent is not confident on prediction")
             return
 
-        action: Action = base_strategy(
-            state=State(yes=agent_prediction['probabilities']['positive'], current_price=token_yes['price']),
-            conf=0.1
-        )
+        with self.metrics.span("strategy"):
+            action: Action = base_strategy(
+                state=State(
+                    yes=agent_prediction['probabilities']['positive'],
+                    confidence=agent_prediction.get('confidence', 'low'),
+                    current_price=token_yes['price'],
+                ),
+                conf=0.1
+            )
         logger.info(f"Action: {action}")
 
+        intent: Optional[OrderIntent] = None
         if action == Action.BUY:
-            self.client.make_market_order(token_id=token_yes['id'], amount_usd=self.config.trade_size, is_buy=True)
+            intent = OrderIntent(market_id=self.config.market_id, token_id=token_yes['token_id'], amount_usd=self.config.trade_size, is_buy=True)
         elif action == Action.SELL:
-            self.client.make_market_order(token_id=token_no['id'], amount_usd=self.config.trade_size, is_buy=False)
-        else:
-            pass
+            intent = OrderIntent(market_id=self.config.market_id, token_id=token_no['token_id'], amount_usd=self.config.trade_size, is_buy=False)
+
+        if intent is None:
+            return
+        if self.market_data is not None:
+            intent.price = self.market_data.simulate_fill(intent.token_id, intent.amount_usd, is_buy=intent.is_buy)
+        if pipeline is not None:
+            pipeline.add(intent)
+            return
+        with self.metrics.span("order"):
+            signed_order = self.client.make_market_order(token_id=intent.token_id, amount_usd=intent.amount_usd, is_buy=intent.is_buy, price=intent.price)
+            response = self.client.post_order(signed_order)
+        logger.info(f"Order response: {response}")
 
     def start(self):
+        failures = 0
         while True:
             try:
                 self.run()
+                failures = 0
             except Exception as e:
                 logger.error(e)
-
-            logger.info(f"Sleeping for {self.config.sleep_time} seconds")
-            time.sleep(self.config.sleep_time)
+                failures += 1
+
+            if 0 < failures <= self.config.max_retries:
+                sleep_time = self.config.retry_time
+            else:
+                if failures:
+                    self.abandon()
+                failures = 0
+                sleep_time = self.config.sleep_time
+            logger.info(f"Sleeping for {sleep_time} seconds")
+            time.sleep(sleep_time)
@@ -0,0 +1,97 @@
+import os
+import asyncio
+import threading
+
+from functools import lru_cache
+from typing import Optional
+from weakref import WeakKeyDictionary
+
+import httpx
+
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+
+
+# limits of the connection pool shared by every LLM client of the process
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS") or 100)
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS") or 20)
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY") or 60)
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT") or 120)
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+    )
+
+
+@lru_cache(maxsize=None)
+def get_http_client() -> httpx.Client:
+    """Keep-alive connection pool of the synchronous LLM calls."""
+    return httpx.Client(limits=_limits(), timeout=LLM_TIMEOUT)
+
+
+class LoopBoundAsyncClient(httpx.AsyncClient):
+    """
+    Async client sending every request through a connection pool of the running event loop.
+
+    Connections of an httpx.AsyncClient belong to the event loop that opened them, a client
+    shared by every loop of the process (e.g. one asyncio.run per prediction) would hand a
+    request a connection of a closed loop. Pools are dropped with their loop.
+    """
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._kwargs = kwargs
+        self._lock = threading.Lock()
+        self._pools: "WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = WeakKeyDictionary()
+
+    def pool(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._pools.get(loop)
+            if client is None:
+                client = self._pools[loop] = httpx.AsyncClient(**self._kwargs)
+            return client
+
+    async def send(self, request: httpx.Request, **kwargs) -> httpx.Response:
+        return await self.pool().send(request, **kwargs)
+
+
+@lru_cache(maxsize=None)
+def get_http_async_client() -> httpx.AsyncClient:
+    """Keep-alive connection pools of the asynchronous LLM calls, one per event loop."""
+    return LoopBoundAsyncClient(limits=_limits(), timeout=LLM_TIMEOUT)
+
+
+@lru_cache(maxsize=None)
+def get_llm(model: str, temperature: Optional[float] = None, max_tokens: Optional[int] = None, api_key: Optional[str] = None) -> ChatOpenAI:
+    """
+    Chat model shared by every caller with the same settings.
+
+    All the models share the connection pools of the process, so an agent reuses the
+    connections opened by the previous calls instead of opening its own.
+
+    Args:
+        model (str): OpenAI model name
+        temperature (Optional[float]): sampling temperature, the model default if None
+        max_tokens (Optional[int]): max tokens of a completion, no limit if None
+        api_key (Optional[str]): OpenAI API key, OPENAI_API_KEY if None
+
+    Returns:
+        ChatOpenAI: chat model
+    """
+    return ChatOpenAI(
+        model=model,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        api_key=api_key,
+        http_client=get_http_client(),
+        http_async_client=get_http_async_client(),
+    )
+
+
+@lru_cache(maxsize=None)
+def get_embeddings(model: str) -> OpenAIEmbeddings:
+    """Embedding model sharing the connection pools of the chat models."""
+    return OpenAIEmbeddings(model=model, http_client=get_http_client(), http_async_client=get_http_async_client())
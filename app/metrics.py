@@ -0,0 +1,164 @@
+import sys
+import json
+import inspect
+import math
+import functools
+import time
+import threading
+import contextvars
+
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+
+# attributes of the enclosing spans, e.g. the market_id of the cycle a graph node runs in
+_span_attrs: contextvars.ContextVar[Dict[str, Any]] = contextvars.ContextVar("span_attrs", default={})
+
+
+@dataclass
+class Span:
+    name: str
+    start: float # unix timestamp
+    duration: float # seconds
+    attrs: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+
+def percentile(values: List[float], q: float) -> float:
+    """
+    Percentile with linear interpolation between the closest ranks.
+
+    Args:
+        values (List[float]): sorted values
+        q (float): percentile between 0 and 100
+    """
+    if not values:
+        return math.nan
+    rank = (len(values) - 1) * q / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    return values[low] + (values[high] - values[low]) * (rank - low)
+
+
+def summarize(spans: Iterable[Span]) -> Dict[str, Dict[str, float]]:
+    """
+    Latency summary per span name.
+
+    Returns:
+        Dict[str, Dict[str, float]]: {name: {'count', 'mean', 'p50', 'p95', 'p99', 'max'}} in seconds
+    """
+    durations: Dict[str, List[float]] = {}
+    for span in spans:
+        durations.setdefault(span.name, []).append(span.duration)
+    summary = {}
+    for name, values in durations.items():
+        values.sort()
+        summary[name] = {
+            'count': len(values),
+            'mean': sum(values) / len(values),
+            'p50': percentile(values, 50),
+            'p95': percentile(values, 95),
+            'p99': percentile(values, 99),
+            'max': values[-1],
+        }
+    return summary
+
+
+def load_spans(path: str) -> List[Span]:
+    with open(path) as f:
+        return [Span(**json.loads(line)) for line in f if line.strip()]
+
+
+class LatencyRecorder:
+    """
+    Records timing spans and exports them as JSON lines.
+
+    Spans inherit the attributes of the enclosing spans of the same thread or task,
+    so the spans of the graph nodes carry the market_id of the executor cycle.
+    """
+    def __init__(self, path: Optional[str] = None, max_spans: int = 100000):
+        """
+        Args:
+            path (Optional[str]): JSON lines file every finished span is appended to
+            max_spans (int): max number of spans kept in memory for summaries
+        """
+        self.path = path
+        self.max_spans = max_spans
+        self._lock = threading.Lock()
+        self._spans: List[Span] = []
+
+    @contextmanager
+    def span(self, name: str, **attrs) -> Iterator[Dict[str, Any]]:
+        """
+        Time a block of code.
+
+        Example:
+            with recorder.span("get_market", market_id=market_id):
+                market = client.get_market(market_id)
+
+        Yields:
+            Dict[str, Any]: attributes of the span, can be extended inside the block
+        """
+        attrs = {**_span_attrs.get(), **attrs}
+        token = _span_attrs.set(attrs)
+        error = None
+        start, counter = time.time(), time.perf_counter()
+        try:
+            yield attrs
+        except BaseException as e:
+            error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _span_attrs.reset(token)
+            self.record(Span(name=name, start=start, duration=time.perf_counter() - counter, attrs=attrs, error=error))
+
+    def timed(self, name: str) -> Callable[[Callable], Callable]:
+        """
+        Decorator recording a span for every call of the function, coroutine functions are timed until they return.
+        """
+        def decorator(func: Callable) -> Callable:
+            if inspect.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    with self.span(name):
+                        return await func(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def record(self, span: Span):
+        line = json.dumps(asdict(span), default=str)
+        with self._lock:
+            self._spans.append(span)
+            if len(self._spans) > self.max_spans:
+                del self._spans[:len(self._spans) - self.max_spans]
+            if self.path is not None:
+                with open(self.path, 'a') as f:
+                    f.write(line + '\n')
+
+    @property
+    def spans(self) -> List[Span]:
+        with self._lock:
+            return list(self._spans)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return summarize(self.spans)
+
+
+def format_summary(summary: Dict[str, Dict[str, float]]) -> str:
+    lines = [f"{'span':<28}{'count':>8}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}"]
+    for name, stats in sorted(summary.items(), key=lambda item: -item[1]['mean'] * item[1]['count']):
+        lines.append(
+            f"{name:<28}{stats['count']:>8}{stats['p50']:>10.3f}{stats['p95']:>10.3f}{stats['p99']:>10.3f}{stats['max']:>10.3f}"
+        )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    # python -m app.metrics latency.jsonl
+    print(format_summary(summarize(load_spans(sys.argv[1]))))
@@ -0,0 +1,191 @@
+import time
+import logging
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from py_clob_client.exceptions import PolyApiException
+
+from app.clients.polymarket import PolyMarketClient
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class OrderIntent:
+    market_id: str # Market ID (condition id) the order belongs to
+    token_id: str
+    amount_usd: float
+    is_buy: bool = True
+    price: Optional[float] = None # worst accepted price, priced from the order book if None
+
+
+@dataclass
+class OrderResult:
+    intent: OrderIntent
+    success: bool
+    order_id: Optional[str] = None
+    response: Optional[Dict] = None
+    error: Optional[str] = None
+    attempts: int = 0
+
+
+def is_transient(error: Exception) -> bool:
+    """
+    Errors worth retrying: network errors, rate limits and server errors.
+    """
+    if isinstance(error, PolyApiException):
+        return error.status_code is None or error.status_code == 429 or error.status_code >= 500
+    return False
+
+
+class OrderPipeline:
+    """
+    Collects order intents of many markets and submits them together
+    1. Sign every order in parallel
+    2. Post signed orders in batches, concurrently
+    3. Retry batches which failed with a transient error
+
+    Orders rejected by the CLOB are reported in their OrderResult and not retried.
+    """
+    def __init__(
+        self,
+        client: PolyMarketClient,
+        max_workers: int = 8,
+        batch_size: int = 15,
+        retries: int = 3,
+        retry_delay: float = 1.0,
+        max_delay: float = 60.0,
+    ):
+        """
+        Args:
+            client (PolyMarketClient): client for the polymarket API
+            max_workers (int): number of orders signed or batches posted concurrently
+            batch_size (int): max number of orders in one request
+            retries (int): max number of attempts of a batch
+            retry_delay (float): delay before a retry in seconds, multiplied by the attempt number
+            max_delay (float): max time in seconds an intent should wait for a flush
+        """
+        self.client = client
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.max_delay = max_delay
+        self._lock = threading.Lock()
+        self._intents: List[OrderIntent] = []
+        self._oldest: Optional[float] = None # time the oldest collected intent was added
+
+    def add(self, intent: OrderIntent):
+        with self._lock:
+            if not self._intents:
+                self._oldest = time.time()
+            self._intents.append(intent)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._intents)
+
+    def due_in(self) -> Optional[float]:
+        """
+        Seconds until the oldest collected intent has waited max_delay, 0 if it is overdue.
+
+        Returns:
+            Optional[float]: None if no intent is collected
+        """
+        with self._lock:
+            if not self._intents:
+                return None
+            return max(self._oldest + self.max_delay - time.time(), 0.0)
+
+    def _sign(self, intent: OrderIntent) -> Tuple[OrderIntent, Any, Optional[str]]:
+        try:
+            signed_order = self.client.make_market_order(
+                token_id=intent.token_id,
+                amount_usd=intent.amount_usd,
+                is_buy=intent.is_buy,
+                price=intent.price,
+            )
+            return intent, signed_order, None
+        except Exception as e:
+            logger.error(f"Market {intent.market_id}: failed to sign order: {e}")
+            return intent, None, str(e)
+
+    def _post(self, batch: List[Tuple[OrderIntent, Any]], attempt: int) -> Tuple[List[OrderResult], List[Tuple[OrderIntent, Any]]]:
+        """
+        Post one batch.
+
+        Returns:
+            Tuple[List[OrderResult], List[Tuple[OrderIntent, Any]]]: final results and orders to retry
+        """
+        try:
+            responses = self.client.post_orders([signed_order for _, signed_order in batch])
+        except Exception as e:
+            if is_transient(e) and attempt < self.retries:
+                logger.info(f"Batch of {len(batch)} orders failed, retrying: {e}")
+                return [], batch
+            return [OrderResult(intent=intent, success=False, error=str(e), attempts=attempt) for intent, _ in batch], []
+
+        if not isinstance(responses, list):
+            responses = [responses]
+        results: List[OrderResult] = []
+        retry: List[Tuple[OrderIntent, Any]] = []
+        for i, (intent, signed_order) in enumerate(batch):
+            if i >= len(responses):
+                if attempt < self.retries:
+                    retry.append((intent, signed_order))
+                else:
+                    results.append(OrderResult(intent=intent, success=False, error="No response", attempts=attempt))
+                continue
+            response = responses[i]
+            success = bool(response.get('success')) and not response.get('errorMsg')
+            results.append(OrderResult(
+                intent=intent,
+                success=success,
+                order_id=response.get('orderID') or None,
+                response=response,
+                error=None if success else response.get('errorMsg') or "Order rejected",
+                attempts=attempt,
+            ))
+        return results, retry
+
+    def flush(self) -> List[OrderResult]:
+        """
+        Sign and submit every collected intent.
+
+        Returns:
+            List[OrderResult]: one result per intent, in the order the intents were added
+        """
+        with self._lock:
+            intents, self._intents = self._intents, []
+            self._oldest = None
+        if not intents:
+            return []
+
+        results: Dict[int, OrderResult] = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            pending: List[Tuple[OrderIntent, Any]] = []
+            for intent, signed_order, error in pool.map(self._sign, intents):
+                if error is not None:
+                    results[id(intent)] = OrderResult(intent=intent, success=False, error=error)
+                else:
+                    pending.append((intent, signed_order))
+
+            attempt = 0
+            while pending:
+                attempt += 1
+                if attempt > 1:
+                    time.sleep(self.retry_delay * (attempt - 1))
+                batches = [pending[i:i + self.batch_size] for i in range(0, len(pending), self.batch_size)]
+                pending = []
+                for batch_results, retry in pool.map(lambda batch: self._post(batch, attempt), batches):
+                    for result in batch_results:
+                        results[id(result.intent)] = result
+                    pending.extend(retry)
+
+        ordered = [results[id(intent)] for intent in intents]
+        logger.info(f"Submitted {len(ordered)} orders, {sum(result.success for result in ordered)} succeeded")
+        return ordered
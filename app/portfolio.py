@@ -0,0 +1,238 @@
+import time
+import heapq
+import logging
+
+from concurrent.futures import Future, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field, replace
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.agents.base_agent import BasePredictorAgent
+from app.cache import SQLiteCache
+from app.catalog import MarketCatalog
+from app.clients.market_data import MarketDataFeed
+from app.clients.polymarket import PolyMarketClient
+from app.clients.scanner import MarketFilter, MarketScanner
+from app.executor import Config, Executor
+from app.metrics import LatencyRecorder
+from app.orders import OrderPipeline, OrderResult
+from app.price_store import PriceHistoryStore
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PortfolioConfig:
+    market_ids: List[str] # Market IDs (condition ids) in the polymarket API
+    sleep_time: int = 60 * 60 * 24
+    trade_size: float = 10
+    max_workers: int = 8
+    schedules: Dict[str, int] = field(default_factory=dict) # per-market sleep_time overrides
+
+
+class PortfolioExecutor:
+    """
+    Executor for a portfolio of prediction markets
+    1. Keep a schedule of the next prediction cycle for every market
+    2. Run due cycles on a bounded worker pool
+    3. Reschedule every market after its cycle is finished, a failed cycle is retried
+       after the retry_time of its executor, resuming its checkpointed prediction
+    4. Submit the collected orders in batches when the pool goes idle, a batch is full
+       or the oldest order has waited the max_delay of the pipeline
+
+    All markets share one PolyMarketClient and one prediction agent.
+    """
+    def __init__(
+        self,
+        config: PortfolioConfig,
+        agent: BasePredictorAgent,
+        client: PolyMarketClient,
+        cache: Optional[SQLiteCache] = None,
+        price_store: Optional[PriceHistoryStore] = None,
+        pipeline: Optional[OrderPipeline] = None,
+        market_data: Optional[MarketDataFeed] = None,
+        metrics: Optional[LatencyRecorder] = None,
+    ):
+        """
+        Executor for a portfolio of prediction markets
+
+        Args:
+            config (PortfolioConfig): configuration for the portfolio
+            agent (BasePredictorAgent): prediction agent shared by all markets
+            client (PolyMarketClient): client for the polymarket API shared by all markets
+            cache (Optional[SQLiteCache]): prediction cache shared by all markets
+            price_store (Optional[PriceHistoryStore]): price history store shared by all markets
+            pipeline (Optional[OrderPipeline]): order pipeline, by default a new one on the shared client
+            market_data (Optional[MarketDataFeed]): local order books shared by all markets
+            metrics (Optional[LatencyRecorder]): latency recorder shared by all markets
+        """
+        if not config.market_ids:
+            raise ValueError("Portfolio has no markets")
+        if config.max_workers < 1:
+            raise ValueError("max_workers must be positive")
+
+        logger.info("Initializing portfolio executor")
+        logger.info(f"Config: {config}")
+        self.agent = agent
+        self.client = client
+        self.config = config
+        # an empty pipeline is falsy
+        self.pipeline = pipeline if pipeline is not None else OrderPipeline(client, max_workers=config.max_workers)
+        self.metrics = metrics or LatencyRecorder()
+        self.executors: Dict[str, Executor] = {
+            market_id: Executor(
+                config=Config(
+                    market_id=market_id,
+                    sleep_time=config.schedules.get(market_id, config.sleep_time),
+                    trade_size=config.trade_size,
+                ),
+                agent=agent,
+                client=client,
+                cache=cache,
+                price_store=price_store,
+                market_data=market_data,
+                metrics=self.metrics,
+            )
+            for market_id in dict.fromkeys(config.market_ids)
+        }
+
+    @classmethod
+    def from_query(
+        cls,
+        config: PortfolioConfig,
+        agent: BasePredictorAgent,
+        client: PolyMarketClient,
+        query: Optional[Callable[[Dict], bool]] = None,
+        market_filter: Optional[MarketFilter] = None,
+        cache: Optional[SQLiteCache] = None,
+        price_store: Optional[PriceHistoryStore] = None,
+    ) -> "PortfolioExecutor":
+        """
+        Build a portfolio from the markets matching a query.
+
+        Args:
+            config (PortfolioConfig): configuration for the portfolio, market_ids are replaced
+            agent (BasePredictorAgent): prediction agent shared by all markets
+            client (PolyMarketClient): client for the polymarket API
+            query (Optional[Callable[[Dict], bool]]): predicate over the market dicts returned by the API
+            market_filter (Optional[MarketFilter]): filter applied while scanning the whole catalog
+            cache (Optional[SQLiteCache]): prediction cache shared by all markets
+            price_store (Optional[PriceHistoryStore]): price history store shared by all markets
+
+        Returns:
+            PortfolioExecutor: executor for the matching markets
+        """
+        market_ids = [
+            market['condition_id']
+            for market in MarketScanner(client).scan(market_filter)
+            if query is None or query(market)
+        ]
+        logger.info(f"Query matched {len(market_ids)} markets")
+        return cls(config=replace(config, market_ids=market_ids), agent=agent, client=client,
+                   cache=cache, price_store=price_store)
+
+    @classmethod
+    def from_catalog(
+        cls,
+        config: PortfolioConfig,
+        agent: BasePredictorAgent,
+        client: PolyMarketClient,
+        catalog: MarketCatalog,
+        cache: Optional[SQLiteCache] = None,
+        price_store: Optional[PriceHistoryStore] = None,
+        **filters,
+    ) -> "PortfolioExecutor":
+        """
+        Build a portfolio from the local market catalog without an API call.
+
+        Args:
+            config (PortfolioConfig): configuration for the portfolio, market_ids are replaced
+            agent (BasePredictorAgent): prediction agent shared by all markets
+            client (PolyMarketClient): client for the polymarket API
+            catalog (MarketCatalog): synced local catalog
+            cache (Optional[SQLiteCache]): prediction cache shared by all markets
+            price_store (Optional[PriceHistoryStore]): price history store shared by all markets
+            **filters: arguments of MarketCatalog.find_markets
+
+        Returns:
+            PortfolioExecutor: executor for the matching markets
+        """
+        market_ids = [market['condition_id'] for market in catalog.find_markets(**filters)]
+        logger.info(f"Catalog matched {len(market_ids)} markets")
+        return cls(config=replace(config, market_ids=market_ids), agent=agent, client=client,
+                   cache=cache, price_store=price_store)
+
+    def _run_market(self, market_id: str) -> Optional[Exception]:
+        try:
+            self.executors[market_id].run(pipeline=self.pipeline)
+        except Exception as e:
+            logger.error(f"Market {market_id}: {e}")
+            return e
+        return None
+
+    def _submit_orders(self) -> List[OrderResult]:
+        with self.metrics.span("submit_orders", orders=len(self.pipeline)):
+            results = self.pipeline.flush()
+        for result in results:
+            if not result.success:
+                logger.error(f"Market {result.intent.market_id}: order failed: {result.error}")
+        return results
+
+    def run_once(self) -> Dict[str, Optional[Exception]]:
+        """
+        Run one prediction cycle for every market, wait for all of them and submit the orders.
+
+        Returns:
+            Dict[str, Optional[Exception]]: error per market id, None if the cycle succeeded
+        """
+        with ThreadPoolExecutor(max_workers=self.config.max_workers) as pool:
+            futures = {market_id: pool.submit(self._run_market, market_id) for market_id in self.executors}
+            errors = {market_id: future.result() for market_id, future in futures.items()}
+        self._submit_orders()
+        return errors
+
+    def start(self):
+        now = time.time()
+        schedule: List[Tuple[float, str]] = [(now, market_id) for market_id in self.executors]
+        heapq.heapify(schedule)
+        running: Dict[Future, str] = {}
+        failures: Dict[str, int] = {market_id: 0 for market_id in self.executors}
+
+        with ThreadPoolExecutor(max_workers=self.config.max_workers) as pool:
+            while True:
+                now = time.time()
+                while schedule and schedule[0][0] <= now and len(running) < self.config.max_workers:
+                    _, market_id = heapq.heappop(schedule)
+                    running[pool.submit(self._run_market, market_id)] = market_id
+
+                # with every worker busy only a finished cycle can free a slot
+                if schedule and len(running) < self.config.max_workers:
+                    timeout = max(schedule[0][0] - now, 0)
+                else:
+                    timeout = None
+                # wake up when the oldest collected order has waited long enough
+                due_in = self.pipeline.due_in()
+                if due_in is not None and (timeout is None or due_in < timeout):
+                    timeout = due_in
+                if not running:
+                    logger.info(f"Sleeping for {timeout:.0f} seconds")
+                    time.sleep(timeout)
+                    continue
+
+                done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    market_id = running.pop(future)
+                    executor = self.executors[market_id]
+                    failures[market_id] = failures[market_id] + 1 if future.result() is not None else 0
+                    if 0 < failures[market_id] <= executor.config.max_retries:
+                        sleep_time = executor.config.retry_time
+                    else:
+                        if failures[market_id]:
+                            executor.abandon()
+                        failures[market_id] = 0
+                        sleep_time = executor.config.sleep_time
+                    heapq.heappush(schedule, (time.time() + sleep_time, market_id))
+                    logger.info(f"Market {market_id}: next cycle in {sleep_time} seconds")
+
+                if not running or len(self.pipeline) >= self.pipeline.batch_size or self.pipeline.due_in() == 0:
+                    self._submit_orders()
@@ -0,0 +1,171 @@
+import time
+import sqlite3
+import logging
+import threading
+
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from app.clients.polymarket import PolyMarketClient
+
+
+logger = logging.getLogger(__name__)
+
+
+def market_frame(history: List[Dict]) -> pd.DataFrame:
+    """
+    Price history points of the YES token, as returned by the CLOB, in the format of the market data agents.
+
+    Returns:
+        pd.DataFrame: columns date ('%m-%d-%Y %H:%M'), yes and no
+    """
+    return pd.DataFrame({
+        'date': [datetime.fromtimestamp(point['t'], tz=timezone.utc).strftime('%m-%d-%Y %H:%M') for point in history],
+        'yes': [point['p'] for point in history],
+        'no': [round(1 - point['p'], 6) for point in history],
+    })
+
+
+class PriceHistoryStore:
+    """
+    Local store of the CLOB price history per token.
+
+    sync() downloads only the points newer than the last stored timestamp,
+    every read is served from the SQLite database without touching the network.
+    Points are stored at the sync fidelity and resampled on read.
+    """
+    def __init__(
+        self,
+        path: str,
+        client: Optional[PolyMarketClient] = None,
+        fidelity: int = 60,
+        backfill: int = 60 * 60 * 24 * 30,
+        chunk: int = 60 * 60 * 24 * 7,
+    ):
+        """
+        Args:
+            path (str): path of the SQLite database
+            client (Optional[PolyMarketClient]): client used by sync, reads work without it
+            fidelity (int): resolution of the synced points, in minutes
+            backfill (int): seconds of history downloaded for a token seen for the first time
+            chunk (int): max seconds of history requested at once
+        """
+        self.client = client
+        self.fidelity = fidelity
+        self.backfill = backfill
+        self.chunk = chunk
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS price_history (
+                    token_id TEXT NOT NULL,
+                    t INTEGER NOT NULL,
+                    p REAL NOT NULL,
+                    PRIMARY KEY (token_id, t)
+                ) WITHOUT ROWID
+            """)
+
+    def last_timestamp(self, token_id: str) -> Optional[int]:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT MAX(t) FROM price_history WHERE token_id = ?", (token_id,)
+            ).fetchone()[0]
+
+    def add_points(self, token_id: str, points: List[Dict]) -> int:
+        """
+        Store price points, a point with an already stored timestamp is replaced.
+
+        Args:
+            token_id (str): the CLOB token id
+            points (List[Dict]): [{"t": 1632141600, "p": 0.003}, ...]
+
+        Returns:
+            int: number of stored points
+        """
+        rows = [(token_id, int(point['t']), float(point['p'])) for point in points]
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO price_history (token_id, t, p) VALUES (?, ?, ?)", rows)
+        return len(rows)
+
+    def sync(self, token_id: str, now: Optional[int] = None) -> int:
+        """
+        Download the points newer than the last stored one.
+
+        Args:
+            token_id (str): the CLOB token id
+            now (Optional[int]): end of the synced range, current time by default
+
+        Returns:
+            int: number of downloaded points
+        """
+        if self.client is None:
+            raise ValueError("Price history store has no client to sync with")
+
+        now = int(now or time.time())
+        last = self.last_timestamp(token_id)
+        start = last + 1 if last is not None else now - self.backfill
+
+        count = 0
+        while start < now:
+            end = min(start + self.chunk, now)
+            points = self.client.get_price_history_with_timestamps(token_id, start, end, self.fidelity)
+            count += self.add_points(token_id, points)
+            start = end + 1
+        logger.info(f"Synced {count} price points for {token_id}")
+        return count
+
+    def get_history(
+        self,
+        token_id: str,
+        start_ts: Optional[int] = None,
+        end_ts: Optional[int] = None,
+        fidelity: Optional[int] = None,
+    ) -> List[Dict]:
+        """
+        Read the stored price history.
+
+        Args:
+            token_id (str): the CLOB token id
+            start_ts (Optional[int]): the start time, a unix timestamp in UTC
+            end_ts (Optional[int]): the end time, a unix timestamp in UTC
+            fidelity (Optional[int]): resolution in minutes, the last point of every bucket is kept
+
+        Returns:
+            List[Dict]: [{"t": 1632141600, "p": 0.003}, ...] in the format of PolyMarketClient
+        """
+        query = "SELECT t, p FROM price_history WHERE token_id = ?"
+        params: list = [token_id]
+        if start_ts is not None:
+            query += " AND t >= ?"
+            params.append(int(start_ts))
+        if end_ts is not None:
+            query += " AND t <= ?"
+            params.append(int(end_ts))
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY t", params).fetchall()
+
+        if fidelity is None or fidelity <= self.fidelity:
+            return [{"t": t, "p": p} for t, p in rows]
+
+        buckets: Dict[int, Dict] = {}
+        for t, p in rows:
+            buckets[t // (fidelity * 60)] = {"t": t, "p": p}
+        return list(buckets.values())
+
+    def get_market_frame(
+        self,
+        token_id: str,
+        start_ts: Optional[int] = None,
+        end_ts: Optional[int] = None,
+        fidelity: Optional[int] = None,
+    ) -> pd.DataFrame:
+        """
+        Price history of the YES token in the format of the market data agents.
+
+        Returns:
+            pd.DataFrame: columns date ('%m-%d-%Y %H:%M'), yes and no
+        """
+        return market_frame(self.get_history(token_id, start_ts=start_ts, end_ts=end_ts, fidelity=fidelity))
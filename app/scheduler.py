@@ -0,0 +1,271 @@
+import re
+import time
+import logging
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from app.clients.llamafeed import DefillamaFeedClient
+from app.clients.market_data import MarketDataFeed
+from app.clients.polymarket import PolyMarketClient
+from app.executor import Executor
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TriggerConfig:
+    price_move: float = 0.05 # absolute move of the YES price since the last prediction
+    new_items: int = 20 # number of new feed items since the last prediction
+    max_staleness: int = 60 * 60 * 24 # seconds between predictions without any other trigger
+    close_window: int = 60 * 60 * 48 # seconds before end_date_iso when the market is considered closing
+    close_staleness: int = 60 * 60 * 4 # max_staleness used inside the close window
+    poll_interval: int = 60 * 5 # seconds between signal polls
+
+
+@dataclass
+class MarketSignals:
+    price: float # current YES price
+    new_items: int # feed items published since the last prediction
+    seconds_to_end: Optional[float] # seconds until end_date_iso, None if unknown
+    timestamp: float
+
+
+@dataclass
+class MarketWatch:
+    executor: Executor
+    token_id: Optional[str] = None # YES token id
+    end_ts: Optional[float] = None # end_date_iso as unix timestamp
+    closed: bool = False
+    last_run: Optional[float] = None
+    last_price: Optional[float] = None
+    failures: int = 0 # failed runs since the last successful one
+    retry_at: Optional[float] = None # no run before this unix timestamp after a failure
+
+
+def check_triggers(triggers: TriggerConfig, signals: MarketSignals, watch: MarketWatch) -> Optional[str]:
+    """
+    Decide whether a market has to be predicted again.
+
+    Args:
+        triggers (TriggerConfig): trigger thresholds
+        signals (MarketSignals): freshly polled signals of the market
+        watch (MarketWatch): state of the market at the last prediction
+
+    Returns:
+        Optional[str]: reason of the re-prediction or None
+    """
+    if watch.last_run is None or watch.last_price is None:
+        return "initial"
+
+    price_move = abs(signals.price - watch.last_price)
+    if price_move >= triggers.price_move:
+        return f"price moved by {price_move:.3f}"
+
+    if triggers.new_items and signals.new_items >= triggers.new_items:
+        return f"{signals.new_items} new feed items"
+
+    max_staleness = triggers.max_staleness
+    if signals.seconds_to_end is not None and signals.seconds_to_end <= triggers.close_window:
+        max_staleness = min(max_staleness, triggers.close_staleness)
+    staleness = signals.timestamp - watch.last_run
+    if staleness >= max_staleness:
+        return f"prediction is {staleness:.0f} seconds old"
+
+    return None
+
+
+STOP_WORDS = {
+    'will', 'what', 'when', 'which', 'with', 'than', 'that', 'this', 'from', 'before', 'after',
+    'above', 'below', 'over', 'under', 'there', 'their', 'have', 'been', 'more', 'less', 'into',
+}
+
+
+def market_keywords(market: Dict) -> Tuple[Set[str], Set[str]]:
+    """
+    Keywords of a market to match feed items against.
+
+    Args:
+        market (Dict): market data from the polymarket API
+
+    Returns:
+        Tuple[Set[str], Set[str]]: lowercased words of the question and lowercased tags
+    """
+    words = {word for word in re.findall(r"[a-z0-9$]+", market.get('question', '').lower()) if len(word) >= 4 and word not in STOP_WORDS}
+    tags = {tag.lower() for tag in market.get('tags') or [] if tag}
+    return words, tags
+
+
+def is_relevant(text: str, words: Set[str], tags: Set[str], min_words: int = 2) -> bool:
+    """Whether a feed item mentions one of the tags or enough words of the question, as whole words."""
+    text = text.lower()
+    # "ai" must not match "said", multi-word tags match as a phrase
+    if any(re.search(rf"(?<![a-z0-9$]){re.escape(tag)}(?![a-z0-9$])", text) for tag in tags):
+        return True
+    found = set(re.findall(r"[a-z0-9$]+", text)) & words
+    return bool(words) and len(found) >= min(min_words, len(words))
+
+
+def llamafeed_counter(market: Dict, since: float) -> int:
+    """
+    Count news and tweets about a market published in DefillamaFeed after a timestamp.
+
+    Args:
+        market (Dict): market data from the polymarket API
+        since (float): unix timestamp of the last prediction
+
+    Returns:
+        int: number of new feed items about the market
+    """
+    client = DefillamaFeedClient()
+    words, tags = market_keywords(market)
+    count = 0
+    for items, key, fields in (
+        (client.get_news(), 'pub_date', ('title', 'content', 'topic', 'entities')),
+        (client.get_tweets(), 'tweet_created_at', ('tweet',)),
+    ):
+        for item in items:
+            try:
+                published = datetime.fromisoformat(item[key].replace('Z', '+00:00')).timestamp()
+            except (KeyError, TypeError, ValueError):
+                continue
+            if published <= since:
+                continue
+            text = " ".join(" ".join(value) if isinstance(value, list) else str(value) for value in (item.get(field) for field in fields) if value)
+            if is_relevant(text, words, tags):
+                count += 1
+    return count
+
+
+class EventDrivenScheduler:
+    """
+    Scheduler which re-runs executors only when the market changes
+    1. Poll cheap signals: YES price, new feed items and time to the end date
+    2. Check the triggers against the state of the last prediction
+    3. Run the executors of the triggered markets
+    """
+    def __init__(
+        self,
+        executors: List[Executor],
+        client: PolyMarketClient,
+        triggers: Optional[TriggerConfig] = None,
+        feed_counter: Optional[Callable[[Dict, float], int]] = None,
+        max_workers: int = 4,
+        market_data: Optional[MarketDataFeed] = None,
+    ):
+        """
+        Event driven scheduler for prediction market executors
+
+        Args:
+            executors (List[Executor]): executors of the watched markets
+            client (PolyMarketClient): client for the polymarket API
+            triggers (Optional[TriggerConfig]): trigger thresholds
+            feed_counter (Optional[Callable[[Dict, float], int]]): counts feed items for a market since a timestamp
+            max_workers (int): number of executors run concurrently
+            market_data (Optional[MarketDataFeed]): local order books, the YES price is read from them instead of a request
+        """
+        self.client = client
+        self.triggers = triggers or TriggerConfig()
+        self.feed_counter = feed_counter
+        self.max_workers = max_workers
+        self.market_data = market_data
+        self.watches: Dict[str, MarketWatch] = {
+            executor.config.market_id: MarketWatch(executor=executor) for executor in executors
+        }
+        self._markets: Dict[str, Dict] = {}
+
+    def _refresh_market(self, market_id: str, watch: MarketWatch):
+        market = self.client.get_market(market_id=market_id)
+        if not market:
+            raise ValueError("Market not found")
+        self._markets[market_id] = market
+        watch.closed = market['closed']
+        watch.token_id = [token for token in market['tokens'] if token['outcome'].lower() == 'yes'][0]['token_id']
+        if market.get('end_date_iso'):
+            watch.end_ts = datetime.fromisoformat(market['end_date_iso'].replace('Z', '+00:00')).timestamp()
+
+    def get_signals(self, market_id: str) -> MarketSignals:
+        watch = self.watches[market_id]
+        if watch.token_id is None:
+            self._refresh_market(market_id, watch)
+
+        now = time.time()
+        new_items = 0
+        if self.feed_counter is not None and watch.last_run is not None:
+            new_items = self.feed_counter(self._markets[market_id], watch.last_run)
+
+        price = None
+        if self.market_data is not None:
+            book = self.market_data.get_book(watch.token_id)
+            price = book.midpoint() if book is not None else None
+        if price is None:
+            price = self.client.get_price(token_id=watch.token_id)
+
+        return MarketSignals(
+            price=price,
+            new_items=new_items,
+            seconds_to_end=watch.end_ts - now if watch.end_ts is not None else None,
+            timestamp=now,
+        )
+
+    def _run_market(self, market_id: str, signals: MarketSignals):
+        watch = self.watches[market_id]
+        config = watch.executor.config
+        try:
+            watch.executor.run()
+        except Exception as e:
+            logger.error(f"Market {market_id}: {e}")
+            # the end date or the closed flag may have changed
+            watch.token_id = None
+            watch.failures += 1
+            if watch.failures <= config.max_retries:
+                # the market stays due, retried after retry_time
+                watch.retry_at = signals.timestamp + config.retry_time
+                return
+            logger.error(f"Market {market_id}: giving up after {config.max_retries} retries")
+            # the cycle is over, the market waits for its next trigger
+            watch.executor.abandon()
+        watch.failures = 0
+        watch.retry_at = None
+        watch.last_run = signals.timestamp
+        watch.last_price = signals.price
+
+    def poll(self) -> Dict[str, str]:
+        """
+        Poll signals of every market and run the triggered executors.
+
+        Returns:
+            Dict[str, str]: trigger reason per re-predicted market id
+        """
+        triggered: Dict[str, MarketSignals] = {}
+        reasons: Dict[str, str] = {}
+        for market_id, watch in self.watches.items():
+            if watch.closed or (watch.retry_at is not None and time.time() < watch.retry_at):
+                continue
+            try:
+                signals = self.get_signals(market_id)
+            except Exception as e:
+                logger.error(f"Market {market_id}: failed to poll signals: {e}")
+                continue
+            if watch.closed:
+                continue
+
+            reason = check_triggers(self.triggers, signals, watch)
+            if reason:
+                logger.info(f"Market {market_id}: {reason}")
+                triggered[market_id] = signals
+                reasons[market_id] = reason
+
+        if triggered:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                list(pool.map(lambda item: self._run_market(*item), triggered.items()))
+        return reasons
+
+    def start(self):
+        while True:
+            self.poll()
+            logger.info(f"Sleeping for {self.triggers.poll_interval} seconds")
+            time.sleep(self.triggers.poll_interval)
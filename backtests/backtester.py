@@ -1,10 +1,11 @@
 import time
 
-from typing import List, Dict
+from typing import List, Dict, Optional
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 
 from app.agents.base_agent import BasePredictorAgent
+from app.price_store import PriceHistoryStore
 
 
 @dataclass
@@ -19,6 +20,9 @@ class BacktestConfig:
         delta_time (int): Time delta in days between timestamps
         question (str): Question to ask the predictor agent
         description (str): Description of the event
+        price_store (Optional[PriceHistoryStore]): Local price history passed to the agent as data_frm
+        token_id (Optional[str]): YES token id of the market in the price store
+        history_window (int): Seconds of price history before every timestamp
     """
     agent: BasePredictorAgent
     start_date: datetime
@@ -26,6 +30,9 @@ class BacktestConfig:
     delta_time: int
     question: str
     description: str
+    price_store: Optional[PriceHistoryStore] = None
+    token_id: Optional[str] = None
+    history_window: int = 60 * 60 * 24 * 30
 
 
 class PredictorBacktester:
@@ -49,7 +56,16 @@ class PredictorBacktester:
     def run_backtest(self) -> List[Dict]:
         responses: List[Dict] = []
         for date in self._generate_dates():
-            response = self.agent.predict(question=self.config.question, description=self.config.description)
+            kwargs = {}
+            if self.config.price_store is not None and self.config.token_id is not None:
+                end_ts = int(date.timestamp())
+                kwargs['data_frm'] = self.config.price_store.get_market_frame(
+                    self.config.token_id,
+                    start_ts=end_ts - self.config.history_window,
+                    end_ts=end_ts,
+                    fidelity=60 * 24,
+                )
+            response = self.agent.predict(question=self.config.question, description=self.config.description, **kwargs)
             response['date'] = date
             responses.append(response)
             time.sleep(10)
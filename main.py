@@ -1,16 +1,23 @@
+import os
+
+from app.cache import SQLiteCache
 from app.executor import Executor, Config
+from app.llm import get_embeddings
+from app.metrics import LatencyRecorder
+from app.portfolio import PortfolioExecutor, PortfolioConfig
+from app.price_store import PriceHistoryStore
+from app.scheduler import EventDrivenScheduler, llamafeed_counter
 from app.agents.base_agent import BasePredictorAgent
 from app.agentsV2.agents_graph import NewsAnalysisPredictorAgent
+from app.agentsV2.settings import EMBEDDING_MODEL
+from app.agentsV2.source_cache import SourceCache
+from app.agentsV2.tag_sources import TagSourceTable
+from app.clients.market_data import MarketDataFeed
 from app.clients.polymarket import PolyMarketClient
 from app.utils import get_env
 
 
 if __name__ == "__main__":
-    config: Config = Config(
-        trade_size=float(get_env("TRADE_SIZE")),
-        market_id=get_env("MARKET_ID"),
-        sleep_time=60*60*24,
-    )
     polymarket: PolyMarketClient = PolyMarketClient(
         key=get_env("PK"),
         api_key=get_env("CLOB_API_KEY"),
@@ -18,10 +25,85 @@ if __name__ == "__main__":
         api_passphrase=get_env("CLOB_PASS_PHRASE"),
     )
 
-    agent: BasePredictorAgent = NewsAnalysisPredictorAgent()
-    executor = Executor(
-        config=config,
-        polymarket=polymarket,
-        agent=agent,
+    metrics: LatencyRecorder = LatencyRecorder(os.getenv("LATENCY_LOG") or None)
+    source_cache: SourceCache = None
+    if os.getenv("TOP_NEWS_CACHE"):
+        source_cache = SourceCache(get_env("TOP_NEWS_CACHE"), embeddings=get_embeddings(EMBEDDING_MODEL))
+    tag_sources: TagSourceTable = None
+    if os.getenv("TAG_SOURCES_DB"):
+        tag_sources = TagSourceTable(get_env("TAG_SOURCES_DB"))
+    agent: BasePredictorAgent = NewsAnalysisPredictorAgent(
+        metrics=metrics,
+        source_cache=source_cache,
+        tag_sources=tag_sources,
+        checkpoint_path=os.getenv("PREDICTION_CHECKPOINTS") or None,
     )
+    cache: SQLiteCache = None
+    if os.getenv("PREDICTION_CACHE"):
+        cache = SQLiteCache(get_env("PREDICTION_CACHE"), table="predictions", ttl=60*60*24*7, max_entries=10000)
+    price_store: PriceHistoryStore = None
+    if os.getenv("PRICE_HISTORY_DB"):
+        price_store = PriceHistoryStore(get_env("PRICE_HISTORY_DB"), client=polymarket)
+
+    market_ids = [market_id.strip() for market_id in (os.getenv("MARKET_IDS") or get_env("MARKET_ID")).split(",") if market_id.strip()]
+    market_data: MarketDataFeed = None
+    if os.getenv("MARKET_DATA_FEED"):
+        # local order books of both tokens of every market, orders and signals are priced without a request
+        market_data = MarketDataFeed(
+            [token['token_id'] for market_id in market_ids for token in polymarket.get_market(market_id)['tokens']],
+            client=polymarket,
+        )
+        market_data.start()
+
+    if os.getenv("EVENT_DRIVEN"):
+        # re-predict the markets when their price, feed or end date calls for it
+        executor = EventDrivenScheduler(
+            executors=[
+                Executor(
+                    config=Config(trade_size=float(get_env("TRADE_SIZE")), market_id=market_id, sleep_time=60*60*24),
+                    agent=agent,
+                    client=polymarket,
+                    cache=cache,
+                    price_store=price_store,
+                    market_data=market_data,
+                    metrics=metrics,
+                )
+                for market_id in market_ids
+            ],
+            client=polymarket,
+            feed_counter=llamafeed_counter,
+            max_workers=int(os.getenv("MAX_WORKERS") or 4),
+            market_data=market_data,
+        )
+    elif os.getenv("MARKET_IDS"):
+        portfolio_config: PortfolioConfig = PortfolioConfig(
+            market_ids=market_ids,
+            trade_size=float(get_env("TRADE_SIZE")),
+            max_workers=int(os.getenv("MAX_WORKERS") or 8),
+            sleep_time=60*60*24,
+        )
+        executor = PortfolioExecutor(
+            config=portfolio_config,
+            agent=agent,
+            client=polymarket,
+            cache=cache,
+            price_store=price_store,
+            market_data=market_data,
+            metrics=metrics,
+        )
+    else:
+        config: Config = Config(
+            trade_size=float(get_env("TRADE_SIZE")),
+            market_id=market_ids[0],
+            sleep_time=60*60*24,
+        )
+        executor = Executor(
+            config=config,
+            agent=agent,
+            client=polymarket,
+            cache=cache,
+            price_store=price_store,
+            market_data=market_data,
+            metrics=metrics,
+        )
     executor.start()
@@ -0,0 +1,47 @@
+"""
+Refresh the tag -> trusted sources table used by NewsAnalysisPredictorAgent.
+
+Usage, from the repository root:
+    python -m scripts.refresh_tag_sources --catalog catalog.db --table tag_sources.db
+"""
+import time
+import argparse
+import logging
+
+from dotenv import load_dotenv
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Run AgentTopNews for every market tag and store the sources.')
+    parser.add_argument('--table', type=str, required=True, help='SQLite database of the tag sources table.')
+    parser.add_argument('--catalog', type=str, help='SQLite database of the market catalog to take the tags from.')
+    parser.add_argument('--tags', type=str, nargs='*', default=[], help='Tags to refresh in addition to the catalog tags.')
+    parser.add_argument('--min-markets', type=int, default=5, help='Min number of catalog markets of a tag (default: 5).')
+    parser.add_argument('--max-age', type=int, default=60*60*24*7, help='Refresh only tags older than this many seconds.')
+    parser.add_argument('--max-workers', type=int, default=4, help='Number of tags processed concurrently.')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+
+    # settings read the API keys at import
+    from app.agentsV2.tag_sources import TagSourceTable
+    from app.catalog import MarketCatalog
+
+    tags = [tag.lower() for tag in args.tags]
+    if args.catalog:
+        tags.extend(MarketCatalog(args.catalog).get_tags(min_markets=args.min_markets))
+
+    table = TagSourceTable(args.table)
+    updated_at = table.tags()
+    stale = [tag for tag in dict.fromkeys(tags) if tag not in updated_at or time.time() - updated_at[tag] > args.max_age]
+    logging.info(f"Refreshing {len(stale)} of {len(tags)} tags")
+    for tag, sources in table.refresh(stale, max_workers=args.max_workers).items():
+        print(f"{tag}: {', '.join(sources)}")
+
+
+if __name__ == '__main__':
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,83 @@
+import asyncio
+import re
+
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+from app.agentsV2 import agent_get_news, agents_graph, search
+from app.agentsV2.agent_get_news import NewsAnalysisAgent
+from app.agentsV2.agents_graph import NewsAnalysisPredictorAgent
+
+
+class FakeSearch:
+    def invoke(self, query):
+        raise AssertionError("the async path must not block on the search")
+
+    async def ainvoke(self, query):
+        # give the other analyses time to run in between
+        await asyncio.sleep(0.05)
+        return [{'url': f"https://news.example/{query['query'].split()[1]}", 'content': query['query']}]
+
+
+def test_concurrent_async_analyses_keep_their_sources(monkeypatch):
+    monkeypatch.setattr(agent_get_news, "llm", RunnableLambda(lambda prompt: AIMessage(content=prompt.to_string())))
+    monkeypatch.setattr(search, "search_tool", FakeSearch())
+
+    agent = NewsAnalysisAgent()
+
+    async def run(inputs):
+        summary = await NewsAnalysisAgent.afetch_and_summarize_news(inputs['input'])
+        return {'output': summary + " | " + await NewsAnalysisAgent.adebate_analysis_tool('why?')}
+
+    agent.news_agent = RunnableLambda(lambda inputs: None, afunc=run)
+
+    async def analyze_all():
+        return await asyncio.gather(*[agent.aanalyze_news(f"question {i}", f"source-{i}") for i in range(8)])
+
+    results = asyncio.run(analyze_all())
+    for i, result in enumerate(results):
+        assert all(f"source-{j}" not in result for j in range(8) if j != i)
+        # the debate tool sees the summary of its own analysis
+        assert result.count(f"source-{i}") == 2
+
+
+def test_apredict_runs_the_graph_on_the_event_loop(monkeypatch):
+    def blocking(*args, **kwargs):
+        raise AssertionError("the async path must not call the sync agents")
+
+    async def final_analysis(self, state):
+        return {"final_analysis": {"question": state["user_request"], "turns": len(state["messages"])}}
+
+    async def digest(question, previous, turn):
+        return {"claims": [turn], "numbers": [], "probability": int(re.match(r"\d+", turn).group()) / 100}
+
+    async def news(query, top_url, session=None):
+        await asyncio.sleep(0.05)
+        return "70%"
+
+    async def option(query, event, market_data=None):
+        await asyncio.sleep(0.05)
+        return "40%" if event == "disagree" else "68%"
+
+    monkeypatch.setattr(NewsAnalysisPredictorAgent, "_acreate_final_analysis", final_analysis)
+    predictor = NewsAnalysisPredictorAgent()
+    monkeypatch.setattr(predictor._top_news_agent, "get_top_news", blocking)
+    monkeypatch.setattr(predictor._top_news_agent, "aget_top_news", lambda query: asyncio.sleep(0, "reuters.com"))
+    monkeypatch.setattr(predictor._news_agent, "analyze_news", blocking)
+    monkeypatch.setattr(predictor._news_agent, "aanalyze_news", news)
+    monkeypatch.setattr(predictor._options_agent, "analyze_and_debate", blocking)
+    monkeypatch.setattr(predictor._options_agent, "aanalyze_and_debate", option)
+    monkeypatch.setattr(agents_graph, "update_digest", blocking)
+    monkeypatch.setattr(agents_graph, "aupdate_digest", digest)
+
+    async def predict_all():
+        return await asyncio.gather(
+            predictor.apredict("Will it rain?", "agree"),
+            predictor.apredict("Will it snow?", "disagree"),
+        )
+
+    agree, disagree = asyncio.run(predict_all())
+    assert agree == {"question": "Will it rain?", "turns": 2}
+    # the news agent holds its estimate, the debate stops after its rebuttal
+    assert disagree == {"question": "Will it snow?", "turns": 3}
+    assert {span.name for span in predictor.metrics.spans} >= {"node.get_top_news", "node.news_rebuttal", "node.create_final_analysis"}
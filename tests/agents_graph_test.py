@@ -0,0 +1,112 @@
+import re
+import threading
+
+from types import SimpleNamespace
+from typing import Dict
+
+import pandas as pd
+
+from app.agentsV2 import agents_graph
+from app.agentsV2.agent_optional_analyze import AgentOptionsAnalyzer
+from app.agentsV2.agents_graph import NewsAnalysisPredictorAgent
+from app.executor import Config, Executor
+from app.orders import OrderPipeline
+
+
+class StubClient:
+    """Market whose price history comes from the CLOB as a list of points."""
+    def get_market(self, market_id: str) -> Dict:
+        return {
+            "question": "Will it rain?",
+            "description": "Resolves Yes if it rains.",
+            "closed": False,
+            "tags": ["Weather"],
+            "tokens": [
+                {"outcome": "Yes", "token_id": "yes", "price": 0.5},
+                {"outcome": "No", "token_id": "no", "price": 0.5},
+            ],
+        }
+
+    def __init__(self):
+        self.metadata = SimpleNamespace(warm=lambda markets: None)
+        self.history_requests = []
+
+    def get_price_history_with_timestamps(self, token_id: str, startTs: int, endTs: int, fidelity: int):
+        self.history_requests.append((token_id, endTs - startTs, fidelity))
+        # one point per day of the window
+        return [{"t": startTs + day * 86400, "p": 0.25 + day / 100} for day in range(1, (endTs - startTs) // 86400 + 1)]
+
+
+def stub_predictor(monkeypatch, news_probabilities, option_probabilities, seen: Dict) -> NewsAnalysisPredictorAgent:
+    # the graph binds its nodes when the predictor is built
+    def compare_openings(self, state):
+        seen["openings"] = sorted(message["agent"] for message in state["messages"])
+        return {}
+
+    monkeypatch.setattr(NewsAnalysisPredictorAgent, "_compare_openings", compare_openings)
+    monkeypatch.setattr(NewsAnalysisPredictorAgent, "_create_final_analysis", lambda self, state: {"final_analysis": {
+        "probabilities": {"positive": 0.5, "negative": 0.5}, "confidence": "low", "turns": [message["agent"] for message in state["messages"]],
+    }})
+    predictor = NewsAnalysisPredictorAgent()
+    news, option = iter(news_probabilities), iter(option_probabilities)
+
+    def analyze_and_debate(query, event, market_data=None):
+        seen.setdefault("market_data", market_data)
+        return f"{next(option)}%"
+
+    monkeypatch.setattr(predictor._top_news_agent, "get_top_news", lambda query: "reuters.com")
+    monkeypatch.setattr(predictor._news_agent, "analyze_news", lambda query, top_url, session=None: f"{next(news)}%")
+    monkeypatch.setattr(predictor._options_agent, "analyze_and_debate", analyze_and_debate)
+    monkeypatch.setattr(agents_graph, "update_digest", lambda question, digest, turn: {
+        "claims": [turn], "numbers": [], "probability": int(re.match(r"\d+", turn).group()) / 100,
+    })
+    return predictor
+
+
+def test_executor_price_history_reaches_both_openings(monkeypatch):
+    seen = {}
+    predictor = stub_predictor(monkeypatch, [70], [68], seen)
+    client = StubClient()
+    executor = Executor(config=Config(market_id="rain"), agent=predictor, client=client)
+
+    executor.run(pipeline=OrderPipeline(client))
+
+    assert seen["openings"] == ["news", "option"]
+    # the whole history window is requested, not only the last day
+    assert client.history_requests == [("yes", executor.config.history_window, executor.config.history_fidelity)]
+    # the list returned by the CLOB is handed to the options agent as a date/yes/no frame
+    frame = seen["market_data"]
+    assert isinstance(frame, pd.DataFrame)
+    assert list(frame.columns) == ["date", "yes", "no"] and len(frame) == 30
+    assert frame["yes"].iloc[-1] == 0.55 and frame["no"].iloc[-1] == 0.45
+    # enough points for the analytics of the options agent
+    assert AgentOptionsAnalyzer().get_analytics(frame)["price_analysis"]["yes"]["current"] == 0.55
+
+
+def test_option_opening_runs_alongside_the_news_branch(monkeypatch):
+    seen = {}
+    predictor = stub_predictor(monkeypatch, [90, 80, 90], [10, 20, 10], seen)
+    # fails unless the options opening runs while the news branch looks up its sources
+    opening = threading.Barrier(2, timeout=5)
+    get_top_news = predictor._top_news_agent.get_top_news
+    analyze_and_debate = predictor._options_agent.analyze_and_debate
+    calls = []
+
+    def top_news(query):
+        opening.wait()
+        return get_top_news(query)
+
+    def option(*args, **kwargs):
+        if not calls:
+            opening.wait()
+        calls.append("option")
+        return analyze_and_debate(*args, **kwargs)
+
+    monkeypatch.setattr(predictor._top_news_agent, "get_top_news", top_news)
+    monkeypatch.setattr(predictor._options_agent, "analyze_and_debate", option)
+
+    turns = predictor.predict("Will it rain?", "Resolves Yes if it rains.")["turns"]
+
+    assert seen["openings"] == ["news", "option"]
+    # the estimates never converge, the rebuttals alternate until DEBATE_TURNS
+    assert turns[2:] == ["news", "option", "news", "option"][:agents_graph.DEBATE_TURNS]
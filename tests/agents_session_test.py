@@ -0,0 +1,59 @@
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+from app.agentsV2 import agent_get_news, search
+from app.agentsV2.agent_get_news import NewsAnalysisAgent
+
+
+class FakeSearch:
+    def invoke(self, query):
+        # give the other analysis time to run in between
+        time.sleep(0.05)
+        return [{'url': 'https://news.example/a', 'content': query['query']}]
+
+
+def test_concurrent_analyses_keep_their_sources(monkeypatch):
+    monkeypatch.setattr(agent_get_news, "llm", RunnableLambda(lambda prompt: AIMessage(content=prompt.to_string())))
+    monkeypatch.setattr(search, "search_tool", FakeSearch())
+
+    agent = NewsAnalysisAgent()
+    # the agent executor calls the search tool, then the debate tool
+    agent.news_agent = RunnableLambda(lambda inputs: {
+        'output': NewsAnalysisAgent.fetch_and_summarize_news.invoke({'question': inputs['input']})
+        + " | " + NewsAnalysisAgent.debate_analysis_tool.invoke({'debate_question': 'why?'})
+    })
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(lambda i: agent.analyze_news(f"question {i}", f"source-{i}"), range(8)))
+
+    for i, result in enumerate(results):
+        assert f"source-{i}" in result
+        assert all(f"source-{j}" not in result for j in range(8) if j != i)
+        # the debate tool sees the summary of its own analysis
+        assert result.count(f"source-{i}") == 2
+
+
+def test_deduplicated_search_keeps_the_previous_summary(monkeypatch):
+    calls = []
+
+    def summarize(prompt):
+        calls.append(prompt)
+        return AIMessage(content=f"summary {len(calls)}")
+
+    monkeypatch.setattr(agent_get_news, "llm", RunnableLambda(summarize))
+    monkeypatch.setattr(search, "search_tool", FakeSearch())
+
+    agent = NewsAnalysisAgent()
+    agent.news_agent = RunnableLambda(lambda inputs: {
+        'output': " | ".join(NewsAnalysisAgent.fetch_and_summarize_news.invoke({'question': inputs['input']}) for _ in range(2))
+    })
+
+    with search.search_session():
+        result = agent.analyze_news("question", "source")
+    # the second search only returns the page already summarized, nothing is reduced again
+    assert result == "summary 2 | summary 2"
+    assert len(calls) == 2
@@ -0,0 +1,63 @@
+import asyncio
+
+import httpx
+import pytest
+
+from py_clob_client.exceptions import PolyApiException
+
+from app.clients.async_polymarket import AsyncPolyMarketClient
+
+
+class FakeCLOB:
+    """Mock transport of the CLOB endpoints, records the requests in flight."""
+    def __init__(self):
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.paths = []
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.paths.append(request.url.path)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+        finally:
+            self.in_flight -= 1
+        if request.url.path.startswith("/markets/"):
+            market_id = request.url.path.rsplit("/", 1)[1]
+            if market_id == "missing":
+                return httpx.Response(404, json={"error": "market not found"})
+            return httpx.Response(200, json={"condition_id": market_id})
+        if request.url.path == "/price":
+            return httpx.Response(200, json={"price": "0.42", "side": request.url.params["side"]})
+        return httpx.Response(404)
+
+
+def client_for(clob: FakeCLOB, max_concurrency: int) -> AsyncPolyMarketClient:
+    return AsyncPolyMarketClient(max_concurrency=max_concurrency, transport=httpx.MockTransport(clob.handle))
+
+
+def test_many_markets_are_fetched_concurrently_within_the_limit():
+    clob = FakeCLOB()
+
+    async def fetch():
+        async with client_for(clob, max_concurrency=4) as client:
+            return await client.get_many_markets([f"0x{i}" for i in range(20)])
+
+    markets = asyncio.run(fetch())
+    assert [market["condition_id"] for market in markets] == [f"0x{i}" for i in range(20)]
+    assert 1 < clob.max_in_flight <= 4
+
+
+def test_errors_and_prices():
+    clob = FakeCLOB()
+
+    async def fetch():
+        async with client_for(clob, max_concurrency=4) as client:
+            price = await client.get_price("yes", is_buy=False)
+            with pytest.raises(PolyApiException):
+                await client.get_market("missing")
+            return price
+
+    assert asyncio.run(fetch()) == 0.42
+    assert clob.paths == ["/price", "/markets/missing"]
@@ -0,0 +1,50 @@
+import time
+
+import pandas as pd
+import pytest
+
+from app.cache import SQLiteCache, fingerprint
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return SQLiteCache(str(tmp_path / "cache.db"), table="predictions", ttl=60, max_entries=2)
+
+
+def test_fingerprint_depends_on_every_part():
+    frame = pd.DataFrame({"t": [1, 2], "p": [0.1, 0.2]})
+    key = fingerprint("market", "question", "description", frame)
+    assert key == fingerprint("market", "question", "description", frame.copy())
+    assert key != fingerprint("market", "question", "other description", frame)
+    assert key != fingerprint("market", "question", "description", frame.assign(p=[0.1, 0.3]))
+
+
+def test_set_and_get(cache):
+    prediction = {"probabilities": {"positive": 0.7, "negative": 0.3}, "confidence": "high"}
+    cache.set("key", prediction)
+    assert cache.get("key") == prediction
+    assert cache.get("missing") is None
+
+
+def test_persists_between_instances(tmp_path):
+    SQLiteCache(str(tmp_path / "cache.db")).set("key", [1, 2])
+    assert SQLiteCache(str(tmp_path / "cache.db")).get("key") == [1, 2]
+
+
+def test_expired_entries_are_dropped(cache):
+    cache.set("key", 1)
+    cache.ttl = 0
+    time.sleep(0.01)
+    assert cache.get("key") is None
+    assert len(cache) == 0
+
+
+def test_least_recently_used_entries_are_evicted(cache):
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
@@ -0,0 +1,104 @@
+import threading
+
+from datetime import datetime, timezone
+from typing import Dict
+
+import pytest
+
+from app.catalog import MarketCatalog
+from app.clients.scanner import END_CURSOR, decode_cursor, encode_cursor
+
+
+class FakeClient:
+    """
+    Paginated catalog with offset cursors like the CLOB API, markets can be closed in between syncs.
+    """
+    def __init__(self, total: int, limit: int):
+        self.total = total
+        self.limit = limit
+        self.closed = set()
+        self.requested = []
+        self._lock = threading.Lock()
+
+    def _market(self, i: int) -> Dict:
+        return {
+            'condition_id': f"0x{i}",
+            'market_slug': f"market-{i}",
+            'question': f"Question {i}?",
+            'active': True,
+            'closed': i in self.closed,
+            'accepting_orders': i not in self.closed,
+            'tags': ['Sports'] if i % 3 == 0 else ['Politics'],
+            'end_date_iso': f"2025-01-{i % 28 + 1:02d}T00:00:00Z",
+            'tokens': [{'token_id': f"{i}-yes", 'outcome': 'Yes'}, {'token_id': f"{i}-no", 'outcome': 'No'}],
+        }
+
+    def get_markets_page(self, next_cursor: str = "MA==") -> Dict:
+        with self._lock:
+            self.requested.append(next_cursor)
+        offset = decode_cursor(next_cursor)
+        data = [self._market(i) for i in range(offset, min(offset + self.limit, self.total))]
+        end = offset + self.limit >= self.total
+        return {
+            'data': data,
+            'next_cursor': END_CURSOR if end else encode_cursor(offset + self.limit),
+            'limit': self.limit,
+            'count': len(data),
+        }
+
+    def get_market(self, market_id: str) -> Dict:
+        with self._lock:
+            self.requested.append(market_id)
+        return self._market(int(market_id[2:]))
+
+
+@pytest.fixture
+def client():
+    return FakeClient(total=25, limit=10)
+
+
+@pytest.fixture
+def catalog(tmp_path, client):
+    return MarketCatalog(str(tmp_path / "catalog.db"), client=client)
+
+
+def test_lookups_are_served_from_the_catalog(catalog, client):
+    assert catalog.sync() == 25
+    client.requested.clear()
+
+    assert catalog.get_market("0x3")['question'] == "Question 3?"
+    assert catalog.get_market_by_token("7-no")['condition_id'] == "0x7"
+    assert catalog.get_market_by_slug("market-12")['condition_id'] == "0x12"
+    sports = catalog.find_markets(tag="sports")
+    assert {market['condition_id'] for market in sports} == {f"0x{i}" for i in range(0, 25, 3)}
+    assert catalog.get_tags() == {"politics": 16, "sports": 9}
+    assert client.requested == []
+
+
+def test_incremental_sync_reads_the_last_page_and_refreshes_expired_markets(catalog, client):
+    now = datetime(2025, 1, 10, tzinfo=timezone.utc).timestamp()
+    catalog.sync(now=now)
+    client.requested.clear()
+    client.closed = {2, 15, 21}
+    client.total = 28
+
+    assert catalog.sync(now=now + 60) == 8 + 10
+    pages = [request for request in client.requested if not request.startswith("0x")]
+    # only the last page is read again, the open markets before it are fetched once past their end date
+    assert pages == [encode_cursor(20)]
+    assert sorted(request for request in client.requested if request.startswith("0x")) == sorted(f"0x{i}" for i in range(10))
+    assert len(catalog) == 28
+    open_markets = {market['condition_id'] for market in catalog.find_markets()}
+    assert "0x2" not in open_markets and "0x21" not in open_markets
+    assert "0x15" in open_markets and "0x27" in open_markets
+
+    # the periodic full sync refreshes every known market from the pages
+    client.requested.clear()
+    assert catalog.sync(now=now + 60 * 60 * 24) == 28
+    assert not any(request.startswith("0x") for request in client.requested)
+    assert "0x15" not in {market['condition_id'] for market in catalog.find_markets()}
+
+
+def test_sync_requires_a_client(tmp_path):
+    with pytest.raises(ValueError):
+        MarketCatalog(str(tmp_path / "catalog.db")).sync()
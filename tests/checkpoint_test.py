@@ -0,0 +1,87 @@
+import asyncio
+import re
+
+import pandas as pd
+import pytest
+
+from app.agentsV2 import agents_graph
+from app.agentsV2.agents_graph import NewsAnalysisPredictorAgent
+
+
+class FlakyDebate:
+    """Agents of a debate whose first news rebuttal fails once."""
+    def __init__(self):
+        self.calls = []
+        self.failed = False
+
+    def news(self, query, top_url, session=None):
+        self.calls.append("news")
+        if "OPTIONS AGENT" in query and not self.failed:
+            self.failed = True
+            raise ConnectionError("API error")
+        return "90%" if "OPTIONS AGENT" not in query else "80%"
+
+    def option(self, query, event, market_data=None):
+        self.calls.append("option")
+        assert market_data["date"].iloc[0] == pd.Timestamp("2025-01-01")
+        return "10%" if "NEWS AGENT" not in query else "20%"
+
+    async def anews(self, *args, **kwargs):
+        return self.news(*args, **kwargs)
+
+    async def aoption(self, *args, **kwargs):
+        return self.option(*args, **kwargs)
+
+
+@pytest.fixture
+def debate(monkeypatch, tmp_path):
+    monkeypatch.setattr(NewsAnalysisPredictorAgent, "_create_final_analysis", lambda self, state: {"final_analysis": {"turns": len(state["messages"])}})
+    monkeypatch.setattr(NewsAnalysisPredictorAgent, "_acreate_final_analysis", lambda self, state: asyncio.sleep(0, {"final_analysis": {"turns": len(state["messages"])}}))
+    fake = FlakyDebate()
+    predictor = NewsAnalysisPredictorAgent(checkpoint_path=str(tmp_path / "checkpoints.db"))
+    monkeypatch.setattr(predictor._top_news_agent, "get_top_news", lambda query: "reuters.com")
+    monkeypatch.setattr(predictor._top_news_agent, "aget_top_news", lambda query: asyncio.sleep(0, "reuters.com"))
+    monkeypatch.setattr(predictor._news_agent, "analyze_news", fake.news)
+    monkeypatch.setattr(predictor._news_agent, "aanalyze_news", fake.anews)
+    monkeypatch.setattr(predictor._options_agent, "analyze_and_debate", fake.option)
+    monkeypatch.setattr(predictor._options_agent, "aanalyze_and_debate", fake.aoption)
+
+    def digest(question, previous, turn):
+        return {"claims": [turn], "numbers": [], "probability": int(re.match(r"\d+", turn).group()) / 100}
+
+    monkeypatch.setattr(agents_graph, "update_digest", digest)
+    monkeypatch.setattr(agents_graph, "aupdate_digest", lambda *args: asyncio.sleep(0, digest(*args)))
+    return predictor, fake
+
+
+def market_data() -> pd.DataFrame:
+    return pd.DataFrame({"date": pd.date_range("2025-01-01", periods=3), "yes": [0.4, 0.5, 0.6], "no": [0.6, 0.5, 0.4]})
+
+
+def test_interrupted_prediction_resumes_from_last_node(debate):
+    predictor, fake = debate
+    with pytest.raises(ConnectionError):
+        predictor.predict("Will it rain?", "Resolves Yes if it rains.", data_frm=market_data(), thread_id="market:1")
+    assert sorted(fake.calls) == ["news", "news", "option"]
+
+    fake.calls.clear()
+    result = predictor.predict("Will it rain?", "Resolves Yes if it rains.", data_frm=market_data(), thread_id="market:1")
+    # the openings are not run again, the debate goes on from the failed rebuttal
+    assert fake.calls == ["news", "option"]
+    assert result == {"turns": 4}
+    # finished predictions are dropped from the store
+    assert not predictor._workflow.get_state({"configurable": {"thread_id": "market:1"}}).values
+
+
+def test_interrupted_async_prediction_resumes(debate):
+    predictor, fake = debate
+
+    async def predict():
+        return await predictor.apredict("Will it rain?", "Resolves Yes if it rains.", data_frm=market_data(), thread_id="market:2")
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(predict())
+    fake.calls.clear()
+    result = asyncio.run(predict())
+    assert fake.calls == ["news", "option"]
+    assert result == {"turns": 4}
@@ -0,0 +1,77 @@
+import re
+
+from app.agentsV2 import agents_graph
+from app.agentsV2.agents_graph import AgentTurn, NewsAnalysisPredictorAgent
+from app.agentsV2.convergence import has_converged, parse_probability
+
+
+def test_parse_probability():
+    assert parse_probability("I estimate a 65% chance of Yes.") == 0.65
+    assert parse_probability("Probability: 0.3. Later: the probability is now 40%.") == 0.4
+    assert parse_probability("Volume rose 12% this week.") is None
+
+
+def test_has_converged():
+    estimate = lambda agent, probability: {"agent": agent, "probability": probability}
+    assert not has_converged([estimate("news", 0.7)], tolerance=0.05)
+    assert has_converged([estimate("news", 0.7), estimate("option", 0.67)], tolerance=0.05)
+    assert not has_converged([estimate("news", 0.7), estimate("option", 0.5)], tolerance=0.05)
+    # the agent that just spoke kept its estimate
+    assert has_converged([
+        estimate("news", 0.7), estimate("option", 0.5),
+        estimate("news", 0.72),
+    ], tolerance=0.05)
+    assert not has_converged([
+        estimate("news", 0.7), estimate("option", 0.5),
+        estimate("news", 0.6),
+    ], tolerance=0.05)
+    assert not has_converged([
+        estimate("news", 0.7), estimate("option", 0.5),
+        estimate("news", 0.6), estimate("option", None),
+    ], tolerance=0.05)
+
+
+def run_debate(monkeypatch, news_probabilities, option_probabilities):
+    # the graph binds its nodes when the predictor is built
+    monkeypatch.setattr(NewsAnalysisPredictorAgent, "_create_final_analysis", lambda self, state: {"final_analysis": state["messages"]})
+    predictor = NewsAnalysisPredictorAgent()
+    news, option = iter(news_probabilities), iter(option_probabilities)
+    monkeypatch.setattr(predictor._top_news_agent, "get_top_news", lambda query: "reuters.com")
+    monkeypatch.setattr(predictor._news_agent, "analyze_news", lambda query, top_url, session=None: f"{next(news)}%")
+    monkeypatch.setattr(predictor._options_agent, "analyze_and_debate", lambda query, event, market_data=None: f"{next(option)}%")
+    monkeypatch.setattr(agents_graph, "update_digest", lambda question, digest, turn: {
+        "claims": [turn], "numbers": [], "probability": int(re.match(r"\d+", turn).group()) / 100,
+    })
+    return predictor.predict("Will it rain?", "Resolves Yes if it rains.")
+
+
+def test_debate_stops_once_estimates_converge(monkeypatch):
+    # agreeing openings need no rebuttal
+    messages = run_debate(monkeypatch, [70], [68])
+    assert len(messages) == 2
+
+    # the options agent comes around after the first news rebuttal
+    messages = run_debate(monkeypatch, [70, 80], [40, 78])
+    assert [message["agent"] for message in messages[2:]] == ["news", "option"]
+
+    # the news agent holds its estimate against the options agent, the options agent is not asked again
+    messages = run_debate(monkeypatch, [70, 71], [40])
+    assert [message["agent"] for message in messages[2:]] == ["news"]
+    assert len(messages) < 2 + agents_graph.DEBATE_TURNS
+
+    # never converging, bounded by DEBATE_TURNS
+    messages = run_debate(monkeypatch, [90, 80, 90, 80], [10, 20, 10, 20])
+    assert len(messages) == 2 + agents_graph.DEBATE_TURNS
+
+
+def test_debate_stops_at_the_cap_without_estimates():
+    predictor = NewsAnalysisPredictorAgent()
+    estimates = [{"agent": agent, "probability": None} for agent in ["news", "option", "news", "option"]]
+
+    def state(turn):
+        messages = [{"agent": estimate["agent"]} for estimate in estimates[:2 + turn]]
+        return {"current_turn": turn, "estimates": estimates[:2 + turn], "messages": messages}
+
+    assert predictor._should_continue_dialogue(state(0)) == AgentTurn.NEWS
+    assert predictor._should_continue_dialogue(state(1)) == AgentTurn.OPTION
+    assert predictor._should_continue_dialogue(state(agents_graph.DEBATE_TURNS)) == AgentTurn.COMPLETE
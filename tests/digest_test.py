@@ -0,0 +1,58 @@
+from langchain_core.runnables import RunnableLambda
+
+from app.agentsV2 import agents_graph, digest
+from app.agentsV2.agents_graph import NewsAnalysisPredictorAgent
+from app.agentsV2.digest import MAX_CLAIMS, DebateDigest, empty_digest, format_digest, update_digest
+
+
+class FakeLLM:
+    def __init__(self, answer):
+        self.answer = answer
+
+    def with_structured_output(self, schema):
+        return RunnableLambda(self.answer)
+
+
+def test_update_digest(monkeypatch):
+    answer = DebateDigest(claims=[f"claim {i}" for i in range(10)], numbers=["volume 2M$ (market data)"], probability=1.3)
+    monkeypatch.setattr(digest, "llm", FakeLLM(lambda prompt: answer))
+    result = update_digest("Will it rain?", None, "It will rain.")
+    assert len(result["claims"]) == MAX_CLAIMS and result["probability"] == 1.0
+    assert "Probability of the positive outcome: 100%" in format_digest(result)
+
+
+def test_update_digest_without_structured_answer(monkeypatch):
+    def fail(prompt):
+        raise ValueError("no tool call")
+
+    monkeypatch.setattr(digest, "llm", FakeLLM(fail))
+    previous = {"claims": ["clouds"], "numbers": ["humidity 90%"], "probability": 0.6}
+    result = update_digest("Will it rain?", previous, "I now see a 70% chance of rain.")
+    assert result["claims"] == ["clouds", "I now see a 70% chance of rain."]
+    assert result["numbers"] == ["humidity 90%"] and result["probability"] == 0.7
+    assert update_digest("Will it rain?", previous, "No estimate.")["probability"] == 0.6
+    assert empty_digest()["probability"] is None
+
+
+def test_debate_prompts_do_not_grow(monkeypatch):
+    monkeypatch.setattr(NewsAnalysisPredictorAgent, "_create_final_analysis", lambda self, state: {"final_analysis": {}})
+    predictor = NewsAnalysisPredictorAgent()
+    inputs = []
+
+    def turn(query, *args, **kwargs):
+        inputs.append(query)
+        return "long argument " * 200
+
+    monkeypatch.setattr(predictor._top_news_agent, "get_top_news", lambda query: "reuters.com")
+    monkeypatch.setattr(predictor._news_agent, "analyze_news", turn)
+    monkeypatch.setattr(predictor._options_agent, "analyze_and_debate", turn)
+    monkeypatch.setattr(agents_graph, "update_digest", lambda question, previous, analysis: {
+        "claims": ["the same claim"], "numbers": [], "probability": None,
+    })
+    predictor.predict("Will it rain?", "Resolves Yes if it rains.")
+
+    rebuttals = inputs[2:]
+    assert len(rebuttals) == agents_graph.DEBATE_TURNS
+    # every rebuttal answers a digest of the same size, not the previous turn
+    assert len({len(rebuttal) for rebuttal in rebuttals[0::2]}) == 1 and len({len(rebuttal) for rebuttal in rebuttals[1::2]}) == 1
+    assert all("long argument" not in rebuttal for rebuttal in rebuttals)
@@ -0,0 +1,47 @@
+import asyncio
+import importlib
+
+import httpx
+
+from app import llm as llm_module
+from app.llm import LoopBoundAsyncClient, get_embeddings, get_llm
+
+
+def test_llms_share_one_connection_pool():
+    llm = get_llm("gpt-4o-mini", temperature=0.2)
+    assert get_llm("gpt-4o-mini", temperature=0.2) is llm
+    other = get_llm("gpt-4o", temperature=0.7, max_tokens=1000)
+    assert other is not llm and other.temperature == 0.7
+
+    pool = llm.root_client._client
+    assert other.root_client._client is pool
+    assert get_embeddings("text-embedding-3-small").client._client._client is pool
+    assert llm.root_async_client._client is other.root_async_client._client
+
+
+def test_blank_pool_limits_use_the_defaults(monkeypatch):
+    # .env.example leaves the limits blank
+    for name in ("LLM_MAX_CONNECTIONS", "LLM_MAX_KEEPALIVE_CONNECTIONS", "LLM_KEEPALIVE_EXPIRY", "LLM_TIMEOUT"):
+        monkeypatch.setenv(name, "")
+    try:
+        module = importlib.reload(llm_module)
+        assert module.LLM_MAX_CONNECTIONS == 100 and module.LLM_MAX_KEEPALIVE_CONNECTIONS == 20
+        assert module.LLM_KEEPALIVE_EXPIRY == 60 and module.LLM_TIMEOUT == 120
+    finally:
+        monkeypatch.undo()
+        importlib.reload(llm_module)
+
+
+def test_async_pool_per_event_loop():
+    client = LoopBoundAsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200, json={"path": request.url.path})))
+
+    async def requests():
+        first = await client.get("https://api.example/a")
+        second = await client.get("https://api.example/b")
+        return client.pool(), [first.json()["path"], second.json()["path"]]
+
+    # one asyncio.run per prediction, a new loop every time
+    pool, paths = asyncio.run(requests())
+    other_pool, other_paths = asyncio.run(requests())
+    assert paths == other_paths == ["/a", "/b"]
+    assert other_pool is not pool
@@ -0,0 +1,173 @@
+import json
+import time
+import asyncio
+import threading
+
+import pytest
+
+from aiohttp import web
+
+from app.clients.market_data import MarketDataFeed, OrderBook
+
+
+TOKEN = "123"
+
+
+class MockMarketChannel:
+    """
+    Local stand-in for the market websocket channel: answers a subscription
+    with a book snapshot of every asset and then sends the queued messages.
+    """
+    def __init__(self):
+        self.subscriptions = []
+        self.messages = asyncio.Queue()
+        self.loop = asyncio.new_event_loop()
+        self.port = None
+        self._started = threading.Event()
+
+    async def handler(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        subscription = json.loads((await ws.receive()).data)
+        self.subscriptions.append(subscription)
+        await ws.send_json([
+            {
+                'event_type': 'book',
+                'asset_id': asset_id,
+                'bids': [{'price': '0.48', 'size': '100'}, {'price': '0.5', 'size': '50'}],
+                'asks': [{'price': '0.55', 'size': '40'}, {'price': '0.52', 'size': '20'}],
+                'timestamp': '1700000000000',
+            }
+            for asset_id in subscription['assets_ids']
+        ])
+        while not ws.closed:
+            message = await self.messages.get()
+            if message is None:
+                await ws.close()
+                break
+            await ws.send_json(message)
+        return ws
+
+    async def _serve(self):
+        app = web.Application()
+        app.router.add_get('/ws/market', self.handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        self._started.set()
+        return runner
+
+    def start(self):
+        threading.Thread(target=self.loop.run_forever, daemon=True).start()
+        self.runner = asyncio.run_coroutine_threadsafe(self._serve(), self.loop).result()
+        self._started.wait()
+
+    def send(self, message):
+        self.loop.call_soon_threadsafe(self.messages.put_nowait, message)
+
+    def stop(self):
+        self.send(None)
+        asyncio.run_coroutine_threadsafe(self.runner.cleanup(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+@pytest.fixture
+def channel():
+    channel = MockMarketChannel()
+    channel.start()
+    yield channel
+    channel.stop()
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_order_book():
+    book = OrderBook(TOKEN)
+    book.apply_snapshot(
+        bids=[{'price': '0.48', 'size': '100'}, {'price': '0.5', 'size': '50'}],
+        asks=[{'price': '0.55', 'size': '40'}, {'price': '0.52', 'size': '20'}],
+    )
+    assert book.best_bid() == 0.5
+    assert book.best_ask() == 0.52
+    assert book.midpoint() == pytest.approx(0.51)
+    assert book.depth(1) == {'bids': [(0.5, 50.0)], 'asks': [(0.52, 20.0)]}
+
+    # 20 * 0.52 = 10.4 USDC fills at the best ask, more walks to the next level
+    assert book.simulate_fill(10, is_buy=True) == 0.52
+    assert book.simulate_fill(20, is_buy=True) == 0.55
+    assert book.simulate_fill(1000, is_buy=True) is None
+    assert book.simulate_fill(120, is_buy=False) == 0.48
+
+    book.apply_change("SELL", 0.52, 0)
+    book.apply_change("BUY", 0.51, 10)
+    assert book.best_ask() == 0.55
+    assert book.best_bid() == 0.51
+
+
+def test_feed_streams_order_book(channel):
+    feed = MarketDataFeed([TOKEN], url=f"ws://127.0.0.1:{channel.port}/ws/market", reconnect_delay=0.1)
+    feed.start()
+    try:
+        assert feed.wait_ready(timeout=5)
+        assert channel.subscriptions == [{'assets_ids': [TOKEN], 'type': 'market'}]
+        assert feed.get_book(TOKEN).best_ask() == 0.52
+
+        channel.send({
+            'event_type': 'price_change',
+            'asset_id': TOKEN,
+            'changes': [{'price': '0.52', 'side': 'SELL', 'size': '0'}],
+        })
+        channel.send({
+            'event_type': 'price_change',
+            'price_changes': [{'asset_id': TOKEN, 'price': '0.49', 'side': 'BUY', 'size': '5'}],
+        })
+        assert wait_for(lambda: feed.get_book(TOKEN).best_ask() == 0.55)
+        assert wait_for(lambda: 0.49 in dict(feed.get_book(TOKEN).depth(3)['bids']))
+        assert feed.simulate_fill(TOKEN, 10, is_buy=True) == 0.55
+        assert feed.simulate_fill("unknown", 10) is None
+    finally:
+        feed.stop()
+
+
+def test_feed_polls_without_websocket():
+    class Level:
+        def __init__(self, price, size):
+            self.price, self.size = price, size
+
+    class Summary:
+        asset_id = TOKEN
+        bids = [Level('0.4', '10')]
+        asks = [Level('0.6', '10')]
+
+    class FakeClob:
+        def get_order_books(self, params):
+            assert [param.token_id for param in params] == [TOKEN]
+            return [Summary()]
+
+    class FakeClient:
+        client = FakeClob()
+
+    # nothing listens on port 1, the feed falls back to polling
+    feed = MarketDataFeed([TOKEN], client=FakeClient(), url="ws://127.0.0.1:1/ws/market", poll_interval=0.05, reconnect_delay=0.1)
+    feed.start()
+    try:
+        assert feed.wait_ready(timeout=5)
+        assert feed.get_book(TOKEN).midpoint() == pytest.approx(0.5)
+    finally:
+        feed.stop()
+
+
+def test_feed_stops_right_after_start():
+    feed = MarketDataFeed([TOKEN], url="ws://127.0.0.1:1/ws/market", reconnect_delay=0.1)
+    feed.start()
+    feed.stop()
+    assert feed._thread is None
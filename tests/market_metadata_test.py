@@ -0,0 +1,118 @@
+from typing import Dict
+
+import pytest
+
+from py_clob_client.order_builder.constants import BUY, SELL
+
+from app.clients import market_metadata
+from app.clients.market_metadata import MarketMetadataCache
+from app.clients.polymarket import PolyMarketClient
+
+
+class StubBuilder:
+    def __init__(self):
+        self.orders = []
+
+    def create_market_order(self, order_args, options):
+        self.orders.append((order_args, options))
+        return {"token_id": order_args.token_id}
+
+
+class StubClob:
+    host = "https://clob.example"
+
+    def __init__(self):
+        self.builder = StubBuilder()
+        self.priced = []
+
+    def assert_level_1_auth(self):
+        pass
+
+    def calculate_market_price(self, token_id: str, side: str, amount: float) -> float:
+        self.priced.append((token_id, side, amount))
+        return 0.55
+
+
+def market(tick_size=0.01, neg_risk=True, minimum_order_size=5) -> Dict:
+    return {
+        "minimum_tick_size": tick_size,
+        "neg_risk": neg_risk,
+        "taker_base_fee": 200,
+        "minimum_order_size": minimum_order_size,
+        "tokens": [{"token_id": "yes"}, {"token_id": "no"}],
+    }
+
+
+@pytest.fixture
+def requests(monkeypatch):
+    urls = []
+
+    def get(url):
+        urls.append(url)
+        return {"minimum_tick_size": 0.001, "neg_risk": False}
+
+    monkeypatch.setattr(market_metadata, "get", get)
+    return urls
+
+
+@pytest.fixture
+def client(requests):
+    # no key is needed to build orders with the stubbed CLOB client
+    client = PolyMarketClient.__new__(PolyMarketClient)
+    client.client = StubClob()
+    client.metadata = MarketMetadataCache(client.client)
+    return client
+
+
+def test_warm_serves_metadata_without_requests(requests):
+    cache = MarketMetadataCache(StubClob())
+    assert cache.warm([market(), {"tokens": [{"token_id": "unknown"}]}]) == 2
+
+    metadata = cache.get("no")
+    assert (metadata.tick_size, metadata.neg_risk, metadata.fee_rate_bps, metadata.minimum_order_size) == ("0.01", True, 200, 5.0)
+    assert requests == []
+
+
+def test_expired_and_missing_entries_are_requested(requests):
+    cache = MarketMetadataCache(StubClob(), ttl=-1)
+    cache.warm([market()])
+
+    metadata = cache.get("yes")
+    # the endpoints refresh the tick size and neg risk, the fee and the minimum size are kept
+    assert (metadata.tick_size, metadata.neg_risk, metadata.fee_rate_bps, metadata.minimum_order_size) == ("0.001", False, 200, 5.0)
+    assert requests == ["https://clob.example/tick-size?token_id=yes", "https://clob.example/neg-risk?token_id=yes"]
+
+    requests.clear()
+    cache = MarketMetadataCache(StubClob())
+    cache.get("other")
+    cache.get("other")
+    assert len(requests) == 2
+
+
+def test_market_order_uses_the_cached_metadata(client, requests):
+    client.metadata.warm([market()])
+
+    assert client.make_market_order("yes", 10, is_buy=True) == {"token_id": "yes"}
+    client.make_market_order("no", 10, is_buy=False, price=0.4)
+
+    (buy_args, buy_options), (sell_args, sell_options) = client.client.builder.orders
+    assert (buy_args.token_id, buy_args.amount, buy_args.side, buy_args.price, buy_args.fee_rate_bps) == ("yes", 10, BUY, 0.55, 200)
+    assert (buy_options.tick_size, buy_options.neg_risk) == ("0.01", True)
+    assert (sell_args.side, sell_args.price) == (SELL, 0.4)
+    # a given price skips the order book
+    assert client.client.priced == [("yes", BUY, 10)]
+    assert requests == []
+
+
+def test_invalid_orders_are_not_signed(client, requests):
+    client.metadata.warm([market(tick_size=0.1, minimum_order_size=50)])
+
+    with pytest.raises(ValueError, match="not valid for tick size"):
+        client.make_market_order("yes", 10, price=0.95)
+    # the tick size may have changed, the next order requests it again
+    client.make_market_order("yes", 10, price=0.5)
+    assert len(requests) == 2
+
+    with pytest.raises(ValueError, match="below the minimum"):
+        client.make_market_order("no", 10, price=0.5)
+    assert len(client.client.builder.orders) == 1
@@ -0,0 +1,46 @@
+import pytest
+
+from app.metrics import LatencyRecorder, load_spans, percentile
+
+
+def test_percentile():
+    values = [float(i) for i in range(1, 101)]
+    assert percentile(values, 50) == pytest.approx(50.5)
+    assert percentile(values, 99) == pytest.approx(99.01)
+    assert percentile([3.0], 95) == 3.0
+
+
+def test_spans_are_exported_and_summarized(tmp_path):
+    path = str(tmp_path / "latency.jsonl")
+    recorder = LatencyRecorder(path)
+
+    with recorder.span("cycle", market_id="0x1"):
+        with recorder.span("get_market"):
+            pass
+        with pytest.raises(ValueError):
+            with recorder.span("predict"):
+                raise ValueError("no prediction")
+
+    spans = load_spans(path)
+    assert [span.name for span in spans] == ["get_market", "predict", "cycle"]
+    # nested spans inherit the attributes of the cycle
+    assert all(span.attrs == {"market_id": "0x1"} for span in spans)
+    assert spans[1].error == "ValueError: no prediction"
+    assert spans[2].duration >= spans[0].duration
+
+    summary = recorder.summary()
+    assert set(summary) == {"cycle", "get_market", "predict"}
+    assert summary["cycle"]["count"] == 1
+    assert summary["cycle"]["p50"] == summary["cycle"]["p99"] == spans[2].duration
+
+
+def test_timed():
+    recorder = LatencyRecorder()
+
+    @recorder.timed("node.add")
+    def add(a, b):
+        return a + b
+
+    assert add(1, b=2) == 3
+    assert add.__name__ == "add"
+    assert recorder.summary()["node.add"]["count"] == 1
@@ -0,0 +1,56 @@
+import re
+import threading
+import time
+
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+from app.agentsV2 import agent_get_news, search
+from app.agentsV2.agent_get_news import NewsAnalysisAgent
+
+
+class FakeSearch:
+    def invoke(self, query):
+        return [{'url': f"https://site-{i}.example/article", 'content': f"Rain facts number {i}."} for i in range(6)]
+
+
+class FakeSummarizer:
+    """Summarizes one article per call, the article of site-3 fails."""
+    def __init__(self):
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.reduced = []
+        self._lock = threading.Lock()
+
+    def __call__(self, prompt):
+        text = prompt.to_string()
+        domain = re.search(r"NEWS URL (\S+)", text)
+        if domain is None:
+            self.reduced.append(text)
+            return AIMessage(content="final summary")
+
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(0.05)
+        with self._lock:
+            self.in_flight -= 1
+        if domain.group(1) == "site-3.example":
+            raise ConnectionError("API error")
+        return AIMessage(content=f"summary of {domain.group(1)}")
+
+
+def test_articles_are_summarized_concurrently_and_failures_are_skipped(monkeypatch):
+    summarizer = FakeSummarizer()
+    monkeypatch.setattr(agent_get_news, "llm", RunnableLambda(summarizer))
+    monkeypatch.setattr(agent_get_news, "SUMMARY_CONCURRENCY", 3)
+    monkeypatch.setattr(search, "search_tool", FakeSearch())
+
+    summary = NewsAnalysisAgent.fetch_and_summarize_news.invoke({'question': "Will it rain?"})
+
+    assert summary == "final summary"
+    assert 1 < summarizer.max_in_flight <= 3
+    # one reduce over the summaries of the articles that did not fail
+    assert len(summarizer.reduced) == 1
+    assert all(f"summary of site-{i}.example" in summarizer.reduced[0] for i in (0, 1, 2, 4, 5))
+    assert "site-3" not in summarizer.reduced[0]
@@ -0,0 +1,126 @@
+import json
+import base64
+import threading
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from eth_account import Account
+
+from app.clients.polymarket import PolyMarketClient
+from app.orders import OrderIntent, OrderPipeline
+
+
+class MockClobHandler(BaseHTTPRequestHandler):
+    """
+    Local stand-in for POST /orders: rejects orders of token "0", fails the
+    first request with a server error when `fail_first` is set.
+    """
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        server.requests.append(body)
+        if server.fail_first and len(server.requests) == 1:
+            self._reply(500, {'error': 'internal error'})
+            return
+        self._reply(200, [
+            {'success': False, 'errorMsg': 'not enough balance', 'orderID': ''}
+            if item['order']['tokenId'] == '0' else
+            {'success': True, 'errorMsg': '', 'orderID': f"0x{item['order']['salt']}", 'status': 'matched'}
+            for item in body
+        ])
+
+    def _reply(self, status: int, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def clob():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), MockClobHandler)
+    server.requests = []
+    server.fail_first = False
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture
+def client(clob):
+    class LocalPolyMarketClient(PolyMarketClient):
+        host = f"http://127.0.0.1:{clob.server_address[1]}/"
+
+    client = LocalPolyMarketClient(
+        key=Account.create().key.hex(),
+        api_key="api-key",
+        api_secret=base64.urlsafe_b64encode(b"secret").decode(),
+        api_passphrase="passphrase",
+    )
+    client.metadata.warm([
+        {
+            'minimum_tick_size': 0.01,
+            'neg_risk': False,
+            'minimum_order_size': 5,
+            'tokens': [{'token_id': str(i)} for i in range(40)],
+        }
+    ])
+    return client
+
+
+def test_orders_are_submitted_in_batches(client, clob):
+    pipeline = OrderPipeline(client, batch_size=15, retry_delay=0)
+    for i in range(1, 36):
+        pipeline.add(OrderIntent(market_id=f"market-{i}", token_id=str(i), amount_usd=10, price=0.5))
+
+    results = pipeline.flush()
+    assert sorted(len(request) for request in clob.requests) == [5, 15, 15]
+    assert [result.intent.token_id for result in results] == [str(i) for i in range(1, 36)]
+    assert all(result.success and result.order_id for result in results)
+    assert len(pipeline) == 0
+
+
+def test_per_order_results(client, clob):
+    pipeline = OrderPipeline(client, retry_delay=0)
+    pipeline.add(OrderIntent(market_id="rejected", token_id="0", amount_usd=10, price=0.5))
+    pipeline.add(OrderIntent(market_id="too-small", token_id="1", amount_usd=1, price=0.5))
+    pipeline.add(OrderIntent(market_id="filled", token_id="2", amount_usd=10, price=0.5))
+
+    rejected, too_small, filled = pipeline.flush()
+    assert not rejected.success and rejected.error == 'not enough balance'
+    assert not too_small.success and 'minimum' in too_small.error
+    assert filled.success
+    assert len(clob.requests) == 1
+
+
+def test_server_errors_are_retried(client, clob):
+    clob.fail_first = True
+    pipeline = OrderPipeline(client, retry_delay=0)
+    pipeline.add(OrderIntent(market_id="market", token_id="3", amount_usd=10, price=0.5))
+
+    [result] = pipeline.flush()
+    assert result.success
+    assert result.attempts == 2
+    assert len(clob.requests) == 2
+
+
+def test_due_in_tracks_the_oldest_intent(client):
+    pipeline = OrderPipeline(client, max_delay=60)
+    assert pipeline.due_in() is None
+
+    pipeline.add(OrderIntent(market_id="first", token_id="1", amount_usd=10, price=0.5))
+    assert 59 < pipeline.due_in() <= 60
+    pipeline.max_delay = 0
+    pipeline.add(OrderIntent(market_id="second", token_id="2", amount_usd=10, price=0.5))
+    assert pipeline.due_in() == 0
+
+    pipeline.flush()
+    assert pipeline.due_in() is None
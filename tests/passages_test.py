@@ -0,0 +1,33 @@
+from app.agentsV2.passages import BM25, extract_passages, split_passages, tokenize
+from app.agentsV2.tokens import count_tokens
+
+
+PAGE = (
+    "Cookie settings and newsletter sign up. "
+    "Spartak Moscow beat Zenit 2-1 on Sunday and lead the league. "
+    "The weather in Moscow was cold. "
+    "Spartak need two more wins to become champion this season. "
+) * 5
+
+
+def test_split_passages_respects_size():
+    passages = split_passages(PAGE, max_tokens=30)
+    assert len(passages) > 1
+    assert all(count_tokens(passage) <= 30 for passage in passages)
+    assert " ".join(passages) == " ".join(PAGE.split())
+
+
+def test_bm25_ranks_matching_documents_first():
+    corpus = [tokenize(text) for text in ["the weather is cold", "spartak win the league", "spartak spartak champion"]]
+    scores = BM25(corpus).scores(tokenize("Will Spartak become champion?"))
+    assert scores[2] > scores[1] > scores[0] == 0
+
+
+def test_extract_passages_within_budget():
+    other = "Bitcoin fell 5% as traders sold. Analysts expect volatility. " * 20
+    extracts = extract_passages("Will Spartak become champion?", [PAGE, other, ""], max_tokens=40, passage_tokens=20)
+    assert len(extracts) == 3
+    assert all(count_tokens(extract) <= 40 + 10 for extract in extracts)
+    assert "champion" in extracts[0]
+    assert "Cookie" not in extracts[0]
+    assert extracts[2] == ""
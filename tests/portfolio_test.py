@@ -0,0 +1,225 @@
+import time
+import threading
+
+from types import SimpleNamespace
+from typing import Dict
+
+import pytest
+
+from app import executor as executor_module, portfolio
+from app.agents.base_agent import BasePredictorAgent
+from app.agentsV2.agents_graph import NewsAnalysisPredictorAgent
+from app.orders import OrderPipeline
+from app.portfolio import PortfolioConfig, PortfolioExecutor
+
+
+class StubAgent(BasePredictorAgent):
+    def __init__(self):
+        super().__init__(llm=None)
+
+    def predict(self, question: str, description: str, **kwargs) -> Dict:
+        yes = 0.9 if question.startswith("buy") else 0.1
+        return {"probabilities": {"positive": yes, "negative": 1 - yes}, "confidence": "high", "reasoning": []}
+
+
+class StubClient:
+    """Markets "buy-*" are underpriced, "sell-*" overpriced, "closed-*" closed."""
+    def __init__(self):
+        self.metadata = SimpleNamespace(warm=lambda markets: None)
+        self.posted = []
+
+    def get_market(self, market_id: str) -> Dict:
+        return {
+            "question": market_id,
+            "description": "",
+            "closed": market_id.startswith("closed"),
+            "tokens": [
+                {"outcome": "Yes", "token_id": f"{market_id}-yes", "price": 0.5},
+                {"outcome": "No", "token_id": f"{market_id}-no", "price": 0.5},
+            ],
+        }
+
+    def make_market_order(self, token_id: str, amount_usd: float, is_buy: bool = True, price=None) -> Dict:
+        return {"token_id": token_id, "amount": amount_usd, "is_buy": is_buy}
+
+    def get_price_history_with_timestamps(self, token_id: str, startTs: int, endTs: int, fidelity: int):
+        return []
+
+    def post_orders(self, orders):
+        self.posted.append(orders)
+        return [{"success": True, "errorMsg": "", "orderID": order["token_id"]} for order in orders]
+
+
+class FakeClock:
+    """Stand-in for the time module of the scheduler, sleeping advances the clock."""
+    def __init__(self, stop_after, calls):
+        self.now = 0.0
+        self.stop_after = stop_after
+        self.calls = calls
+
+    def time(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        if len(self.calls) >= self.stop_after:
+            raise StopIteration
+        self.now += seconds
+
+
+class FakePipeline:
+    def __init__(self, batch_size: int, max_delay: float = 60):
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.intents = []
+        self.flushes = []
+        self.flushed = threading.Event()
+        self.oldest = None
+
+    def add(self, intent):
+        if not self.intents:
+            self.oldest = time.time()
+        self.intents.append(intent)
+
+    def __len__(self):
+        return len(self.intents)
+
+    def due_in(self):
+        return max(self.oldest + self.max_delay - time.time(), 0) if self.intents else None
+
+    def flush(self):
+        self.flushes.append(list(self.intents))
+        self.intents.clear()
+        self.flushed.set()
+        return []
+
+
+def test_run_once_collects_and_submits_orders():
+    client = StubClient()
+    executor = PortfolioExecutor(
+        config=PortfolioConfig(market_ids=["buy-a", "sell-b", "closed-c", "buy-a"]),
+        agent=StubAgent(),
+        client=client,
+        pipeline=OrderPipeline(client, batch_size=15),
+    )
+    errors = executor.run_once()
+
+    assert list(errors) == ["buy-a", "sell-b", "closed-c"]
+    assert errors["buy-a"] is None and errors["sell-b"] is None
+    assert "closed" in str(errors["closed-c"])
+    # both orders are posted in one batch
+    assert len(client.posted) == 1
+    assert sorted((order["token_id"], order["is_buy"]) for order in client.posted[0]) == [("buy-a-yes", True), ("sell-b-no", False)]
+
+
+def test_schedule_runs_markets_in_order_of_their_next_cycle(monkeypatch):
+    calls = []
+    clock = FakeClock(stop_after=6, calls=calls)
+    monkeypatch.setattr(portfolio, "time", clock)
+    executor = PortfolioExecutor(
+        config=PortfolioConfig(market_ids=["b", "a"], max_workers=1, sleep_time=25, schedules={"a": 10}),
+        agent=StubAgent(),
+        client=StubClient(),
+        pipeline=FakePipeline(batch_size=15),
+    )
+    for market_id, market_executor in executor.executors.items():
+        monkeypatch.setattr(market_executor, "run", lambda pipeline, market_id=market_id: calls.append((market_id, clock.now)))
+
+    with pytest.raises(StopIteration):
+        executor.start()
+    assert calls == [("a", 0), ("b", 0), ("a", 10), ("a", 20), ("b", 25), ("a", 30)]
+
+
+def test_orders_are_flushed_when_idle_or_when_a_batch_is_full(monkeypatch):
+    calls = []
+    monkeypatch.setattr(portfolio, "time", FakeClock(stop_after=3, calls=calls))
+    pipeline = FakePipeline(batch_size=1)
+    executor = PortfolioExecutor(
+        config=PortfolioConfig(market_ids=["a", "b", "c"], max_workers=2, sleep_time=100),
+        agent=StubAgent(),
+        client=StubClient(),
+        pipeline=pipeline,
+    )
+
+    def run(pipeline, market_id):
+        if market_id == "b":
+            # still running when the order of "a" fills the batch
+            assert pipeline.flushed.wait(timeout=5)
+        calls.append(market_id)
+        pipeline.add(market_id)
+
+    for market_id, market_executor in executor.executors.items():
+        monkeypatch.setattr(market_executor, "run", lambda pipeline, market_id=market_id: run(pipeline, market_id))
+
+    with pytest.raises(StopIteration):
+        executor.start()
+    # full batch while "b" runs, then every idle pool flushes what is left
+    assert pipeline.flushes[0] == ["a"]
+    assert sum(pipeline.flushes, []) == calls
+    assert len(pipeline) == 0
+
+
+def test_orders_are_flushed_when_the_oldest_has_waited_max_delay(monkeypatch):
+    calls = []
+    monkeypatch.setattr(portfolio, "time", FakeClock(stop_after=2, calls=calls))
+    pipeline = FakePipeline(batch_size=15, max_delay=0.05)
+    executor = PortfolioExecutor(
+        config=PortfolioConfig(market_ids=["a", "b"], max_workers=2, sleep_time=100),
+        agent=StubAgent(),
+        client=StubClient(),
+        pipeline=pipeline,
+    )
+
+    def run(pipeline, market_id):
+        if market_id == "b":
+            # a long cycle does not hold back the order of "a"
+            assert pipeline.flushed.wait(timeout=5)
+        calls.append(market_id)
+        pipeline.add(market_id)
+
+    for market_id, market_executor in executor.executors.items():
+        monkeypatch.setattr(market_executor, "run", lambda pipeline, market_id=market_id: run(pipeline, market_id))
+
+    with pytest.raises(StopIteration):
+        executor.start()
+    assert pipeline.flushes == [["a"], ["b"]]
+
+
+class FlakyPredictor(NewsAnalysisPredictorAgent):
+    """Fails the first predictions, records the checkpoint keys."""
+    def __init__(self, failures: int, clock: FakeClock):
+        super().__init__()
+        self.failures = failures
+        self.clock = clock
+        self.threads = clock.calls
+        self.discarded = []
+
+    def predict(self, question, description, data_frm=None, tags=None, thread_id=None):
+        self.threads.append((thread_id, self.clock.now))
+        if len(self.threads) <= self.failures:
+            raise ConnectionError("API error")
+        return StubAgent().predict(question, description)
+
+    def discard(self, thread_id):
+        self.discarded.append(thread_id)
+
+
+def test_failed_cycles_are_retried_on_the_same_checkpoint(monkeypatch):
+    threads = []
+    clock = FakeClock(stop_after=4, calls=threads)
+    monkeypatch.setattr(portfolio, "time", clock)
+    monkeypatch.setattr(executor_module, "time", clock)
+    agent = FlakyPredictor(failures=3, clock=clock)
+    executor = PortfolioExecutor(
+        config=PortfolioConfig(market_ids=["buy-a"], max_workers=1, sleep_time=100),
+        agent=agent,
+        client=StubClient(),
+        pipeline=FakePipeline(batch_size=15),
+    )
+    executor.executors["buy-a"].config.retry_time = 10
+    executor.executors["buy-a"].config.max_retries = 1
+
+    with pytest.raises(StopIteration):
+        executor.start()
+    # the retry resumes the failed prediction, once the retries are exhausted its checkpoint is dropped
+    assert threads == [("buy-a:0", 0), ("buy-a:0", 10), ("buy-a:1", 110), ("buy-a:1", 120)]
+    assert agent.discarded == ["buy-a:0"]
@@ -0,0 +1,61 @@
+import pytest
+
+from typing import Dict, List
+
+from app.price_store import PriceHistoryStore
+
+
+class FakeClient:
+    """
+    Serves an hourly price history and records every requested range.
+    """
+    def __init__(self):
+        self.requests = []
+
+    def get_price_history_with_timestamps(self, token_id: str, startTs: int, endTs: int, fidelity: int) -> List[Dict]:
+        self.requests.append((startTs, endTs))
+        first = -(-startTs // 3600) * 3600
+        return [{"t": t, "p": round(t / 3600 % 100 / 100, 2)} for t in range(first, endTs + 1, 3600)]
+
+
+@pytest.fixture
+def client():
+    return FakeClient()
+
+
+@pytest.fixture
+def store(tmp_path, client):
+    return PriceHistoryStore(str(tmp_path / "prices.db"), client=client, backfill=3600 * 48, chunk=3600 * 24)
+
+
+def test_sync_backfills_and_then_fetches_only_new_points(store, client):
+    now = 3600 * 1000
+    assert store.sync("token", now=now) == 49
+    assert len(client.requests) == 2
+
+    client.requests.clear()
+    assert store.sync("token", now=now + 3600 * 2) == 2
+    assert client.requests == [(now + 1, now + 3600 * 2)]
+    assert store.last_timestamp("token") == now + 3600 * 2
+
+
+def test_reads_do_not_touch_the_network(store, client):
+    store.sync("token", now=3600 * 1000)
+    client.requests.clear()
+
+    history = store.get_history("token", start_ts=3600 * 990, end_ts=3600 * 999)
+    assert [point["t"] for point in history] == list(range(3600 * 990, 3600 * 1000, 3600))
+    assert client.requests == []
+
+
+def test_resampling_keeps_last_point_of_every_bucket(store):
+    store.add_points("token", [{"t": 3600 * hour, "p": hour / 100} for hour in range(48)])
+    daily = store.get_history("token", fidelity=60 * 24)
+    assert daily == [{"t": 3600 * 23, "p": 0.23}, {"t": 3600 * 47, "p": 0.47}]
+
+
+def test_market_frame_has_yes_and_no_columns(store):
+    store.add_points("token", [{"t": 0, "p": 0.25}])
+    frame = store.get_market_frame("token")
+    assert list(frame.columns) == ["date", "yes", "no"]
+    assert frame.iloc[0].tolist() == ["01-01-1970 00:00", 0.25, 0.75]
@@ -0,0 +1,81 @@
+import threading
+
+from datetime import datetime, timezone
+from typing import Dict
+
+import pytest
+
+from app.clients.scanner import END_CURSOR, MarketFilter, MarketScanner, decode_cursor, encode_cursor
+
+
+class FakeClient:
+    """
+    Paginated catalog of `total` markets with offset cursors like the CLOB API.
+    """
+    def __init__(self, total: int, limit: int):
+        self.total = total
+        self.limit = limit
+        self.requested = []
+        self._lock = threading.Lock()
+
+    def _market(self, i: int) -> Dict:
+        return {
+            'condition_id': f"0x{i}",
+            'active': True,
+            'closed': i % 2 == 1,
+            'accepting_orders': True,
+            'tags': ['Sports'] if i % 3 == 0 else ['Politics'],
+            'end_date_iso': f"2025-01-{i % 28 + 1:02d}T00:00:00Z",
+        }
+
+    def get_markets_page(self, next_cursor: str = "MA==") -> Dict:
+        with self._lock:
+            self.requested.append(next_cursor)
+        offset = decode_cursor(next_cursor)
+        data = [self._market(i) for i in range(offset, min(offset + self.limit, self.total))]
+        end = offset + self.limit >= self.total
+        return {
+            'data': data,
+            'next_cursor': END_CURSOR if end else encode_cursor(offset + self.limit),
+            'limit': self.limit,
+            'count': len(data),
+        }
+
+
+@pytest.mark.parametrize("prefetch", [1, 4])
+def test_scan_follows_cursors_through_the_whole_catalog(prefetch):
+    client = FakeClient(total=95, limit=10)
+    markets = list(MarketScanner(client, prefetch=prefetch).scan())
+    assert [market['condition_id'] for market in markets] == [f"0x{i}" for i in range(95)]
+
+
+def test_prefetch_window_is_bounded():
+    client = FakeClient(total=1000, limit=10)
+    scanner = MarketScanner(client, prefetch=3)
+    pages = scanner.pages()
+    next(pages)
+    next(pages)
+    assert len(client.requested) <= 1 + 3 + 1
+    pages.close()
+
+
+def test_filters_are_applied_to_every_page():
+    client = FakeClient(total=60, limit=10)
+    market_filter = MarketFilter(
+        closed=False,
+        tags=['sports'],
+        end_date_max=datetime(2025, 1, 10, tzinfo=timezone.utc),
+    )
+    markets = list(MarketScanner(client).scan(market_filter))
+    assert markets
+    for market in markets:
+        assert not market['closed']
+        assert market['tags'] == ['Sports']
+        assert market['end_date_iso'] <= "2025-01-10T00:00:00Z"
+
+
+def test_cursor_round_trip():
+    assert decode_cursor("MTAwMA==") == 1000
+    assert encode_cursor(1000) == "MTAwMA=="
+    assert decode_cursor(END_CURSOR) == -1
+    assert decode_cursor("not a cursor") is None
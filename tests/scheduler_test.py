@@ -0,0 +1,166 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app import scheduler
+from app.clients.market_data import OrderBook
+from app.executor import Config
+from app.scheduler import EventDrivenScheduler, MarketSignals, MarketWatch, TriggerConfig, check_triggers, llamafeed_counter
+
+
+class FakeExecutor:
+    def __init__(self, market_id: str):
+        self.config = Config(market_id=market_id, retry_time=600, max_retries=1)
+        self.runs = 0
+        self.abandoned = 0
+
+    def run(self):
+        self.runs += 1
+
+    def abandon(self):
+        self.abandoned += 1
+
+
+class FailingExecutor(FakeExecutor):
+    def run(self):
+        super().run()
+        raise ConnectionError("API error")
+
+
+class FakeClient:
+    def __init__(self):
+        self.price = 0.5
+
+    def get_market(self, market_id: str):
+        return {
+            'closed': False,
+            'end_date_iso': '2100-01-01T00:00:00Z',
+            'tokens': [
+                {'token_id': '1', 'outcome': 'Yes', 'price': self.price},
+                {'token_id': '2', 'outcome': 'No', 'price': 1 - self.price},
+            ],
+        }
+
+    def get_price(self, token_id: str, is_buy: bool = True) -> float:
+        return self.price
+
+
+@pytest.fixture
+def watch():
+    return MarketWatch(executor=FakeExecutor("market"), last_run=1000.0, last_price=0.5)
+
+
+def test_initial_prediction_triggers():
+    signals = MarketSignals(price=0.5, new_items=0, seconds_to_end=None, timestamp=1000.0)
+    assert check_triggers(TriggerConfig(), signals, MarketWatch(executor=FakeExecutor("market"))) == "initial"
+
+
+def test_quiet_market_does_not_trigger(watch):
+    signals = MarketSignals(price=0.52, new_items=3, seconds_to_end=10 ** 6, timestamp=2000.0)
+    assert check_triggers(TriggerConfig(), signals, watch) is None
+
+
+def test_price_move_triggers(watch):
+    signals = MarketSignals(price=0.6, new_items=0, seconds_to_end=None, timestamp=2000.0)
+    assert check_triggers(TriggerConfig(price_move=0.05), signals, watch).startswith("price moved")
+
+
+def test_new_items_trigger(watch):
+    signals = MarketSignals(price=0.5, new_items=25, seconds_to_end=None, timestamp=2000.0)
+    assert check_triggers(TriggerConfig(new_items=20), signals, watch) == "25 new feed items"
+
+
+def test_staleness_shrinks_near_end_date(watch):
+    triggers = TriggerConfig(max_staleness=10 ** 6, close_window=3600, close_staleness=500)
+    far = MarketSignals(price=0.5, new_items=0, seconds_to_end=10 ** 6, timestamp=2000.0)
+    close = MarketSignals(price=0.5, new_items=0, seconds_to_end=600, timestamp=2000.0)
+    assert check_triggers(triggers, far, watch) is None
+    assert check_triggers(triggers, close, watch) is not None
+
+
+def test_poll_runs_only_triggered_markets():
+    client = FakeClient()
+    executor = FakeExecutor("market")
+    scheduler = EventDrivenScheduler([executor], client, TriggerConfig(price_move=0.05))
+
+    assert scheduler.poll() == {"market": "initial"}
+    assert scheduler.poll() == {}
+    client.price = 0.7
+    assert "market" in scheduler.poll()
+    assert executor.runs == 2
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def time(self) -> float:
+        return self.now
+
+
+def test_failed_market_is_retried_then_abandoned(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(scheduler, "time", clock)
+    executor = FailingExecutor("market")
+    event_scheduler = EventDrivenScheduler([executor], FakeClient(), TriggerConfig(price_move=0.05))
+
+    assert event_scheduler.poll() == {"market": "initial"}
+    assert event_scheduler.watches["market"].last_run is None
+    # backing off until retry_time
+    clock.now = 300
+    assert event_scheduler.poll() == {}
+    clock.now = 600
+    assert event_scheduler.poll() == {"market": "initial"}
+    # out of retries, the market waits for its next trigger
+    clock.now = 900
+    assert event_scheduler.poll() == {}
+    assert executor.runs == 2
+    assert executor.abandoned == 1
+    assert event_scheduler.watches["market"].last_run == 600
+
+
+class FakeFeedClient:
+    def get_news(self):
+        return [
+            {'title': 'Bitcoin ETF inflows hit a record', 'content': '', 'pub_date': '2025-01-02T00:00:00Z', 'entities': ['BlackRock']},
+            {'title': 'Solana outage', 'content': 'Validators restarted the network.', 'pub_date': '2025-01-02T00:00:00Z', 'entities': []},
+            {'title': 'Old bitcoin price news', 'content': '', 'pub_date': '2024-12-01T00:00:00Z', 'entities': []},
+        ]
+
+    def get_tweets(self):
+        return [
+            {'tweet': 'Bitcoin price tops $100k', 'tweet_created_at': '2025-01-02T00:00:00Z'},
+            {'tweet': 'GM', 'tweet_created_at': '2025-01-02T00:00:00Z'},
+        ]
+
+
+def test_llamafeed_counter_counts_items_about_the_market(monkeypatch):
+    monkeypatch.setattr(scheduler, "DefillamaFeedClient", FakeFeedClient)
+    since = 1735689600.0 # 2025-01-01
+    bitcoin = {'question': 'Will the Bitcoin price be above $100k on March 1?', 'tags': []}
+    solana = {'question': 'Will the network halt again?', 'tags': ['Solana']}
+
+    assert llamafeed_counter(bitcoin, since) == 1
+    assert llamafeed_counter({**bitcoin, 'tags': ['Bitcoin']}, since) == 2
+    assert llamafeed_counter(solana, since) == 1
+    # tags match whole words only, "ai" is not in "said"
+    assert llamafeed_counter({'question': 'Will it happen?', 'tags': ['AI']}, since) == 0
+
+
+def test_tags_match_whole_words():
+    assert scheduler.is_relevant("Binance exec said he was too sick", set(), {"ai"}) is False
+    assert scheduler.is_relevant("New AI model released", set(), {"ai"}) is True
+    assert scheduler.is_relevant("because of the fed", set(), {"us"}) is False
+    assert scheduler.is_relevant("The US Election results", set(), {"us election"}) is True
+
+
+def test_signals_read_the_local_order_book():
+    book = OrderBook("1")
+    market_data = SimpleNamespace(get_book=lambda token_id: book if book.ready else None)
+    client = FakeClient()
+    event_scheduler = EventDrivenScheduler([FakeExecutor("market")], client, market_data=market_data)
+
+    # no snapshot yet, the price is requested
+    assert event_scheduler.get_signals("market").price == 0.5
+    book.apply_snapshot([{'price': '0.6', 'size': '10'}], [{'price': '0.64', 'size': '10'}])
+    assert event_scheduler.get_signals("market").price == pytest.approx(0.62)
@@ -0,0 +1,89 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.agentsV2 import search
+from app.agentsV2.search import SearchCache, search_session
+
+
+class FakeSearch:
+    def __init__(self):
+        self.queries = []
+
+    def invoke(self, query):
+        self.queries.append(query['query'])
+        topic = query['query'].split()[0].lower()
+        return [
+            {'url': f'https://news.example/{topic}', 'content': f'{topic} news'},
+            {'url': 'https://news.example/shared/', 'content': 'shared news'},
+        ]
+
+    async def ainvoke(self, query):
+        return self.invoke(query)
+
+
+@pytest.fixture
+def fake_search(monkeypatch, tmp_path):
+    tool = FakeSearch()
+    monkeypatch.setattr(search, "search_tool", tool)
+    monkeypatch.setattr(search, "search_cache", SearchCache(str(tmp_path / "search.db"), bucket=3600))
+    return tool
+
+
+def test_cache_by_normalized_query_and_bucket(tmp_path):
+    cache = SearchCache(str(tmp_path / "search.db"), bucket=3600)
+    results = [{'url': 'https://a.example/1', 'content': 'a'}, {'url': 'https://a.example/2#top', 'content': 'b'}]
+    cache.set("Will Bitcoin  reach 100k?", results, now=7200)
+    assert cache.get("will bitcoin reach 100k?", now=7200 + 3599) == results
+    assert cache.get("will bitcoin reach 100k?", now=7200 + 3600) is None
+    assert len(cache.contents) == 2
+
+    # pages are stored once and shared between queries
+    cache.set("bitcoin 100k", results[:1], now=7200)
+    assert len(cache.contents) == 2
+    assert cache.get("Bitcoin 100K", now=7200) == results[:1]
+
+
+def test_search_uses_cache(fake_search):
+    assert len(search.search("Bitcoin price")) == 2
+    assert len(search.search("bitcoin   PRICE")) == 2
+    assert fake_search.queries == ["Bitcoin price"]
+
+
+def test_search_session_deduplicates_urls(fake_search):
+    with search_session():
+        first = search.search("Bitcoin positive")
+        second = search.search("Bitcoin critical")
+        third = search.search("Ethereum outlook")
+        ranking = search.search("Ethereum outlook", deduplicate=False)
+    assert [result['url'] for result in first] == ['https://news.example/bitcoin', 'https://news.example/shared/']
+    assert second == []
+    assert [result['url'] for result in third] == ['https://news.example/ethereum']
+    assert len(ranking) == 2
+    # outside of a session every result is returned
+    assert len(search.search("Bitcoin critical")) == 2
+
+
+def test_asearch_reads_and_writes_the_cache_off_the_event_loop(fake_search, monkeypatch):
+    loop_thread = threading.get_ident()
+    cache_threads = []
+    cache_get, cache_set = search.search_cache.get, search.search_cache.set
+
+    def record(method):
+        def wrapper(*args, **kwargs):
+            cache_threads.append(threading.get_ident())
+            return method(*args, **kwargs)
+        return wrapper
+
+    monkeypatch.setattr(search.search_cache, "get", record(cache_get))
+    monkeypatch.setattr(search.search_cache, "set", record(cache_set))
+
+    async def run():
+        return await search.asearch("Bitcoin price"), await search.asearch("bitcoin price")
+
+    first, second = asyncio.run(run())
+    assert first == second and len(first) == 2
+    assert fake_search.queries == ["Bitcoin price"]
+    # get, set, then the cached get
+    assert len(cache_threads) == 3 and loop_thread not in cache_threads
@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+from app.agentsV2.source_cache import SourceCache
+
+
+class FakeEmbeddings:
+    """Bag of words over a fixed vocabulary."""
+    vocabulary = ["football", "soccer", "clubs", "bitcoin", "crypto", "price", "sites", "top"]
+
+    def __init__(self):
+        self.calls = 0
+
+    def embed_query(self, text):
+        self.calls += 1
+        words = text.lower().replace(",", " ").split()
+        return [float(words.count(word)) for word in self.vocabulary]
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return SourceCache(str(tmp_path / "sources.db"), embeddings=FakeEmbeddings(), similarity_threshold=0.9)
+
+
+def test_exact_topic(cache):
+    cache.set("Top sites about football, clubs", "espn.com, bbc.com")
+    assert cache.get("top sites about   FOOTBALL clubs") == "espn.com, bbc.com"
+    assert cache.get("Top sites about bitcoin price") is None
+
+
+def test_similar_topic_shares_entry(cache):
+    cache.set("Top sites about football clubs", "espn.com")
+    # same words in a different order and with extra stop words embed identically
+    assert cache.get("Top football sites about the clubs") == "espn.com"
+    assert cache.get("Top crypto sites") is None
+
+
+def test_expired_entries_are_dropped(tmp_path):
+    cache = SourceCache(str(tmp_path / "sources.db"), embeddings=FakeEmbeddings(), ttl=-1)
+    cache.set("Top sites about football clubs", "espn.com")
+    assert cache.get("Top football sites about the clubs") is None
+    assert len(cache) == 0
+
+
+class AsyncOnlyEmbeddings(FakeEmbeddings):
+    def embed_query(self, text):
+        raise AssertionError("the async path must not block on the embedding")
+
+    async def aembed_query(self, text):
+        return super().embed_query(text)
+
+
+def test_async_lookup_embeds_off_the_event_loop(tmp_path):
+    cache = SourceCache(str(tmp_path / "sources.db"), embeddings=AsyncOnlyEmbeddings(), similarity_threshold=0.9)
+
+    async def lookup():
+        await cache.aset("Top sites about football clubs", "espn.com")
+        return await cache.aget("Top football sites about the clubs"), await cache.aget("Top crypto sites")
+
+    assert asyncio.run(lookup()) == ("espn.com", None)
@@ -0,0 +1,47 @@
+import asyncio
+
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+from app.agentsV2.summarize import atree_reduce, group_by_budget, tree_reduce
+from app.agentsV2.tokens import count_tokens
+
+
+def test_group_by_budget():
+    texts = ["word " * 10, "word " * 10, "word " * 10, "word " * 100]
+    groups = group_by_budget(texts, max_tokens=30)
+    assert [len(group) for group in groups] == [2, 1, 1]
+    assert all(sum(count_tokens(text) for text in group) <= 30 for group in groups)
+    assert group_by_budget([], max_tokens=30) == []
+
+
+def test_tree_reduce_keeps_calls_within_budget():
+    calls = []
+
+    def summarize(inputs):
+        calls.append(count_tokens(inputs["news"]))
+        # a summary keeps the first words of its input
+        return AIMessage(content=" ".join(inputs["news"].split()[:8]))
+
+    texts = [f"article {i} " + "fact " * 30 for i in range(20)]
+    summary = tree_reduce(RunnableLambda(summarize), texts, max_tokens=100)
+
+    assert summary.startswith("article 0")
+    assert len(calls) > 2
+    assert max(calls) <= 100 + 10
+
+
+def test_tree_reduce_single_call():
+    calls = []
+    chain = RunnableLambda(lambda inputs: calls.append(inputs) or AIMessage(content="summary"))
+    assert tree_reduce(chain, ["a", "b"], max_tokens=100) == "summary"
+    assert calls == [{"news": "a\n\nb"}]
+
+
+def test_tree_reduce_without_texts():
+    def summarize(inputs):
+        raise AssertionError("nothing to summarize")
+
+    chain = RunnableLambda(summarize)
+    assert tree_reduce(chain, [], max_tokens=100) == ""
+    assert asyncio.run(atree_reduce(chain, [], max_tokens=100)) == ""
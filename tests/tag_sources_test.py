@@ -0,0 +1,43 @@
+import pytest
+
+from app.agentsV2.tag_sources import TagSourceTable, parse_sources
+
+
+class FakeTopNews:
+    def __init__(self):
+        self.requests = []
+
+    def get_top_news(self, user_request):
+        self.requests.append(user_request)
+        if "crypto" in user_request:
+            raise RuntimeError("rate limited")
+        return "1. **ESPN** (www.espn.com)\n2. BBC Sport - bbc.co.uk/sport\n3. espn.com"
+
+
+@pytest.fixture
+def table(tmp_path):
+    return TagSourceTable(str(tmp_path / "tags.db"))
+
+
+def test_parse_sources():
+    assert parse_sources("1. ESPN (www.espn.com)\n2. BBC Sport - bbc.co.uk/sport") == ["espn.com", "bbc.co.uk"]
+    assert parse_sources("1. Reuters\n2. **Bloomberg**, Financial Times") == ["Reuters", "Bloomberg", "Financial Times"]
+
+
+def test_lookup(table):
+    table.set("Sports", ["espn.com", "bbc.co.uk"])
+    table.set("soccer", ["goal.com", "espn.com"])
+    assert table.lookup(["Sports", "Soccer", "Unknown"]) == ["espn.com", "bbc.co.uk", "goal.com"]
+    assert table.lookup(["Soccer"], limit=1) == ["goal.com"]
+    assert table.lookup(["Unknown"]) is None
+    assert table.lookup([]) is None
+
+
+def test_refresh(table):
+    agent = FakeTopNews()
+    refreshed = table.refresh(["Sports", "sports", "Crypto"], agent=agent, max_workers=2)
+    assert refreshed == {"sports": ["espn.com", "bbc.co.uk"]}
+    assert len(agent.requests) == 2
+    assert table.get("SPORTS") == ["espn.com", "bbc.co.uk"]
+    assert table.get("crypto") is None
+    assert set(table.tags()) == {"sports"}